@@ -0,0 +1,110 @@
+"""Сравнение пропускной способности WaitingState.handle_request при разных схемах логирования.
+
+    PYTHONPATH=common:server python benchmarks/bench_logging.py [--messages N]
+
+legacy  — синхронные StreamHandler и FileHandler, как было до очереди логов;
+queued  — QueueHandler + QueueListener без прореживания;
+sampled — QueueHandler + QueueListener, сохраняются INFO-записи 1 из 100 запросов.
+"""
+import argparse
+import asyncio
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from rabbitmq_server.config import HOT_PATH_LOGGERS, LOG_FORMAT, configure_logging, stop_listener
+from rabbitmq_server.handlers import Dispatcher
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.server_state import ServerContext, WaitingState
+
+
+class NullPublisher:
+    async def publish(self, body, routing_key, correlation_id, delivery=None, message_type=None, received_at=None,
+                      content_type=None):
+        pass
+
+
+class Message:
+    type = None
+    content_type = None
+    redelivered = False
+
+    def __init__(self, body):
+        self.body = body
+
+
+def make_messages(count):
+    messages = []
+    for i in range(count):
+        request = msg_serv_pb2.Request()
+        request.return_address = "client-queue"
+        request.request_id = f"request-{i}"
+        request.request = i
+        messages.append(Message(request.SerializeToString()))
+    return messages
+
+
+def reset_root():
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    for name in HOT_PATH_LOGGERS:
+        logging.getLogger(name).filters.clear()
+
+
+def setup_legacy(directory):
+    reset_root()
+    stream = open(directory / "legacy.stream.log", "w")
+    logging.basicConfig(
+        level=logging.INFO,
+        format=LOG_FORMAT,
+        handlers=[logging.StreamHandler(stream), logging.FileHandler(directory / "legacy.log")]
+    )
+    return None
+
+
+def setup_queued(directory, sample_every):
+    reset_root()
+    stream = open(directory / f"queued-{sample_every}.stream.log", "w")
+    return configure_logging("INFO", directory / f"queued-{sample_every}.log", sample_every=sample_every, stream=stream)
+
+
+async def run(messages):
+    context = ServerContext(transport=None, settings=None, publisher=NullPublisher(), dispatcher=Dispatcher())
+    context.set_state(WaitingState())
+    started = time.perf_counter()
+    for message in messages:
+        await context.handle_request(message)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--messages', type=int, default=50000)
+    args = parser.parse_args()
+
+    messages = make_messages(args.messages)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        setups = {
+            'legacy': lambda: setup_legacy(directory),
+            'queued': lambda: setup_queued(directory, 1),
+            'sampled': lambda: setup_queued(directory, 100),
+        }
+        results = {}
+        for name, setup in setups.items():
+            listener = setup()
+            elapsed = asyncio.run(run(messages))
+            if listener is not None:
+                stop_listener(listener)
+            results[name] = args.messages / elapsed
+        reset_root()
+
+    for name, rate in results.items():
+        print(f"{name:8} {rate:12.0f} msg/s  x{rate / results['legacy']:.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,319 @@
+"""Пропускная способность и задержки пути запрос-ответ по этапам.
+
+    PYTHONPATH=common:server:client python benchmarks/bench_requests.py [--requests 2000] [--concurrency 1,16,128]
+                                                                       [--mixes none,mixed] [--codecs protobuf,compact]
+                                                                       [--linger-ms 0] [--broker auto] [--json]
+
+codec     — кодирование и разбор Request/Response и размер сообщения в байтах;
+handler   — WaitingState.handle_request с поддельными сообщением и публикатором,
+            со средним временем каждого этапа конвейера (stages, мкс);
+roundtrip — клиент (ClientCore) → сервер (serve) → клиент через брокер в памяти
+            и через локальный RabbitMQ, если он доступен (--broker auto).
+
+Сервер и клиент работают в одном цикле событий с настройками из
+server_config.ini (метрики отключены). Смеси задержек (--mixes):
+none — без задержки, mixed — каждый десятый запрос с задержкой 50 мс,
+delayed — все запросы с задержкой 10 мс. Ожидание пачки у клиента
+(batch_linger) и у публикатора сервера (linger_ms) задаёт --linger-ms;
+по умолчанию оно нулевое, иначе roundtrip мерил бы в основном ожидание
+пачки, а не путь запроса. С --json результаты печатаются
+одним документом с хешем коммита, чтобы сравнивать их между коммитами.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import logging
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from google.protobuf.internal import api_implementation
+from rabbitmq_client.core import ClientCore
+from rabbitmq_common.codecs import CONTENT_TYPES, Response
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_common.settings import ConfigFile
+from rabbitmq_common.transport import RabbitMQTransport
+from rabbitmq_server.__main__ import serve
+from rabbitmq_server.handlers import Dispatcher
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.server_state import CODECS, ServerContext, WaitingState
+from rabbitmq_server.settings import CONFIG_PATH, load_server_settings
+
+# Задержка ответа (process_time_in_seconds) i-го запроса для каждой смеси
+MIXES = {
+    'none': lambda i: 0,
+    'mixed': lambda i: 0.05 if i % 10 == 9 else 0,
+    'delayed': lambda i: 0.01,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=Path(__file__).parent,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def latency_summary(latencies):
+    """Перцентили задержек в миллисекундах."""
+    ordered = sorted(latencies)
+
+    def percentile(p):
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * p))] * 1000, 3)
+
+    return {
+        'mean_ms': round(statistics.fmean(ordered) * 1000, 3),
+        'p50_ms': percentile(0.50),
+        'p95_ms': percentile(0.95),
+        'p99_ms': percentile(0.99),
+        'max_ms': round(ordered[-1] * 1000, 3),
+    }
+
+
+def result(stage, elapsed, count, latencies=None, **params):
+    entry = {'stage': stage, **params, 'count': count, 'seconds': round(elapsed, 4),
+             'throughput': round(count / elapsed, 1)}
+    if latencies:
+        entry['latency'] = latency_summary(latencies)
+    return entry
+
+
+RETURN_ADDRESS = str(uuid.uuid4())
+
+
+def make_requests(count, mix='none'):
+    return [
+        msg_serv_pb2.Request(return_address=RETURN_ADDRESS, request_id=str(uuid.uuid4()), request=i,
+                             process_time_in_seconds=MIXES[mix](i))
+        for i in range(count)
+    ]
+
+
+def bench_codec(count, codec_name):
+    codec = CODECS.by_name(codec_name)
+    requests = [CODECS.default.decode_request(request.SerializeToString()) for request in make_requests(count)]
+    responses = [Response(request.request_id, request.request * 2) for request in requests]
+    request_bodies = [codec.encode_request(request) for request in requests]
+    response_bodies = [codec.encode_response(response) for response in responses]
+
+    def run_all(func, items):
+        for item in items:
+            func(item)
+
+    cases = {
+        'encode_request': (lambda: run_all(codec.encode_request, requests), request_bodies),
+        'decode_request': (lambda: run_all(codec.decode_request, request_bodies), request_bodies),
+        'encode_response': (lambda: run_all(codec.encode_response, responses), response_bodies),
+        'decode_response': (lambda: run_all(codec.decode_response, response_bodies), response_bodies),
+    }
+    results = []
+    for name, (case, bodies) in cases.items():
+        started = time.perf_counter()
+        case()
+        results.append(result('codec', time.perf_counter() - started, count, codec=codec_name, operation=name,
+                              bytes=round(statistics.fmean(len(body) for body in bodies), 1)))
+    return results
+
+
+class NullPublisher:
+    async def publish(self, body, routing_key, correlation_id, delivery=None, message_type=None, received_at=None,
+                      content_type=None):
+        if delivery is not None:
+            await delivery.ack()
+
+
+class NullScheduler:
+    def schedule(self, delay, body, routing_key, correlation_id, message_type=None, content_type=None):
+        pass
+
+
+class FakeMessage:
+    type = None
+    redelivered = False
+    correlation_id = None
+
+    def __init__(self, body, content_type):
+        self.body = body
+        self.content_type = content_type
+
+    async def ack(self):
+        pass
+
+    async def nack(self, requeue=True):
+        pass
+
+
+async def bench_handler(count, concurrency, mix, codec_name):
+    codec = CODECS.by_name(codec_name)
+    messages = [
+        FakeMessage(codec.encode_request(CODECS.default.decode_request(request.SerializeToString())),
+                    codec.content_type)
+        for request in make_requests(count, mix)
+    ]
+    dispatcher = Dispatcher(thread_workers=1, process_workers=1)
+    context = ServerContext(
+        transport=None, settings=None, publisher=NullPublisher(), scheduler=NullScheduler(), dispatcher=dispatcher
+    )
+    context.set_state(WaitingState())
+    latencies = []
+
+    async def worker(batch):
+        for message in batch:
+            started = time.perf_counter()
+            await context.handle_request(message)
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker(messages[i::concurrency]) for i in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    dispatcher.shutdown()
+    entry = result('handler', elapsed, count, latencies, codec=codec_name, concurrency=concurrency, mix=mix)
+    entry['stages'] = {
+        name: round(histogram.sum / histogram.count * 1e6, 2)
+        for name, histogram in context.metrics.stage_seconds.children.items()
+    }
+    return entry
+
+
+def server_settings():
+    config = ConfigFile(CONFIG_PATH).load()
+    config.read_dict({'metrics': {'enabled': 'false'}, 'handlers': {'process_workers': '1'}})
+    return load_server_settings(config)
+
+
+async def rabbitmq_available(settings):
+    """True, если первый узел из [rabbitmq] принимает соединение."""
+    host, port = settings.endpoints[0]
+    transport = RabbitMQTransport()
+    try:
+        await transport.connect(host, port, settings.user, settings.password, timeout=settings.attempt_timeout)
+    except (OSError, asyncio.TimeoutError):
+        return False
+    await transport.close()
+    return True
+
+
+async def bench_roundtrip(settings, broker_name, transport_factory, count, levels, mixes, codecs, linger_ms):
+    host, port = settings.endpoints[0]
+    linger = linger_ms / 1000
+    stop = asyncio.Event()
+    server = asyncio.create_task(serve(
+        settings._replace(publisher_linger=linger), stop_signals=(), stop=stop, transport_factory=transport_factory
+    ))
+
+    core = ClientCore(str(uuid.uuid4()), settings.exchange, batch_linger=linger, transport_factory=transport_factory)
+    await core.connect(host, port, settings.user, settings.password)
+    # Первый ответ означает, что сервер подписался на очередь запросов
+    await asyncio.wait_for(core.request(0), 10)
+
+    results = []
+    try:
+        for codec, mix, concurrency in itertools.product(codecs, mixes, levels):
+            core.codec = CODECS.by_name(codec)
+            latencies = []
+
+            async def worker(values):
+                for value in values:
+                    started = time.perf_counter()
+                    await core.request(value, MIXES[mix](value))
+                    latencies.append(time.perf_counter() - started)
+
+            values = range(count)
+            started = time.perf_counter()
+            await asyncio.gather(*(worker(values[i::concurrency]) for i in range(concurrency)))
+            results.append(result('roundtrip', time.perf_counter() - started, count, latencies,
+                                  broker=broker_name, codec=codec, concurrency=concurrency, mix=mix,
+                                  linger_ms=linger_ms))
+    finally:
+        await core.close()
+        stop.set()
+        await server
+    return results
+
+
+async def run(args):
+    levels = [int(level) for level in args.concurrency.split(',')]
+    mixes = args.mixes.split(',')
+    codecs = args.codecs.split(',')
+    lingers = [float(linger) for linger in args.linger_ms.split(',')]
+    results = []
+    for codec in codecs:
+        results.extend(bench_codec(args.requests, codec))
+    for codec, mix, concurrency in itertools.product(codecs, mixes, levels):
+        results.append(await bench_handler(args.requests, concurrency, mix, codec))
+
+    settings = server_settings()
+    brokers = {}
+    if args.broker in ('auto', 'memory'):
+        broker = MemoryBroker()
+        brokers['memory'] = lambda: MemoryTransport(broker)
+    if args.broker == 'rabbitmq' or (args.broker == 'auto' and await rabbitmq_available(settings)):
+        brokers['rabbitmq'] = RabbitMQTransport
+    elif args.broker == 'auto':
+        print("RabbitMQ is not available, roundtrip runs only against the memory broker", file=sys.stderr)
+    for (name, factory), linger_ms in itertools.product(brokers.items(), lingers):
+        results.extend(await bench_roundtrip(
+            settings, name, factory, args.requests, levels, mixes, codecs, linger_ms
+        ))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=2000, help="запросов в каждом замере")
+    parser.add_argument('--concurrency', default='1,16,128', help="уровни параллельности через запятую")
+    parser.add_argument('--mixes', default='none,mixed', help=f"смеси задержек: {', '.join(MIXES)}")
+    parser.add_argument('--codecs', default='protobuf,compact', help=f"кодеки: {', '.join(CONTENT_TYPES)}")
+    parser.add_argument('--linger-ms', default='0', help="ожидание пачки в roundtrip, мс, через запятую")
+    parser.add_argument('--broker', choices=('auto', 'memory', 'rabbitmq'), default='auto')
+    parser.add_argument('--json', action='store_true')
+    args = parser.parse_args()
+    unknown = set(args.mixes.split(',')) - set(MIXES)
+    if unknown:
+        parser.error(f"unknown delay mix: {', '.join(sorted(unknown))}")
+    unknown = set(args.codecs.split(',')) - set(CONTENT_TYPES)
+    if unknown:
+        parser.error(f"unknown codec: {', '.join(sorted(unknown))}")
+    try:
+        if any(float(linger) < 0 for linger in args.linger_ms.split(',')):
+            raise ValueError
+    except ValueError:
+        parser.error(f"invalid --linger-ms: {args.linger_ms}")
+
+    # Журнал каждого запроса мерил бы логирование, а не путь запроса
+    logging.basicConfig(level=logging.WARNING)
+    results = asyncio.run(run(args))
+
+    if args.json:
+        print(json.dumps({
+            'commit': git_commit(),
+            'python': platform.python_version(),
+            'protobuf': api_implementation.Type(),
+            'requests': args.requests,
+            'results': results,
+        }, indent=2))
+        return
+
+    for entry in results:
+        keys = ('codec', 'operation', 'broker', 'linger_ms', 'mix', 'concurrency', 'bytes')
+        params = ' '.join(f"{key}={entry[key]:g}" if key == 'linger_ms' else f"{key}={entry[key]}"
+                          for key in keys if key in entry)
+        line = f"{entry['stage']:9} {params:68} {entry['throughput']:12.0f} /s"
+        if 'latency' in entry:
+            latency = entry['latency']
+            line += f"   p50 {latency['p50_ms']:8.3f} ms   p99 {latency['p99_ms']:8.3f} ms"
+        print(line)
+        if 'stages' in entry:
+            print(' ' * 10 + '  '.join(f"{name} {us:.1f}us" for name, us in entry['stages'].items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+"""Время запуска окна клиента: до первой отрисовки и до подключения к RabbitMQ.
+
+    QT_QPA_PLATFORM=offscreen PYTHONPATH=common:client python benchmarks/bench_startup.py [--runs 5] [--timeout 10] [--json]
+
+Каждый прогон — отдельный процесс, поэтому импорты холодные. Все времена
+отсчитываются от старта процесса:
+import       — импорт PyQt5 и модулей окна;
+window       — окно создано;
+first_paint  — окно впервые отрисовано;
+connected    — клиент подключился к RabbitMQ (пусто, если брокер недоступен за --timeout).
+Дополнительно проверяется, что aio_pika и protobuf не загружены к первой отрисовке.
+Окно читает копию client/client_config.ini во временном каталоге, где
+лежит и журнал исходящих, чтобы прогоны не оставляли файлов в исходниках.
+"""
+import time
+
+STARTED = time.perf_counter()
+
+import argparse
+import configparser
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+CLIENT_CONFIG = Path(__file__).resolve().parent.parent / 'client' / 'client_config.ini'
+METRICS = ('import', 'window', 'first_paint', 'connected')
+TRANSPORT_MODULES = ('aio_pika', 'google.protobuf')
+
+
+def elapsed_ms():
+    return round((time.perf_counter() - STARTED) * 1000, 1)
+
+
+def write_config(directory):
+    """Копия настроек клиента с журналом исходящих в directory."""
+    config = configparser.ConfigParser()
+    config.read(CLIENT_CONFIG)
+    if not config.has_section('outbox'):
+        config.add_section('outbox')
+    config.set('outbox', 'path', str(Path(directory) / 'client_outbox.sqlite3'))
+    path = Path(directory) / 'client_config.ini'
+    with open(path, 'w') as config_file:
+        config.write(config_file)
+    return path
+
+
+def run_child(timeout, config_path):
+    """Один запуск окна; печатает замеры одной строкой JSON."""
+    from PyQt5.QtCore import QEvent, QObject, QTimer, pyqtSlot
+    from PyQt5.QtWidgets import QApplication
+    from rabbitmq_client.window import Window
+    result = {'import': elapsed_ms()}
+
+    app = QApplication(sys.argv[:1])
+
+    class Probe(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Paint and 'first_paint' not in result:
+                result['first_paint'] = elapsed_ms()
+                result['transport_before_paint'] = [name for name in TRANSPORT_MODULES if name in sys.modules]
+            return False
+
+        @pyqtSlot()
+        def on_connected(self):
+            result['connected'] = elapsed_ms()
+            finish()
+
+    def finish():
+        window.close()
+        app.quit()
+
+    probe = Probe()
+    window = Window(str(config_path))
+    result['window'] = elapsed_ms()
+    window.installEventFilter(probe)
+    window.client.server_ready_signal.connect(probe.on_connected)
+    window.show()
+
+    QTimer.singleShot(int(timeout * 1000), finish)
+    app.exec_()
+    result.setdefault('connected', None)
+    print(json.dumps(result))
+
+
+def summarize(runs):
+    summary = {}
+    for metric in METRICS:
+        values = [run[metric] for run in runs if run.get(metric) is not None]
+        summary[metric] = {
+            'median_ms': statistics.median(values) if values else None,
+            'max_ms': max(values) if values else None,
+            'samples': len(values),
+        }
+    summary['transport_before_paint'] = sorted({name for run in runs for name in run.get('transport_before_paint', [])})
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--timeout', type=float, default=10.0, help="сколько ждать подключения, секунд")
+    parser.add_argument('--json', action='store_true')
+    parser.add_argument('--child', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        with tempfile.TemporaryDirectory() as directory:
+            run_child(args.timeout, write_config(directory))
+        return
+
+    env = dict(os.environ)
+    env.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    runs = []
+    for _ in range(args.runs):
+        output = subprocess.run(
+            [sys.executable, __file__, '--child', '--timeout', str(args.timeout)],
+            env=env, capture_output=True, text=True, check=True
+        ).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+
+    summary = summarize(runs)
+    if args.json:
+        print(json.dumps(summary, indent=2))
+        return
+
+    for metric in METRICS:
+        values = summary[metric]
+        if values['samples']:
+            print(f"{metric:12} median {values['median_ms']:8.1f} ms   max {values['max_ms']:8.1f} ms")
+        else:
+            print(f"{metric:12} n/a")
+    print(f"transport modules loaded before first paint: {', '.join(summary['transport_before_paint']) or 'none'}")
+
+
+if __name__ == '__main__':
+    main()
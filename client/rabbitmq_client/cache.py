@@ -0,0 +1,45 @@
+import time
+from rabbitmq_common.cache import TTLCache
+
+DEFAULT_MAX_SIZE = 1000
+DEFAULT_TTL = 300.0
+
+# Операции — чистые функции от числа, поэтому их ответы можно переиспользовать
+CACHEABLE_OPERATIONS = frozenset({'double', 'count_primes'})
+
+
+def load_cache_config(config):
+    """Читает параметры кэша ответов из секции [cache]; по умолчанию кэш выключен."""
+    enabled = config.getboolean('cache', 'enabled', fallback=False)
+    max_size = config.getint('cache', 'max_size', fallback=DEFAULT_MAX_SIZE)
+    ttl = config.getfloat('cache', 'ttl', fallback=DEFAULT_TTL)
+
+    if max_size < 0:
+        raise ValueError("cache.max_size must not be negative")
+    if ttl <= 0:
+        raise ValueError("cache.ttl must be positive")
+
+    return enabled, max_size, ttl
+
+
+class ResponseCache(TTLCache):
+    """LRU-кэш ответов сервера с ограниченным временем жизни записей.
+
+    Ключ — (operation, число из запроса). Попадание отвечается на клиенте
+    без публикации запроса.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        super().__init__(max_size, ttl, clock)
+
+    def get(self, operation, value):
+        """Возвращает сохранённый ответ или None, если записи нет или она устарела."""
+        return super().get((operation, value))
+
+    def put(self, operation, value, response):
+        if operation not in CACHEABLE_OPERATIONS:
+            return
+        super().put((operation, value), response)
+
+    def stats(self):
+        return f"hits {self.hits}, misses {self.misses}, hit rate {self.hit_rate:.0%}, size {len(self)}/{self.max_size}"
@@ -1,137 +1,335 @@
-import uuid
 import configparser
+import uuid
+import asyncio
 import logging, time
-from PyQt5.QtCore import QObject, pyqtSignal, Qt, QCoreApplication, pyqtSlot, QMetaObject, Q_ARG, QMutex, QMutexLocker
-import pika
+import sqlite3
+from functools import partial
+from PyQt5.QtCore import QObject, pyqtSignal, Qt, pyqtSlot, QMutex, QMutexLocker
 from pathlib import Path
-from rabbitmq_client.config_params import ConfigEditor
-from rabbitmq_client.proto import msg_client_pb2
-from rabbitmq_client.client_state import DisconnectedState, ConnectingState, ConnectedState, ErrorState, PendingResponseState, ErrorSendState
+from rabbitmq_client.cache import CACHEABLE_OPERATIONS, ResponseCache
+from rabbitmq_client.config import SETTINGS_COMPONENTS, load_client_settings
+from rabbitmq_common.failover import EndpointRotation
+from rabbitmq_client.inflight import InflightTable
+from rabbitmq_client.outbox import Outbox
+from rabbitmq_common.settings import ConfigFile, affected_components
+from rabbitmq_client.client_state import DisconnectedState, ConnectingState, ConnectedState, ErrorState, ErrorSendState
+
+# Виды событий, которые клиент передаёт окну пачками через ui_events_signal
+EVENT_RESPONSE = 'response'
+EVENT_TIMEOUT = 'timeout'
+EVENT_FAILED = 'failed'
+EVENT_ERROR = 'error'
+EVENT_CACHE = 'cache'
+EVENT_QUEUED = 'queued'
 
 class RMQClient(QObject):
-    received_response = pyqtSignal(int)
-    error_signal = pyqtSignal(str)
+    """Qt-обёртка над ClientCore: поток с циклом asyncio, переподключение и сигналы для окна."""
+
+    ui_events_signal = pyqtSignal(list)
     server_ready_signal = pyqtSignal()
     server_unavailable_signal = pyqtSignal()
-    send_request_signal = pyqtSignal(str, int)
+    # Множество компонентов, затронутых перечитанными настройками (см. SETTINGS_COMPONENTS)
+    settings_changed_signal = pyqtSignal(object)
+    send_request_signal = pyqtSignal(str, str, int, str, bool)
+    cancel_request_signal = pyqtSignal(str)
 
-    def __init__(self, config_file='client_config.ini'):
+    def __init__(self, config_file='client_config.ini', transport_factory=None):
         super().__init__()
+        self.logger = logging.getLogger(__name__)
+        self.logger.propagate = False 
+
         self.config_file = config_file
-        self.load_config()
-        self.connection = None
-        self.channel = None
+        # Фабрика транспорта ядра; по умолчанию RabbitMQ
+        self.transport_factory = transport_factory
+        self.config_source = ConfigFile(Path(__file__).parent.parent / config_file)
+        self.settings = None
+        # Ошибка в файле при запуске показывается окну, когда запустится цикл клиента
+        self._config_error = None
+        try:
+            self.load_config()
+        except (configparser.Error, ValueError) as e:
+            # Окно должно открыться и с ошибкой в файле: клиент работает на значениях по умолчанию
+            self._config_error = f"Invalid configuration, using defaults: {e}"
+            self.logger.error(self._config_error)
+            self.settings = load_client_settings(
+                configparser.ConfigParser(), self.config_source.config.get('client', 'uuid', fallback=None)
+            )
+        self.rotation = self.create_rotation()
+
+        self.core = None
+        self.loop = None
         self._running = False 
-        self.send_request_signal.connect(self.send_request, Qt.QueuedConnection)
-        self.config_editor = ConfigEditor(config_file, read_only=False)
-        self.config_editor.config_saved.connect(self.reload_config_and_reconnect, Qt.QueuedConnection)
+        self._stop_event = None
+        self._tasks = set()
+        # Поток клиента занят циклом asyncio, а не циклом событий Qt, поэтому
+        # слоты вызываются напрямую и сами передают работу в цикл клиента
+        self.send_request_signal.connect(self.send_request, Qt.DirectConnection)
+        self.cancel_request_signal.connect(self.cancel_request, Qt.DirectConnection)
         self.state = DisconnectedState()
         self._mutex = QMutex()
-        self._consumer_tag = None 
-
-        self.logger = logging.getLogger(__name__)
-        self.logger.propagate = False 
-
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(self.log_level)  
+        self._ui_mutex = QMutex()
+        self._ui_events = []
+        self._ui_flush_scheduled = False
+        # Таблица переживает переподключения: ответы на отправленные запросы ещё могут прийти
+        self.inflight = InflightTable()
+        self.cache = ResponseCache(self.settings.cache_max_size, self.settings.cache_ttl)
+        # Журнал открывается в потоке клиента: соединение SQLite нельзя делить между потоками
+        self.outbox = None
+        self._outbox_commit_scheduled = False
+        self._replay_task = None
+        # Номер последней записи журнала, отправленной после подключения
+        self._replay_after = 0
+
+        self.console_handler = logging.StreamHandler()
+        self.console_handler.setLevel(self.settings.log_level)  
         formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(name)s: %(message)s')
-        console_handler.setFormatter(formatter)
+        self.console_handler.setFormatter(formatter)
 
         if not self.logger.hasHandlers(): 
-            self.logger.addHandler(console_handler)
+            self.logger.addHandler(self.console_handler)
 
         self.logger.info("Logging initialized for RMQClient.")
 
     def load_config(self):
-        config = configparser.ConfigParser()
-
-        config_file_path = Path(__file__).parent.parent / self.config_file
+        """Перечитывает файл настроек, только если он изменился.
+
+        Возвращает множество компонентов, затронутых изменениями (см.
+        SETTINGS_COMPONENTS). На диск файл записывается только один раз —
+        когда в нём ещё нет uuid клиента.
+        """
+        if not self.config_source.reload() and self.settings is not None:
+            return set()
+
+        config = self.config_source.config
+        if not config.has_option('client', 'uuid'):
+            if not config.has_section('client'):
+                config.add_section('client')
+            config.set('client', 'uuid', str(uuid.uuid4()))
+            self.config_source.save()
+
+        settings = load_client_settings(config)
+        old, self.settings = self.settings, settings
+        return affected_components(old, settings, SETTINGS_COMPONENTS)
+
+    async def close_connection(self):
+        """Закрывает старое соединение и канал, если они открыты."""
+        if self.core is not None:
+            await self.core.close()
 
-        if not config_file_path.exists():
-            self.logger.error(f"Config file not found: {config_file_path}")
-            return
+    def change_state(self, new_state):
+        self.logger.debug(f"Changing state from {self.state.__class__.__name__} to {new_state.__class__.__name__}")
+        self.state = new_state
 
-        config.read(config_file_path)
+    def run(self):
+        """Запускает цикл asyncio в потоке клиента и возвращается после stop().
 
-        if not config.has_section('client'):
-            config.add_section('client')
+        Весь ввод-вывод идёт через события цикла: публикации уходят сразу,
+        ответы доставляются по приходу, а в простое поток спит в select.
+        """
+        with QMutexLocker(self._mutex):
+            self._running = True
+            self.loop = asyncio.new_event_loop()
 
-        self.client_uuid = config.get('client', 'uuid', fallback=str(uuid.uuid4()))
-        config.set('client', 'uuid', self.client_uuid)  
+        try:
+            self.loop.run_until_complete(self._main())
+        finally:
+            with QMutexLocker(self._mutex):
+                loop, self.loop = self.loop, None
+            loop.close()
+            # Отложенный сброс мог не успеть выполниться до остановки цикла:
+            # отдаём накопленные события окну и снимаем флаг, иначе следующие
+            # события копились бы без сброса
+            self.flush_ui_events()
+
+    async def _main(self):
+        self._stop_event = asyncio.Event()
+        if not self._running:
+            return
 
-        self.rmq_host = config.get('rabbitmq', 'host', fallback='localhost')
-        self.rmq_port = config.getint('rabbitmq', 'port', fallback=5672)
-        self.rmq_user = config.get('rabbitmq', 'user', fallback='guest')
-        self.rmq_password = config.get('rabbitmq', 'password', fallback='guest')
-        self.exchange = config.get('rabbitmq', 'exchange', fallback='bews')
+        if self._config_error is not None:
+            self.post_ui_event(EVENT_ERROR, self._config_error)
+        self.open_outbox()
+        while not self._stop_event.is_set():
+            # Паузы между попытками задаёт EndpointRotation
+            if not await self.connect_to_rabbitmq():
+                continue
+            self.start_replay(from_start=True)
+
+            stop = asyncio.ensure_future(self._stop_event.wait())
+            lost = asyncio.ensure_future(self.core.closed.wait())
+            await asyncio.wait([stop, lost], return_when=asyncio.FIRST_COMPLETED)
+            stop.cancel()
+            lost.cancel()
+            if not self._stop_event.is_set():
+                self.logger.warning("Connection to RabbitMQ closed, reconnecting")
+                self.rotation.lost()
+                self.change_state(DisconnectedState())
+            await self.close_connection()
+
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self.close_outbox()
+
+    def open_outbox(self):
+        """Открывает журнал неотправленных запросов; оставшиеся с прошлого запуска уйдут после подключения."""
+        self.close_outbox()
+        settings = self.settings
+        if not settings.outbox_enabled:
+            return
+        try:
+            self.outbox = Outbox(Path(__file__).parent.parent / settings.outbox_path, settings.outbox_max_size)
+        except sqlite3.Error as e:
+            self.emit_error_signal(f"Cannot open outbox {settings.outbox_path}: {e}")
+            return
+        if len(self.outbox):
+            self.logger.info(f"Outbox has {len(self.outbox)} queued requests from the previous run")
 
-        self.log_level_str = config.get('logging', 'level', fallback='INFO')
-        self.log_level = getattr(logging, self.log_level_str.upper(), logging.INFO)
+    def close_outbox(self):
+        outbox, self.outbox = self.outbox, None
+        if outbox is not None:
+            outbox.close()
 
-        self.timeout_connect = config.getfloat('client', 'timeout_connect', fallback=10)
-        self.timeout_request = config.getint('client', 'timeout_request', fallback=10)
+    def schedule_outbox_commit(self):
+        """Фиксирует изменения журнала одной транзакцией через outbox_commit_interval."""
+        if self._outbox_commit_scheduled:
+            return
+        self._outbox_commit_scheduled = True
+        self.loop.call_later(self.settings.outbox_commit_interval, self.commit_outbox)
+
+    def commit_outbox(self):
+        self._outbox_commit_scheduled = False
+        if self.outbox is not None:
+            self.outbox.commit()
+
+    @property
+    def replaying(self):
+        """В журнале есть записи, ещё не отправленные после подключения."""
+        return self._replay_task is not None and not self._replay_task.done()
+
+    def start_replay(self, from_start=False):
+        """Запускает отправку журнала; from_start=True — заново с первой записи, после подключения."""
+        if from_start:
+            if self.replaying:
+                self._replay_task.cancel()
+            self._replay_after = 0
+        if self.outbox is None or not len(self.outbox):
+            return
+        if not self.replaying:
+            self._replay_task = self.spawn(self.replay_outbox())
+
+    async def replay_outbox(self):
+        """Отправляет запросы из журнала по порядку, не быстрее outbox_replay_rate запросов в секунду.
+
+        Запись удаляется из журнала только по ответу или таймауту (см.
+        on_queued_request_done), поэтому запрос, публикация которого
+        потерялась при обрыве связи, уйдёт ещё раз после переподключения.
+        Запрос, который нельзя отправить в принципе, удаляется с ошибкой,
+        чтобы не держать за собой остальные.
+        """
+        outbox = self.outbox
+        replayed = 0
+        while outbox is self.outbox and self.core is not None and self.core.is_connected:
+            batch = outbox.read(self._replay_after, self.settings.batch_size)
+            if not batch:
+                break
+            for seq, request_id, operation, value, delay in batch:
+                try:
+                    if request_id in self.inflight:
+                        self.core.resend(request_id, value, delay, operation)
+                    else:
+                        self.core.submit(
+                            request_id, value, delay, operation,
+                            partial(self.on_queued_request_done, request_id, operation, value)
+                        )
+                    replayed += 1
+                except RuntimeError as e:
+                    self.logger.warning(f"Outbox replay paused: {e}")
+                    break
+                except ConnectionError:
+                    break
+                except ValueError as e:
+                    outbox.remove(request_id)
+                    self.schedule_outbox_commit()
+                    self.emit_error_signal(f"Dropped queued request {request_id}: {e}")
+                self._replay_after = seq
+            await asyncio.sleep(len(batch) / self.settings.outbox_replay_rate)
+
+        if replayed:
+            self.logger.info(f"Replayed {replayed} queued requests, {len(outbox)} awaiting response in outbox")
+
+    def on_queued_request_done(self, request_id, operation, value, response, error):
+        """Как on_request_done, но ещё и удаляет запрос из журнала."""
+        if self.outbox is not None and self.outbox.remove(request_id):
+            self.schedule_outbox_commit()
+        self.on_request_done(request_id, operation, value, response, error)
+
+    def queue_request(self, request_id, operation, value, delay):
+        """Сохраняет запрос в журнал; он уйдёт на сервер после подключения."""
+        try:
+            added = self.outbox.put(request_id, operation, value, delay)
+        except (RuntimeError, sqlite3.Error) as e:
+            self.emit_error_signal(f"Cannot queue request: {e}")
+            self.change_state(ErrorSendState())
+            return
 
-        with open(config_file_path, 'w') as configfile:
-            config.write(configfile)
+        if added:
+            self.schedule_outbox_commit()
+            self.logger.info(f"Queued request {request_id}, {len(self.outbox)} in outbox")
+            self.post_ui_event(EVENT_QUEUED, request_id, len(self.outbox))
+        if self.core is not None and self.core.is_connected:
+            self.start_replay()
 
-    def close_connection(self):
-        """Закрывает старое соединение и канал, если они открыты."""
+    async def _sleep_unless_stopped(self, seconds):
         try:
-            if self.channel and self._consumer_tag:
-                self.channel.basic_cancel(self._consumer_tag)
-                self._consumer_tag = None
-            if self.connection and self.connection.is_open:
-                self.connection.close()
-                self.logger.info("Old connection closed.")
-            if self.channel and self.channel.is_open:
-                self.channel.close()
-                self.logger.info("Old channel closed.")
-        except Exception as e:
-            self.logger.error(f"Error while closing old connection: {e}")
-        finally:
-            self.connection = None
-            self.channel = None
+            await asyncio.wait_for(self._stop_event.wait(), seconds)
+        except asyncio.TimeoutError:
+            pass
 
-    def change_state(self, new_state):
-        self.logger.debug(f"Changing state from {self.state.__class__.__name__} to {new_state.__class__.__name__}")
-        self.state = new_state
-   
-    def run(self):
-        self._mutex.lock()
-        self._running = True
-        self._mutex.unlock()
-        
-        while True:
-            self._mutex.lock()
-            if not self._running:
-                self._mutex.unlock()
-                break
-            self._mutex.unlock()
-            
-            if not self.connect_to_rabbitmq():
-                time.sleep(5)
-                continue
-                
-            try:
-                while True:
-                    self._mutex.lock()
-                    if not self._running:
-                        self._mutex.unlock()
-                        break
-                    self._mutex.unlock()
-                    
-                    self.connection.process_data_events(time_limit=1)
-                    QCoreApplication.processEvents()
-            except Exception as e:
-                self.logger.error(f"Connection error: {str(e)}")
-            finally:
-                self.close_connection()
+    def call_in_loop(self, callback, *args):
+        """Передаёт вызов в цикл клиента из любого потока."""
+        with QMutexLocker(self._mutex):
+            loop = self.loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(callback, *args)
+                return True
+        # Сигнал об ошибке берёт тот же мьютекс, поэтому отправляется после его освобождения
+        self.emit_error_signal("Client is not running")
+        return False
+
+    def spawn(self, coro):
+        """Запускает корутину в цикле клиента и держит ссылку на задачу до её завершения."""
+        task = self.loop.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
 
     def stop(self):
-        self._running = False
-        self.close_connection()
+        with QMutexLocker(self._mutex):
+            self._running = False
+            loop = self.loop
+
+        if loop is not None and not loop.is_closed():
+            loop.call_soon_threadsafe(self._request_stop)
+        self.logger.info("Client stopped")
+
+    def _request_stop(self):
+        if self._stop_event is not None:
+            self._stop_event.set()
+
+    def create_rotation(self):
+        settings = self.settings
+        return EndpointRotation(settings.endpoints, settings.backoff_initial, settings.backoff_max)
+
+    def create_core(self):
+        # aio_pika и protobuf импортируются в потоке клиента при первом подключении, а не при старте окна
+        from rabbitmq_client.core import ClientCore
+        kwargs = {} if self.transport_factory is None else {'transport_factory': self.transport_factory}
+        return ClientCore.from_settings(
+            self.settings, inflight=self.inflight, on_error=self.emit_error_signal, **kwargs
+        )
 
-    def connect_to_rabbitmq(self):
+    async def connect_to_rabbitmq(self):
         if isinstance(self.state, ConnectedState):
             self.logger.warning("Already connected. Skipping...")
             return True
@@ -140,153 +338,217 @@ class RMQClient(QObject):
             self.logger.warning("Resetting connection state...")
             self.change_state(DisconnectedState())
 
-        self.load_config()
-        start_time = time.time()
-        
-        while time.time() - start_time <= self.timeout_connect:
+        settings = self.settings
+        rotation = self.rotation
+        start_time = time.monotonic()
+
+        while not self._stop_event.is_set():
+            endpoint, wait = rotation.next()
+            if wait > 0:
+                await self._sleep_unless_stopped(wait)
+                if self._stop_event.is_set():
+                    break
+
+            host, port = endpoint
             try:
-                self.connection = pika.BlockingConnection(
-                    pika.ConnectionParameters(
-                        host=self.rmq_host,
-                        port=self.rmq_port,
-                        credentials=pika.PlainCredentials(self.rmq_user, self.rmq_password)
-                    )
-                )
-                
-                self.channel = self.connection.channel()
-                self.channel.exchange_declare(exchange=self.exchange, exchange_type='direct', durable=True)
-                self.channel.queue_declare(queue=self.client_uuid, exclusive=True, auto_delete=True, durable=False)
-
-                if self._consumer_tag:
-                    self.channel.basic_cancel(self._consumer_tag)
-
-                self._consumer_tag = self.channel.basic_consume(
-                    queue=self.client_uuid, 
-                    on_message_callback=self.on_response, 
-                    auto_ack=True
+                self.core = self.create_core()
+                await self.core.connect(
+                    host=host,
+                    port=port,
+                    login=settings.user,
+                    password=settings.password,
+                    timeout=settings.attempt_timeout
                 )
 
-                self.logger.info("Connection established successfully")
+                recovery = rotation.connected(endpoint)
+                if recovery is None:
+                    self.logger.info(f"Connection established successfully to {host}:{port}")
+                else:
+                    self.logger.info(f"Reconnected to {host}:{port} in {recovery * 1000:.0f} ms")
                 self.change_state(ConnectedState())
                 self.server_ready_signal.emit()
                 return True
-                
-            except (pika.exceptions.AMQPConnectionError, ConnectionResetError) as e:
-                self.logger.error(f"Connection error: {str(e)}")
-                time.sleep(1)
-                
+
+            except (OSError, asyncio.TimeoutError) as e:
+                rotation.failed(endpoint)
+                self.logger.error(f"Connection error ({host}:{port}): {str(e)}")
+
             except Exception as e:
+                rotation.failed(endpoint)
                 self.logger.error(f"Unexpected error: {str(e)}")
                 self.change_state(ErrorState())
-                time.sleep(1)
 
+            if time.monotonic() - start_time > settings.timeout_connect:
+                break
+
+        if self._stop_event.is_set():
+            return False
         self.logger.error("Connection timeout after retries")
         self.change_state(ErrorState())
+        self.server_unavailable_signal.emit()
         return False
 
+    def submit_request(self, user_input, delay, operation='double', use_cache=True):
+        """Передаёт запрос в поток клиента и сразу возвращает его request_id.
 
-    def setup_channel(self):
-        """Настроить каналы для отправки и получения сообщений."""
-        self.channel.exchange_declare(exchange=self.exchange, exchange_type='direct', durable=True)
-        self.logger.info(f"Exchange '{self.exchange}' declared.")
+        Можно вызывать из любого потока; ответ или таймаут придёт событием
+        EVENT_RESPONSE/EVENT_TIMEOUT с этим же request_id. use_cache=False отправляет
+        запрос на сервер, даже если ответ есть в кэше клиента.
+        """
+        request_id = str(uuid.uuid4())
+        self.send_request_signal.emit(request_id, str(user_input), delay, operation, use_cache)
+        return request_id
 
-    @pyqtSlot(str,int)
-    def send_request(self, user_input, delay):
-        """Метод для отправки запроса."""
+    @pyqtSlot(str, str, int, str, bool)
+    def send_request(self, request_id, user_input, delay, operation='double', use_cache=True):
+        """Передаёт запрос в цикл клиента."""
         with QMutexLocker(self._mutex):
-            if not self._running:
-                self.emit_error_signal("Client is stopping")
-                return
-            
-        if isinstance(self.state, PendingResponseState):
-            self.logger.warning("Request is already sent.")
-            return True
-        
-        if self.channel and self.connection.is_open:
-            try:
-                request = msg_client_pb2.Request()
-                request.request = int(user_input)
-                request.return_address = self.client_uuid
-                request.request_id = str(uuid.uuid4())
-                request.process_time_in_seconds = delay
-                msg = request.SerializeToString()
-
-                self.channel.basic_publish(
-                    exchange=self.exchange,
-                    routing_key=self.exchange,
-                    properties=pika.BasicProperties(
-                        reply_to=self.client_uuid,
-                        correlation_id=request.request_id
-                    ),
-                    body=msg
-                )
-                self.log_request_sent(user_input, delay) 
-            except Exception as e:
-                self.emit_error_signal(f"Error sending request: {e}")
-                self.change_state(ErrorSendState())
-        else:
-            self.emit_error_signal("Cannot send request: Channel or connection is not open.")
-            self.change_state(ErrorSendState())
-
-    def log_request_sent(self, user_input, delay):
-        """Логирует отправленный запрос."""
-        self.logger.info(f"Sent request: {user_input} with delay: {delay} sec")
+            running = self._running
+        if not running:
+            self.emit_error_signal("Client is stopping")
+            return
+        self.call_in_loop(self._send_request, request_id, user_input, delay, operation, use_cache)
 
-    def on_response(self, ch, method, properties, body):
-        """Обрабатывает ответ от сервера."""
+    def _send_request(self, request_id, user_input, delay, operation, use_cache=True):
+        """Метод для отправки запроса."""
         try:
-            self.logger.info(f"Received raw response body: {body}")
-            response = msg_client_pb2.Response()
+            value = int(user_input)
+        except ValueError as e:
+            self.emit_error_signal(f"Error sending request: {e}")
+            return
 
-            response.ParseFromString(body)
+        if use_cache and self.answer_from_cache(request_id, operation, value):
+            return
 
-            self.logger.info(f"Parsed response: {response.response} for request ID: {properties.correlation_id}")
-            self.received_response.emit(response.response)
+        connected = self.core is not None and self.core.is_connected
+        # Пока журнал отправляется, новые запросы встают за ним, чтобы сохранить порядок
+        if self.outbox is not None and (not connected or self.replaying):
+            self.queue_request(request_id, operation, value, delay)
+            return
 
-            self.change_state(ConnectedState())
+        if not connected:
+            self.emit_error_signal("Cannot send request: Channel or connection is not open.")
+            self.change_state(ErrorSendState())
+            return
 
+        try:
+            self.core.submit(request_id, value, delay, operation, partial(self.on_request_done, request_id, operation, value))
+            self.log_request_sent(user_input, delay)
         except Exception as e:
-            self.emit_error_signal(f"Error processing response: {e}")
+            self.emit_error_signal(f"Error sending request: {e}")
+            self.change_state(ErrorSendState())
+
+    def log_request_sent(self, user_input, delay):
+        """Логирует отправленный запрос."""
+        self.logger.info(f"Sent request: {user_input} with delay: {delay} sec")
+
+    def answer_from_cache(self, request_id, operation, value):
+        """Отвечает на запрос из кэша клиента, не публикуя его; возвращает True при попадании."""
+        if not self.settings.cache_enabled or operation not in CACHEABLE_OPERATIONS:
+            return False
+
+        response = self.cache.get(operation, value)
+        self.post_ui_event(EVENT_CACHE, response is not None, self.cache.stats())
+        if response is None:
+            return False
+
+        self.logger.info(f"Answered {operation}({value}) from client cache: {response}")
+        self.post_ui_event(EVENT_RESPONSE, request_id, response)
+        return True
+
+    def on_request_done(self, request_id, operation, value, response, error):
+        """Вызывается таблицей запросов в полёте ровно один раз для каждого запроса."""
+        if isinstance(error, TimeoutError):
+            self.logger.warning(f"Request {request_id} timed out")
+            self.post_ui_event(EVENT_TIMEOUT, request_id)
+        elif error is not None:
+            self.logger.warning(f"Request {request_id} failed: {error}")
+            self.post_ui_event(EVENT_FAILED, request_id, str(error))
+        else:
+            self.logger.info(f"Parsed response: {response.response} for request ID: {request_id}")
+            if self.settings.cache_enabled:
+                self.cache.put(operation, value, response.response)
+            self.post_ui_event(EVENT_RESPONSE, request_id, response.response)
+
+    @pyqtSlot(str)
+    def cancel_request(self, request_id):
+        self.call_in_loop(self._cancel_request, request_id)
+
+    def _cancel_request(self, request_id):
+        """Перестаёт ждать ответ на запрос; поздний ответ будет проигнорирован."""
+        cancelled = self.inflight.cancel(request_id) is not None
+        if self.outbox is not None and self.outbox.remove(request_id):
+            self.schedule_outbox_commit()
+            cancelled = True
+        if cancelled:
+            self.logger.info(f"Request {request_id} cancelled")
 
     def emit_error_signal(self, message):
         """Централизованный метод для отправки сигнала об ошибке."""
         self.logger.error(message)
-        self.error_signal.emit(message)
+        self.post_ui_event(EVENT_ERROR, message)
+
+    def post_ui_event(self, *event):
+        """Копит событие для окна; накопленное уходит одним сигналом раз в ui_flush_interval.
+
+        Так окно обновляет виджеты один раз на пачку событий, а не на каждый
+        ответ, и очередь событий Qt не переполняется при высокой частоте ответов.
+        """
+        with QMutexLocker(self._ui_mutex):
+            self._ui_events.append(event)
+            if self._ui_flush_scheduled:
+                return
+            self._ui_flush_scheduled = True
+
+        # Цикл читается и получает сброс под мьютексом: run() обнуляет self.loop
+        # под ним же и после этого сам сбрасывает накопленное
+        with QMutexLocker(self._mutex):
+            loop = self.loop
+            if loop is not None and not loop.is_closed():
+                loop.call_soon_threadsafe(loop.call_later, self.settings.ui_flush_interval, self.flush_ui_events)
+                return
+        self.flush_ui_events()
+
+    def flush_ui_events(self):
+        with QMutexLocker(self._ui_mutex):
+            events, self._ui_events = self._ui_events, []
+            self._ui_flush_scheduled = False
+        if events:
+            self.ui_events_signal.emit(events)
     
     @pyqtSlot()
     def reload_config_and_reconnect(self):
+        self.call_in_loop(self._reload_config_and_reconnect)
 
-        QMetaObject.invokeMethod(self, "actual_reload_config_and_reconnect", Qt.QueuedConnection)
+    def _reload_config_and_reconnect(self):
+        """Применяет изменения настроек, пересоздавая только затронутые компоненты."""
+        try:
+            components = self.load_config()
+        except (configparser.Error, ValueError) as e:
+            self.emit_error_signal(f"Invalid configuration, keeping previous settings: {e}")
+            return
 
-    @pyqtSlot()
-    def actual_reload_config_and_reconnect(self):
-        old_uuid = self.client_uuid
-        old_port = self.rmq_port
-        old_host = self.rmq_host
-        old_exchange = self.exchange
-        self.load_config()
-
-        if self.client_uuid != old_uuid or self.rmq_host != old_host or self.rmq_port != old_port or self.exchange != old_exchange:
+        if not components:
+            self.logger.debug("Configuration file unchanged")
+            return
+        self.logger.info(f"Configuration changed: {', '.join(sorted(components))}")
+        self.settings_changed_signal.emit(components)
+
+        if 'logging' in components:
+            self.console_handler.setLevel(self.settings.log_level)
+        if 'cache' in components:
+            self.cache.max_size = self.settings.cache_max_size
+            self.cache.ttl = self.settings.cache_ttl
+        if self.core is not None and components & {'timeouts', 'batching', 'codec'}:
+            self.core.apply_settings(self.settings)
+        if 'failover' in components:
+            self.rotation = self.create_rotation()
+        if 'outbox' in components:
+            self.open_outbox()
+            self.start_replay()
+
+        if 'connection' in components:
             self.logger.info("Client configuration changed. Reconnecting...")
-            self.close_connection() 
-            self._running = True
-            self.change_state(ConnectingState())  
-
-            if self.connect_to_rabbitmq():
-                self.logger.info("Successfully reconnected to RabbitMQ")
-            else:
-                self.logger.error("Failed to reconnect to RabbitMQ")
-                self.change_state(DisconnectedState()) 
-
-    def stop(self):
-        with QMutexLocker(self._mutex): 
-            self._running = False
-        
-        self.close_connection()
-        self.logger.info("Client stopped")
-
-        if self.connection and self.connection.is_open:
-            try:
-                self.connection.close()
-            except Exception as e:
-                self.logger.error(f"Error closing connection: {e}")      
\ No newline at end of file
+            self.change_state(ConnectingState())
+            # Основной цикл заметит закрытие соединения и подключится заново
+            self.spawn(self.close_connection())
@@ -59,7 +59,6 @@ class ConnectingState(ClientState):
     def send_request(self, client, user_input, delay):
         client.logger.warning("Client is connecting, queuing request.")
         client.send_request(user_input, delay)
-        client.chanhe_state(PendingResponseState())
 
     def receive_response(self, client, response):
         client.logger.warning("Client is connecting, cannot receive responses yet.")
@@ -81,37 +80,13 @@ class ConnectedState(ClientState):
         client.logger.debug(f"Sending request: {user_input} with delay: {delay}")
 
     def receive_response(self, client, response):
-        client.logger.debug(f"Sending request:")
-        try:
-            client.received_response.emit(response)
-        except Exception as e:
-            client.logger.error(f"Error receiving response: {e}")
+        # Ответы доставляются окну через таблицу запросов в полёте (см. RMQClient.on_request_done)
+        client.logger.debug(f"Response received: {response}")
 
     def handle_error(self, client, error):
         client.logger.error(f"Error occurred in ConnectedState: {error}")
         client.change_state(ErrorState())      
 
-class PendingResponseState(ClientState):
-    def connect(self, client):
-        client.logger.warning("Already connected and awaiting a response.")
-
-    def disconnect(self, client):
-        client.logger.info("Disconnecting while waiting for a response...")
-        client.connection.close()
-        client.change_state(DisconnectedState())
-
-    def send_request(self, client, user_input, delay):
-        client.logger.warning("Request denied: awaiting a previous response.")
-
-    def receive_response(self, client, response):
-        client.logger.info("Response received, processing...")
-        client.received_response.emit(response)
-        client.change_state(ConnectedState())
-
-    def handle_error(self, client, error):
-        client.logger.error(f"Error while awaiting response: {error}")
-        client.change_state(ErrorState())
-
 class ErrorSendState(ClientState):
     def connect(self, client):
         client.logger.info("Retrying connection after send error...")
@@ -0,0 +1,123 @@
+"""Типизированные настройки клиента из client_config.ini.
+
+Модуль не зависит от Qt, aio_pika и protobuf, поэтому его можно
+импортировать при старте окна, не подгружая транспорт.
+"""
+import logging
+import uuid
+from typing import NamedTuple, Tuple
+from rabbitmq_client.cache import load_cache_config
+from rabbitmq_client.outbox import load_outbox_config
+from rabbitmq_common.codecs import CONTENT_TYPES, DEFAULT_CODEC
+from rabbitmq_common.failover import load_failover_config
+from rabbitmq_common.sharding import load_sharding_config
+
+DEFAULT_BATCH_LINGER = 0.005
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_TIMEOUT_RESPONSE = 10.0
+DEFAULT_MAX_IN_FLIGHT = 10000
+DEFAULT_UI_FLUSH_INTERVAL = 0.016
+DEFAULT_GUI_CAPACITY = 10000
+DEFAULT_GUI_FLUSH_MS = 100
+
+
+class ClientSettings(NamedTuple):
+    """Типизированный снимок client_config.ini."""
+    host: str
+    port: int
+    endpoints: Tuple[Tuple[str, int], ...]
+    user: str
+    password: str
+    exchange: str
+    shards: int
+    client_uuid: str
+    timeout_connect: float
+    attempt_timeout: float
+    backoff_initial: float
+    backoff_max: float
+    timeout_response: float
+    batch_linger: float
+    batch_size: int
+    max_in_flight: int
+    codec: str
+    log_level: int
+    gui_capacity: int
+    gui_flush_ms: int
+    cache_enabled: bool
+    cache_max_size: int
+    cache_ttl: float
+    ui_flush_interval: float
+    outbox_enabled: bool
+    outbox_path: str
+    outbox_max_size: int
+    outbox_replay_rate: float
+    outbox_commit_interval: float
+
+
+# Какие компоненты клиента пересоздаются при изменении каких настроек
+SETTINGS_COMPONENTS = {
+    'connection': (
+        'host', 'port', 'endpoints', 'user', 'password', 'exchange', 'shards', 'client_uuid', 'timeout_connect',
+        'attempt_timeout'
+    ),
+    'failover': ('endpoints', 'backoff_initial', 'backoff_max'),
+    'logging': ('log_level',),
+    'gui': ('gui_capacity', 'gui_flush_ms'),
+    'timeouts': ('timeout_response', 'max_in_flight'),
+    'batching': ('batch_linger', 'batch_size'),
+    'codec': ('codec',),
+    'cache': ('cache_enabled', 'cache_max_size', 'cache_ttl'),
+    'outbox': ('outbox_enabled', 'outbox_path', 'outbox_max_size', 'outbox_replay_rate', 'outbox_commit_interval'),
+}
+
+
+def load_client_settings(config, client_uuid=None):
+    """Собирает ClientSettings из ConfigParser; ValueError при некорректных значениях."""
+    cache_enabled, cache_max_size, cache_ttl = load_cache_config(config)
+    endpoints, backoff_initial, backoff_max, attempt_timeout = load_failover_config(config)
+    outbox_enabled, outbox_path, outbox_max_size, outbox_replay_rate, outbox_commit_interval = load_outbox_config(config)
+    settings = ClientSettings(
+        host=config.get('rabbitmq', 'host', fallback='localhost'),
+        port=config.getint('rabbitmq', 'port', fallback=5672),
+        endpoints=endpoints,
+        user=config.get('rabbitmq', 'user', fallback='guest'),
+        password=config.get('rabbitmq', 'password', fallback='guest'),
+        exchange=config.get('rabbitmq', 'exchange', fallback='bews'),
+        shards=load_sharding_config(config),
+        client_uuid=config.get('client', 'uuid', fallback=client_uuid or str(uuid.uuid4())),
+        timeout_connect=config.getfloat('client', 'timeout_connect', fallback=10.0),
+        attempt_timeout=attempt_timeout,
+        backoff_initial=backoff_initial,
+        backoff_max=backoff_max,
+        timeout_response=config.getfloat('server', 'timeout_response', fallback=DEFAULT_TIMEOUT_RESPONSE),
+        batch_linger=config.getfloat('client', 'batch_linger_ms', fallback=DEFAULT_BATCH_LINGER * 1000) / 1000,
+        batch_size=config.getint('client', 'batch_size', fallback=DEFAULT_BATCH_SIZE),
+        max_in_flight=config.getint('client', 'max_in_flight', fallback=DEFAULT_MAX_IN_FLIGHT),
+        codec=config.get('client', 'codec', fallback=DEFAULT_CODEC),
+        log_level=getattr(logging, config.get('logging', 'level', fallback='INFO').upper(), logging.INFO),
+        gui_capacity=config.getint('logging', 'gui_capacity', fallback=DEFAULT_GUI_CAPACITY),
+        gui_flush_ms=config.getint('logging', 'gui_flush_ms', fallback=DEFAULT_GUI_FLUSH_MS),
+        cache_enabled=cache_enabled,
+        cache_max_size=cache_max_size,
+        cache_ttl=cache_ttl,
+        ui_flush_interval=config.getfloat('client', 'ui_flush_ms', fallback=DEFAULT_UI_FLUSH_INTERVAL * 1000) / 1000,
+        outbox_enabled=outbox_enabled,
+        outbox_path=outbox_path,
+        outbox_max_size=outbox_max_size,
+        outbox_replay_rate=outbox_replay_rate,
+        outbox_commit_interval=outbox_commit_interval
+    )
+
+    if settings.timeout_connect < 0 or settings.timeout_response < 0:
+        raise ValueError("timeouts must not be negative")
+    if settings.batch_size < 1:
+        raise ValueError("client.batch_size must be at least 1")
+    if settings.max_in_flight < 1:
+        raise ValueError("client.max_in_flight must be at least 1")
+    if settings.codec not in CONTENT_TYPES:
+        raise ValueError(f"client.codec must be one of: {', '.join(CONTENT_TYPES)}")
+    if settings.gui_capacity < 1 or settings.gui_flush_ms < 0:
+        raise ValueError("logging.gui_capacity must be at least 1 and logging.gui_flush_ms must not be negative")
+    if settings.ui_flush_interval < 0:
+        raise ValueError("client.ui_flush_ms must not be negative")
+    return settings
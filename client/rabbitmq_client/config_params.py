@@ -140,15 +140,15 @@ class ConfigEditor(QDialog):
             'CRITICAL': logging.CRITICAL
         }
 
-        logging.getLogger().handlers.clear()
-
-        logging.basicConfig(level=levels.get(level, logging.INFO))
-
-        console_handler = logging.StreamHandler(sys.stdout)
-        console_handler.setLevel(logging.DEBUG)  
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        console_handler.setFormatter(formatter)
-        logging.getLogger().addHandler(console_handler)
+        # Уровень меняется у уже настроенных логгера и обработчиков: их пересоздание
+        # сбросило бы обработчики, которые поставили клиент и окно
+        root = logging.getLogger()
+        root.setLevel(levels.get(level, logging.INFO))
+        if not root.handlers:
+            console_handler = logging.StreamHandler(sys.stdout)
+            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            console_handler.setFormatter(formatter)
+            root.addHandler(console_handler)
 
     def update_editability(self):
         """Обновляем доступность редактирования в зависимости от флага read_only."""
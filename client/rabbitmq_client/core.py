@@ -0,0 +1,302 @@
+import asyncio
+import logging
+import uuid
+from rabbitmq_client.config import (
+    DEFAULT_BATCH_LINGER, DEFAULT_BATCH_SIZE, DEFAULT_MAX_IN_FLIGHT, DEFAULT_TIMEOUT_RESPONSE
+)
+from rabbitmq_client.inflight import InflightTable
+from rabbitmq_client.proto import msg_client_pb2
+from rabbitmq_common.codecs import (
+    DEFAULT_CODEC, ERROR_TYPE, REQUEST_BATCH_TYPE, RESPONSE_BATCH_TYPE, CodecRegistry, CompactCodec, ProtobufCodec, Request
+)
+from rabbitmq_common.sharding import DEFAULT_SHARDS, shard_for, shard_queue
+from rabbitmq_common.transport import RabbitMQTransport, UnroutableError
+
+log = logging.getLogger(__name__)
+
+CODECS = CodecRegistry(ProtobufCodec(msg_client_pb2), CompactCodec())
+
+# Поле request в msg.proto — int32
+INT32_MIN, INT32_MAX = -2 ** 31, 2 ** 31 - 1
+
+
+class ClientCore:
+    """Ядро клиента без зависимостей от Qt: соединение, пакетирование и запросы в полёте.
+
+    Работает в цикле asyncio, из которого его вызывают. Окно пользуется им
+    через RMQClient, а генератор нагрузки и тесты — напрямую.
+    """
+
+    def __init__(self, client_uuid, exchange, batch_linger=DEFAULT_BATCH_LINGER, batch_size=DEFAULT_BATCH_SIZE,
+                 timeout_response=DEFAULT_TIMEOUT_RESPONSE, max_in_flight=DEFAULT_MAX_IN_FLIGHT,
+                 codec=DEFAULT_CODEC, shards=DEFAULT_SHARDS, inflight=None, on_error=None, transport_factory=RabbitMQTransport):
+        self.client_uuid = client_uuid
+        self.exchange = exchange
+        # Все запросы клиента идут в один шард, поэтому их порядок сохраняется
+        self.routing_key = shard_queue(exchange, shard_for(client_uuid, shards), shards)
+        self.batch_linger = batch_linger
+        self.batch_size = batch_size
+        self.timeout_response = timeout_response
+        self.max_in_flight = max_in_flight
+        self.codec = CODECS.by_name(codec)
+        # Сколько сообщений ушло кодеком по умолчанию, потому что выбранный не подошёл
+        self.codec_fallbacks = 0
+        self.inflight = inflight if inflight is not None else InflightTable()
+        self.on_error = on_error if on_error is not None else log.error
+        self.transport_factory = transport_factory
+        self.transport = None
+        self.closed = asyncio.Event()
+        self._consumer_tag = None
+        self._batches = {}
+        # Таймер ожидания каждой копящейся пачки, ключ — задержка запросов пачки
+        self._batch_timers = {}
+        self._tasks = set()
+        self._expiry_timer = None
+        self._expiry_at = None
+
+    @classmethod
+    def from_settings(cls, settings, **kwargs):
+        return cls(
+            settings.client_uuid,
+            settings.exchange,
+            batch_linger=settings.batch_linger,
+            batch_size=settings.batch_size,
+            timeout_response=settings.timeout_response,
+            max_in_flight=settings.max_in_flight,
+            codec=settings.codec,
+            shards=settings.shards,
+            **kwargs
+        )
+
+    def apply_settings(self, settings):
+        """Применяет настройки, для которых не нужно переподключаться."""
+        self.batch_linger = settings.batch_linger
+        self.batch_size = settings.batch_size
+        self.timeout_response = settings.timeout_response
+        self.max_in_flight = settings.max_in_flight
+        self.codec = CODECS.by_name(settings.codec)
+
+    @property
+    def is_connected(self):
+        return self._consumer_tag is not None and not self.transport.is_closed
+
+    async def connect(self, host, port, login, password, timeout=None):
+        """Подключается и объявляет очереди; при ошибке после подключения закрывает соединение.
+
+        Иначе полуоткрытое соединение держало бы эксклюзивную очередь ответов,
+        и каждая следующая попытка подключения падала бы на ней же.
+        """
+        self.transport = self.transport_factory()
+        await self.transport.connect(host, port, login, password, timeout=timeout)
+        try:
+            self.transport.add_close_callback(self._on_connection_closed)
+            await self.setup_channel()
+        except BaseException:
+            await self.transport.close()
+            self._consumer_tag = None
+            raise
+        self.schedule_expiry()
+
+    async def setup_channel(self):
+        """Объявляет обменник запросов и эксклюзивную очередь ответов этого клиента."""
+        await self.transport.declare_exchange(self.exchange)
+        log.info("Exchange '%s' declared.", self.exchange)
+
+        queue = await self.transport.declare_queue(self.client_uuid, exclusive=True, auto_delete=True)
+        self._consumer_tag = await self.transport.consume(queue, self.on_response, no_ack=True)
+
+    async def close(self):
+        """Закрывает соединение; запросы в полёте остаются в таблице до ответа или таймаута."""
+        try:
+            if self.transport is not None and not self.transport.is_closed:
+                if self._consumer_tag:
+                    await self.transport.cancel(self._consumer_tag)
+                await self.transport.close()
+                log.info("Old connection closed.")
+        except Exception as e:
+            log.error("Error while closing old connection: %s", e)
+        finally:
+            self.transport = None
+            self._consumer_tag = None
+            if self._expiry_timer is not None:
+                self._expiry_timer.cancel()
+            self._expiry_timer = None
+            self._expiry_at = None
+            for task in list(self._tasks):
+                task.cancel()
+            self.closed.set()
+
+    def _on_connection_closed(self):
+        self.closed.set()
+
+    def submit(self, request_id, value, delay, operation, callback):
+        """Отправляет запрос; callback(response, error) будет вызван ровно один раз."""
+        if len(self.inflight) >= self.max_in_flight:
+            raise RuntimeError(f"Too many requests in flight: {len(self.inflight)}")
+        if not self.is_connected:
+            raise ConnectionError("Channel or connection is not open.")
+
+        value = int(value)
+        if not INT32_MIN <= value <= INT32_MAX:
+            raise ValueError(f"Value out of int32 range: {value}")
+        request = Request(self.client_uuid, request_id, delay, value, operation)
+        # Ждём не дольше заданной задержки плюс таймаут ответа сервера
+        self.inflight.add(request_id, delay + self.timeout_response, callback)
+        self.enqueue_request(request)
+        self.schedule_expiry()
+
+    def resend(self, request_id, value, delay, operation):
+        """Публикует запрос в полёте ещё раз, не меняя его срок ожидания и обработчик.
+
+        Нужно, когда публикация могла потеряться вместе с соединением. На
+        повтор сервер отвечает из кэша повторов по request_id, а лишний
+        ответ клиент пропустит как ответ на неизвестный запрос.
+        """
+        if request_id not in self.inflight:
+            raise KeyError(f"Request {request_id} is not in flight")
+        if not self.is_connected:
+            raise ConnectionError("Channel or connection is not open.")
+        self.enqueue_request(Request(self.client_uuid, request_id, delay, int(value), operation))
+
+    def request(self, value, delay=0, operation='double'):
+        """Отправляет запрос и возвращает future с числом-ответом или TimeoutError."""
+        future = asyncio.get_running_loop().create_future()
+
+        def done(response, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(response.response)
+
+        self.submit(str(uuid.uuid4()), value, delay, operation, done)
+        return future
+
+    def cancel(self, request_id):
+        """Перестаёт ждать ответ на запрос; поздний ответ будет проигнорирован."""
+        return self.inflight.cancel(request_id)
+
+    def enqueue_request(self, request):
+        """Копит запросы в пакет (по алгоритму Нейгла) и отправляет его по таймеру или по размеру.
+
+        В один пакет попадают только запросы с одинаковой задержкой.
+        """
+        if self.batch_linger <= 0:
+            self.publish_requests([request])
+            return
+
+        delay = request.process_time_in_seconds
+        batch = self._batches.setdefault(delay, [])
+        batch.append(request)
+
+        if len(batch) >= self.batch_size:
+            self.flush_batch(delay)
+        elif len(batch) == 1:
+            self._batch_timers[delay] = asyncio.get_running_loop().call_later(
+                self.batch_linger, self.flush_batch, delay
+            )
+
+    def flush_batch(self, delay):
+        # Таймер отправленной по размеру пачки иначе сработал бы на следующей и отправил её раньше срока
+        timer = self._batch_timers.pop(delay, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._batches.pop(delay, None)
+        if batch:
+            self.publish_requests(batch)
+
+    def publish_requests(self, requests):
+        """Отправляет один запрос как Request, несколько — как RequestBatch.
+
+        Если выбранный кодек не может закодировать запросы (например,
+        request_id не UUID для compact), сообщение уходит кодеком по умолчанию.
+        """
+        codec = self.codec
+        try:
+            body = self._encode(codec, requests)
+        except ValueError as e:
+            # Причина обычно одна на все сообщения, поэтому в журнал — только первый случай
+            if not self.codec_fallbacks:
+                log.warning("Codec %s cannot encode requests, sending them as %s: %s",
+                            codec.name, CODECS.default.name, e)
+            self.codec_fallbacks += 1
+            codec = CODECS.default
+            body = self._encode(codec, requests)
+
+        request_ids = [request.request_id for request in requests]
+        if len(requests) == 1:
+            publish = self._publish(body, request_ids, requests[0].request_id, content_type=codec.content_type)
+        else:
+            publish = self._publish(body, request_ids, str(uuid.uuid4()), REQUEST_BATCH_TYPE, codec.content_type)
+
+        task = asyncio.get_running_loop().create_task(publish)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    @staticmethod
+    def _encode(codec, requests):
+        if len(requests) == 1:
+            return codec.encode_request(requests[0])
+        return codec.encode_request_batch(requests)
+
+    async def _publish(self, body, request_ids, correlation_id, message_type=None, content_type=None):
+        try:
+            await self.transport.publish(
+                self.exchange, self.routing_key, body,
+                correlation_id=correlation_id, reply_to=self.client_uuid, type=message_type,
+                content_type=content_type, mandatory=True
+            )
+        except UnroutableError as e:
+            # Нет очереди шарда: обычно [rabbitmq] shards клиента и сервера не совпадают.
+            # Ответа не будет, поэтому запросы завершаются сразу, а не по таймауту
+            self.on_error(f"Request queue '{self.routing_key}' does not exist, check [rabbitmq] shards: {e}")
+            for request_id in request_ids:
+                self.inflight.fail(request_id, e)
+        except Exception as e:
+            # Запросы этого сообщения останутся в таблице и завершатся по таймауту
+            self.on_error(f"Error sending request: {e}")
+
+    async def on_response(self, message):
+        """Сопоставляет ответы с запросами в полёте по request_id."""
+        try:
+            if message.type == ERROR_TYPE:
+                error = message.body.decode(errors='replace')
+                log.warning("Server rejected request ID %s: %s", message.correlation_id, error)
+                self.inflight.fail(message.correlation_id, RuntimeError(error))
+                return
+
+            codec = CODECS.find(message.content_type)
+            if message.type == RESPONSE_BATCH_TYPE:
+                responses = codec.decode_response_batch(message.body)
+            else:
+                responses = [codec.decode_response(message.body)]
+
+            for response in responses:
+                log.debug("Parsed response: %s for request ID: %s", response.response, response.request_id)
+                if self.inflight.resolve(response.request_id, response) is None:
+                    log.warning("Response for unknown or expired request ID: %s", response.request_id)
+
+        except Exception as e:
+            self.on_error(f"Error processing response: {e}")
+
+    def schedule_expiry(self):
+        """Ставит таймер цикла на ближайший срок ожидания среди запросов в полёте."""
+        deadline = self.inflight.next_deadline()
+        if deadline is None or self.transport is None:
+            return
+        if self._expiry_at is not None and self._expiry_at <= deadline:
+            return
+
+        if self._expiry_timer is not None:
+            self._expiry_timer.cancel()
+        self._expiry_at = deadline
+        self._expiry_timer = asyncio.get_running_loop().call_later(
+            max(0, deadline - self.inflight.clock()), self.expire_requests
+        )
+
+    def expire_requests(self):
+        self._expiry_timer = None
+        self._expiry_at = None
+        self.inflight.expire()
+        self.schedule_expiry()
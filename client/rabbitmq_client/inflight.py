@@ -0,0 +1,95 @@
+import heapq
+import time
+
+
+class InflightRequest:
+    """Запрос, ожидающий ответа: свой срок ожидания и свой обработчик результата."""
+
+    __slots__ = ('request_id', 'deadline', 'callback', 'sent_at', 'done')
+
+    def __init__(self, request_id, deadline, callback, sent_at):
+        self.request_id = request_id
+        self.deadline = deadline
+        self.callback = callback
+        self.sent_at = sent_at
+        self.done = False
+
+
+class InflightTable:
+    """Таблица запросов в полёте, ключ — correlation_id (он же request_id).
+
+    Ответы сопоставляются с запросами в любом порядке. Сроки ожидания
+    хранятся в куче, поэтому просроченные запросы находятся без обхода
+    всей таблицы. callback(response, error) вызывается ровно один раз:
+    с ответом, с TimeoutError или с ошибкой отправки.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self._requests = {}
+        self._deadlines = []
+
+    def __len__(self):
+        return len(self._requests)
+
+    def __contains__(self, request_id):
+        return request_id in self._requests
+
+    def add(self, request_id, timeout, callback):
+        if request_id in self._requests:
+            raise KeyError(f"Request {request_id} is already in flight")
+        now = self.clock()
+        entry = InflightRequest(request_id, now + timeout, callback, now)
+        self._requests[request_id] = entry
+        heapq.heappush(self._deadlines, (entry.deadline, request_id))
+        return entry
+
+    def resolve(self, request_id, response):
+        """Завершает запрос ответом; возвращает запись или None, если запрос неизвестен или просрочен."""
+        entry = self._requests.pop(request_id, None)
+        if entry is None:
+            return None
+        entry.done = True
+        entry.callback(response, None)
+        return entry
+
+    def fail(self, request_id, error):
+        """Завершает запрос ошибкой error; возвращает запись или None, если запрос уже завершён."""
+        entry = self._requests.pop(request_id, None)
+        if entry is None:
+            return None
+        entry.done = True
+        entry.callback(None, error)
+        return entry
+
+    def cancel(self, request_id):
+        """Забывает запрос, не вызывая обработчик; поздний ответ на него будет проигнорирован."""
+        entry = self._requests.pop(request_id, None)
+        if entry is not None:
+            entry.done = True
+        return entry
+
+    def next_deadline(self):
+        self._discard_finished()
+        return self._deadlines[0][0] if self._deadlines else None
+
+    def expire(self, now=None):
+        """Завершает с TimeoutError все запросы, срок которых истёк к моменту now."""
+        now = self.clock() if now is None else now
+        expired = []
+        while self._deadlines and self._deadlines[0][0] <= now:
+            _, request_id = heapq.heappop(self._deadlines)
+            entry = self._requests.get(request_id)
+            if entry is None or entry.deadline > now:
+                continue
+            del self._requests[request_id]
+            entry.done = True
+            expired.append(entry)
+
+        for entry in expired:
+            entry.callback(None, TimeoutError(f"No response for request {entry.request_id}"))
+        return expired
+
+    def _discard_finished(self):
+        while self._deadlines and self._deadlines[0][1] not in self._requests:
+            heapq.heappop(self._deadlines)
@@ -0,0 +1,174 @@
+"""Генератор нагрузки: python -m rabbitmq_client.loadgen -n 10000 --concurrency 200
+
+Отправляет запросы через ClientCore без окна и печатает пропускную
+способность и перцентили задержки текстом или в JSON.
+"""
+import argparse
+import asyncio
+import json
+import sys
+import uuid
+from pathlib import Path
+from rabbitmq_client.config import load_client_settings
+from rabbitmq_client.core import ClientCore
+from rabbitmq_common.settings import ConfigFile
+
+DEFAULT_CONFIG = Path(__file__).parent.parent / 'client_config.ini'
+DEFAULT_CONCURRENCY = 100
+PERCENTILES = (50, 90, 99)
+
+
+def percentile(sorted_values, q):
+    """Перцентиль q (0..100) по методу ближайшего ранга; sorted_values отсортирован."""
+    if not sorted_values:
+        return None
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies, timeouts, errors, elapsed):
+    """Сводка прогона; задержки в секундах, в отчёте — в миллисекундах."""
+    latencies = sorted(latencies)
+    ok = len(latencies)
+    latency_ms = {f'p{q}': _ms(percentile(latencies, q)) for q in PERCENTILES}
+    latency_ms['max'] = _ms(latencies[-1] if latencies else None)
+    return {
+        'requests': ok + timeouts + errors,
+        'ok': ok,
+        'timeouts': timeouts,
+        'errors': errors,
+        'elapsed_seconds': round(elapsed, 3),
+        'throughput': round(ok / elapsed, 1) if elapsed > 0 else 0.0,
+        'latency_ms': latency_ms,
+    }
+
+
+def _ms(value):
+    return None if value is None else round(value * 1000, 3)
+
+
+def format_summary(summary):
+    latency = summary['latency_ms']
+    lines = [
+        f"requests:   {summary['requests']} (ok {summary['ok']}, "
+        f"timeouts {summary['timeouts']}, errors {summary['errors']})",
+        f"elapsed:    {summary['elapsed_seconds']} s",
+        f"throughput: {summary['throughput']} req/s",
+        "latency ms: " + ", ".join(f"{name} {value}" for name, value in latency.items()),
+    ]
+    if 'codec' in summary:
+        lines.append(f"codec:      {summary['codec']} (fallbacks to default: {summary['codec_fallbacks']})")
+    return '\n'.join(lines)
+
+
+async def run_load(core, total, rate=None, concurrency=None, delay=0, operation='double', value=1):
+    """Отправляет total запросов и возвращает сводку.
+
+    С rate запросы уходят по расписанию с заданной частотой (открытая модель),
+    и задержка отсчитывается от запланированного момента отправки, чтобы
+    очередь на стороне клиента не пряталась из статистики. concurrency
+    ограничивает число запросов в полёте; без rate это замкнутая модель.
+    """
+    if rate is None and concurrency is None:
+        concurrency = DEFAULT_CONCURRENCY
+
+    loop = asyncio.get_running_loop()
+    slots = asyncio.Semaphore(concurrency) if concurrency else None
+    latencies = []
+    failures = {'timeouts': 0, 'errors': 0}
+
+    async def one(scheduled_at):
+        try:
+            await core.request(value, delay, operation)
+            latencies.append(loop.time() - scheduled_at)
+        except TimeoutError:
+            failures['timeouts'] += 1
+        except Exception:
+            failures['errors'] += 1
+        finally:
+            if slots is not None:
+                slots.release()
+
+    tasks = []
+    started = loop.time()
+    for index in range(total):
+        scheduled_at = loop.time()
+        if rate:
+            scheduled_at = started + index / rate
+            if scheduled_at > loop.time():
+                await asyncio.sleep(scheduled_at - loop.time())
+        if slots is not None:
+            await slots.acquire()
+        tasks.append(asyncio.create_task(one(scheduled_at)))
+
+    await asyncio.gather(*tasks)
+    return summarize(latencies, failures['timeouts'], failures['errors'], loop.time() - started)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m rabbitmq_client.loadgen', description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--requests', type=int, default=1000, help="сколько запросов отправить")
+    parser.add_argument('--rate', type=float, help="целевая частота, запросов в секунду")
+    parser.add_argument('--concurrency', type=int, help="максимум запросов в полёте")
+    parser.add_argument('--delay', type=int, default=0, help="process_time_in_seconds каждого запроса")
+    parser.add_argument('--operation', default='double')
+    parser.add_argument('--value', type=int, default=1, help="число в запросе")
+    parser.add_argument('--config', type=Path, default=DEFAULT_CONFIG, help="файл настроек клиента")
+    parser.add_argument('--host')
+    parser.add_argument('--port', type=int)
+    parser.add_argument('--json', action='store_true', help="вывести сводку в JSON")
+    args = parser.parse_args(argv)
+    if args.requests <= 0:
+        parser.error("--requests must be positive")
+    if args.rate is not None and args.rate <= 0:
+        parser.error("--rate must be positive")
+    if args.concurrency is not None and args.concurrency <= 0:
+        parser.error("--concurrency must be positive")
+    return args
+
+
+async def main_async(args):
+    config = ConfigFile(args.config).load()
+    # Своя очередь ответов, чтобы не конфликтовать с эксклюзивной очередью окна. Имя — UUID
+    # в каноническом виде: иначе кодек compact не применим и запросы уйдут в protobuf
+    settings = load_client_settings(config)._replace(client_uuid=str(uuid.uuid4()))
+    host, port = settings.endpoints[0]
+
+    core = ClientCore.from_settings(settings)
+    core.max_in_flight = args.requests
+    await core.connect(
+        host=args.host or host,
+        port=args.port or port,
+        login=settings.user,
+        password=settings.password,
+        timeout=settings.timeout_connect
+    )
+    try:
+        summary = await run_load(
+            core, args.requests, rate=args.rate, concurrency=args.concurrency,
+            delay=args.delay, operation=args.operation, value=args.value
+        )
+        summary['codec'] = core.codec.name
+        summary['codec_fallbacks'] = core.codec_fallbacks
+        return summary
+    finally:
+        await core.close()
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    try:
+        summary = asyncio.run(main_async(args))
+    except (ConnectionError, asyncio.TimeoutError) as e:
+        print(f"Cannot connect to RabbitMQ: {e}", file=sys.stderr)
+        return 2
+    if args.json:
+        json.dump(summary, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        print(format_summary(summary))
+    return 0 if summary['ok'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
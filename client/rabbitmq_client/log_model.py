@@ -0,0 +1,112 @@
+import logging
+from collections import deque
+from datetime import datetime
+from PyQt5.QtCore import QAbstractListModel, QModelIndex, QSortFilterProxyModel, Qt, QTimer
+from PyQt5.QtGui import QColor
+from rabbitmq_client.config import DEFAULT_GUI_CAPACITY, DEFAULT_GUI_FLUSH_MS
+
+LEVEL_ROLE = Qt.UserRole + 1
+
+LEVEL_COLORS = {
+    logging.WARNING: QColor('darkorange'),
+    logging.ERROR: QColor('red'),
+    logging.CRITICAL: QColor('red'),
+}
+
+
+class EventLogModel(QAbstractListModel):
+    """Журнал событий окна в кольцевом буфере фиксированной ёмкости.
+
+    append() только кладёт событие в очередь ожидания; строки попадают в
+    модель пачкой по таймеру flush_ms, так что представление обновляется
+    не чаще одного раза за тик. Старые события вытесняются, и память не
+    растёт, сколько бы событий ни пришло.
+    """
+
+    def __init__(self, capacity=DEFAULT_GUI_CAPACITY, flush_ms=DEFAULT_GUI_FLUSH_MS, parent=None):
+        super().__init__(parent)
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self._buffer = [None] * capacity
+        self._start = 0
+        self._count = 0
+        self._pending = deque(maxlen=capacity)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(flush_ms)
+        self._timer.timeout.connect(self.flush)
+
+    def append(self, level, message, timestamp=None):
+        if timestamp is None:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        self._pending.append((timestamp, level, message))
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def flush(self):
+        """Переносит накопленные события в модель одной вставкой."""
+        self._timer.stop()
+        if not self._pending:
+            return
+
+        pending = list(self._pending)
+        self._pending.clear()
+
+        overflow = self._count + len(pending) - self.capacity
+        if overflow > 0:
+            self.beginRemoveRows(QModelIndex(), 0, overflow - 1)
+            self._start = (self._start + overflow) % self.capacity
+            self._count -= overflow
+            self.endRemoveRows()
+
+        first = self._count
+        self.beginInsertRows(QModelIndex(), first, first + len(pending) - 1)
+        for entry in pending:
+            self._buffer[(self._start + self._count) % self.capacity] = entry
+            self._count += 1
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._buffer = [None] * self.capacity
+        self._start = 0
+        self._count = 0
+        self._pending.clear()
+        self.endResetModel()
+
+    def entry(self, row):
+        return self._buffer[(self._start + row) % self.capacity]
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or not 0 <= index.row() < self._count:
+            return None
+
+        timestamp, level, message = self.entry(index.row())
+        if role == Qt.DisplayRole:
+            return f"{timestamp} - {message}"
+        if role == Qt.ForegroundRole:
+            return LEVEL_COLORS.get(level)
+        if role == LEVEL_ROLE:
+            return level
+        return None
+
+
+class LevelFilterProxyModel(QSortFilterProxyModel):
+    """Показывает только события не ниже выбранного уровня."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.min_level = logging.NOTSET
+
+    def set_min_level(self, level):
+        self.min_level = level
+        self.invalidateFilter()
+
+    def filterAcceptsRow(self, source_row, source_parent):
+        if self.min_level <= logging.NOTSET:
+            return True
+        return self.sourceModel().entry(source_row)[1] >= self.min_level
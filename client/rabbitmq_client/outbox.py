@@ -0,0 +1,99 @@
+import sqlite3
+
+DEFAULT_PATH = 'client_outbox.sqlite3'
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_REPLAY_RATE = 200.0
+DEFAULT_COMMIT_INTERVAL = 0.05
+
+
+def load_outbox_config(config):
+    """Читает параметры журнала неотправленных запросов из секции [outbox]."""
+    enabled = config.getboolean('outbox', 'enabled', fallback=True)
+    path = config.get('outbox', 'path', fallback=DEFAULT_PATH)
+    max_size = config.getint('outbox', 'max_size', fallback=DEFAULT_MAX_SIZE)
+    replay_rate = config.getfloat('outbox', 'replay_rate', fallback=DEFAULT_REPLAY_RATE)
+    commit_interval = config.getfloat('outbox', 'commit_ms', fallback=DEFAULT_COMMIT_INTERVAL * 1000) / 1000
+
+    if max_size < 1:
+        raise ValueError("outbox.max_size must be at least 1")
+    if replay_rate <= 0:
+        raise ValueError("outbox.replay_rate must be positive")
+    if commit_interval < 0:
+        raise ValueError("outbox.commit_ms must not be negative")
+
+    return enabled, path, max_size, replay_rate, commit_interval
+
+
+class Outbox:
+    """Журнал запросов, отправленных без соединения, в SQLite (WAL).
+
+    Запросы хранятся в порядке поступления и уникальны по request_id:
+    повторная запись того же запроса игнорируется. Запрос остаётся в
+    журнале, пока на него не придёт ответ или таймаут, поэтому после сбоя
+    он будет отправлен ещё раз. put() и remove() не
+    фиксируют транзакцию сами — commit() вызывается пачкой, поэтому fsync
+    происходит один раз на пачку, а не на каждый запрос. После перезапуска
+    журнал открывается без чтения записей: считается только их число.
+    """
+
+    def __init__(self, path, max_size=DEFAULT_MAX_SIZE):
+        self.path = str(path)
+        self.max_size = max_size
+        self.db = sqlite3.connect(self.path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=FULL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS outbox ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " request_id TEXT NOT NULL UNIQUE,"
+            " operation TEXT NOT NULL,"
+            " value INTEGER NOT NULL,"
+            " delay INTEGER NOT NULL)"
+        )
+        self.db.commit()
+        self._count = self.db.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def __len__(self):
+        return self._count
+
+    def put(self, request_id, operation, value, delay):
+        """Добавляет запрос в конец журнала; False, если запрос с таким request_id уже есть."""
+        if self._count >= self.max_size:
+            raise RuntimeError(f"Outbox is full: {self._count} requests")
+        cursor = self.db.execute(
+            "INSERT OR IGNORE INTO outbox (request_id, operation, value, delay) VALUES (?, ?, ?, ?)",
+            (request_id, operation, value, delay)
+        )
+        if cursor.rowcount == 0:
+            return False
+        self._count += 1
+        return True
+
+    def peek(self, limit):
+        """Самые старые limit запросов: [(request_id, operation, value, delay), ...]."""
+        return [row[1:] for row in self.read(0, limit)]
+
+    def read(self, after, limit):
+        """До limit запросов с номером больше after: [(seq, request_id, operation, value, delay), ...]."""
+        return self.db.execute(
+            "SELECT seq, request_id, operation, value, delay FROM outbox WHERE seq > ? ORDER BY seq LIMIT ?",
+            (after, limit)
+        ).fetchall()
+
+    def remove(self, request_id):
+        """Удаляет запрос из журнала; True, если он там был."""
+        cursor = self.db.execute("DELETE FROM outbox WHERE request_id = ?", (request_id,))
+        self._count -= cursor.rowcount
+        return cursor.rowcount > 0
+
+    @property
+    def dirty(self):
+        return self.db.in_transaction
+
+    def commit(self):
+        if self.db.in_transaction:
+            self.db.commit()
+
+    def close(self):
+        self.commit()
+        self.db.close()
@@ -1,38 +1,47 @@
-import configparser
 from pathlib import Path
 from PyQt5.QtWidgets import (
     QMainWindow, QVBoxLayout, QWidget, QLabel,
-    QLineEdit, QPushButton, QTextEdit, QProgressBar
+    QLineEdit, QPushButton, QListView, QProgressBar, QComboBox, QCheckBox
 )
 from PyQt5.QtCore import QTimer, Qt, QFileSystemWatcher, pyqtSignal, pyqtSlot
 from datetime import datetime
-from rabbitmq_client.config_params import ConfigEditor
+from rabbitmq_client.log_model import EventLogModel, LevelFilterProxyModel
 import logging
 from PyQt5.QtCore import QThread, pyqtSlot
-from rabbitmq_client.client import RMQClient
+from rabbitmq_client.client import (
+    RMQClient, EVENT_CACHE, EVENT_ERROR, EVENT_FAILED, EVENT_QUEUED, EVENT_RESPONSE, EVENT_TIMEOUT
+)
 
 log = logging.getLogger(__name__)
 
 MAX_NUMBER = 2147483647
 
+# Операции, которые умеет выполнять сервер
+OPERATIONS = ["double", "count_primes"]
+
+# Фильтр журнала окна: подпись и минимальный уровень
+LOG_FILTERS = [
+    ("Все события", logging.NOTSET),
+    ("Предупреждения и ошибки", logging.WARNING),
+    ("Только ошибки", logging.ERROR),
+]
+
 class Window(QMainWindow):
     request_processed = pyqtSignal()
-    def __init__(self):
+    def __init__(self, config_file='client_config.ini'):
         super().__init__()
 
-        self.client = RMQClient()
+        self.client = RMQClient(config_file)
         self.thread = QThread()
 
         self.client.moveToThread(self.thread)
         self.thread.started.connect(self.client.run)
 
-        self.initUI()
-        
-        self.thread.start()
+        self.config_path = Path(__file__).parent.parent / config_file
 
-        self.config_path = Path(__file__).parent.parent / 'client_config.ini'
-        self.config_file = configparser.ConfigParser()
-        self.config_file.read(self.config_path)
+        self.initUI()
+        self.set_logging_level()
+        self._client_started = False
 
         self.response_data = None
 
@@ -40,24 +49,21 @@ class Window(QMainWindow):
         self.setGeometry(100, 100, 400, 600) 
 
         self.request_processed.connect(self.on_request_processed)
-        self.client.received_response.connect(self.display_response)
-        self.client.error_signal.connect(self.handle_error_signal)
+        self.client.ui_events_signal.connect(self.on_client_events)
         self.client.server_ready_signal.connect(self.on_server_ready)
         self.client.server_unavailable_signal.connect(self.on_server_unavailable)
+        self.client.settings_changed_signal.connect(self.on_settings_changed)
 
         self.request_in_progress = False
         self.process_time_in_seconds = 0  
         self.config_editor = None
 
-        self.request_cancelled = False 
+        self.current_request_id = None
         self.processing_request = False 
 
         self.file_watcher = QFileSystemWatcher([str(self.config_path)])
-        self.file_watcher.fileChanged.connect(self.on_config_changed)
-
-        self.timeout_timer = QTimer()
-        self.timeout_timer.setSingleShot(True)
-        self.timeout_timer.timeout.connect(self.on_timeout)
+        # Клиент сам сравнит содержимое и пересоздаст только затронутые компоненты
+        self.file_watcher.fileChanged.connect(self.client.reload_config_and_reconnect, Qt.DirectConnection)
 
         self.process_timer = QTimer()
         self.process_timer.timeout.connect(self.update_progress)
@@ -70,6 +76,9 @@ class Window(QMainWindow):
 
         self.label = QLabel("Введите число:")
         self.input_field = QLineEdit()
+        self.operation_input = QComboBox()
+        self.operation_input.addItems(OPERATIONS)
+        self.bypass_cache_input = QCheckBox("Не брать ответ из кэша")
         self.send_button = QPushButton("Отправить")
 
         self.label2 = QLabel("Установите время задержки (секунды):")
@@ -78,8 +87,27 @@ class Window(QMainWindow):
 
         self.cancel_button = QPushButton("Отмена текущего запроса")
         self.cancel_button.setVisible(False)
-        self.log_widget = QTextEdit()
-        self.log_widget.setReadOnly(True)
+
+        # Журнал в кольцевом буфере: QListView запрашивает только видимые строки
+        self.log_model = EventLogModel(
+            capacity=self.client.settings.gui_capacity,
+            flush_ms=self.client.settings.gui_flush_ms,
+            parent=self
+        )
+        self.log_filter = LevelFilterProxyModel(self)
+        self.log_filter.setSourceModel(self.log_model)
+        self.log_widget = QListView()
+        self.log_widget.setModel(self.log_filter)
+        self.log_widget.setUniformItemSizes(True)
+        self.log_widget.setWordWrap(False)
+        self.log_model.rowsAboutToBeInserted.connect(self.remember_log_scroll)
+        self.log_model.rowsInserted.connect(self.follow_log_tail)
+        self._log_at_bottom = True
+
+        self.log_level_filter = QComboBox()
+        for title, level in LOG_FILTERS:
+            self.log_level_filter.addItem(title, level)
+        self.log_level_filter.currentIndexChanged.connect(self.on_log_filter_changed)
 
         self.config_button = QPushButton("Настройки клиента")
 
@@ -90,6 +118,8 @@ class Window(QMainWindow):
 
         layout.addWidget(self.label)
         layout.addWidget(self.input_field)
+        layout.addWidget(self.operation_input)
+        layout.addWidget(self.bypass_cache_input)
         layout.addWidget(self.send_button)
         
         layout.addWidget(self.label2)
@@ -98,6 +128,7 @@ class Window(QMainWindow):
 
         layout.addWidget(self.cancel_button)
         layout.addWidget(self.config_button)  
+        layout.addWidget(self.log_level_filter)
         layout.addWidget(self.log_widget)
 
         layout.addWidget(self.progress_bar)
@@ -113,6 +144,18 @@ class Window(QMainWindow):
         self.cancel_button.clicked.connect(self.cancel_request)
         self.config_button.clicked.connect(self.open_config_editor)
 
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not self._client_started:
+            self._client_started = True
+            # Таймер нулевой длительности срабатывает после уже поставленных
+            # в очередь событий отрисовки, поэтому подключение начнётся после первого кадра
+            QTimer.singleShot(0, self.start_client)
+
+    def start_client(self):
+        """Запускает поток клиента и подключение к RabbitMQ."""
+        self.thread.start()
+
     def closeEvent(self, event):
         self.client.stop()
         self.thread.quit()
@@ -124,63 +167,60 @@ class Window(QMainWindow):
 
     def notify_user(self, message, success=True):
         """Уведомить пользователя о текущем статусе."""
+        self.set_status(message, success)
+        self.log_event(message, logging.INFO if success else logging.ERROR)
+
+    def set_status(self, message, success=True):
         self.status_label.setStyleSheet("color: green;" if success else "color: red;")
         self.status_label.setText(message)
-        self.log_event(message)
 
-    def log_event(self, event_message):
+    def log_event(self, event_message, level=logging.INFO):
+        """Запись события в журнал окна; строки добавляются пачкой по таймеру модели."""
         timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        log_message = f"{timestamp} - {event_message}"
-        
-        if log_message not in self.log_widget.toPlainText():
-            log.debug(log_message)
-            self.log_widget.append(log_message)
+
+        log.debug(f"{timestamp} - {event_message}")
+        self.log_model.append(level, event_message, timestamp)
+
+    @pyqtSlot(int)
+    def on_log_filter_changed(self, index):
+        self.log_filter.set_min_level(self.log_level_filter.itemData(index))
+
+    def remember_log_scroll(self, *args):
+        scroll_bar = self.log_widget.verticalScrollBar()
+        self._log_at_bottom = scroll_bar.value() >= scroll_bar.maximum()
+
+    def follow_log_tail(self, *args):
+        """Прокручивает журнал к новым событиям, если пользователь не листает историю."""
+        if self._log_at_bottom:
+            self.log_widget.scrollToBottom()
 
     def open_config_editor(self):
         """Метод для открытия редактора конфигурации."""
+        # Диалог и его зависимости нужны только тем, кто открывает настройки
+        from rabbitmq_client.config_params import ConfigEditor
+
         self.config_editor = ConfigEditor(self.config_path, read_only=self.processing_request)
-        self.config_editor.config_saved.connect(self.client.reload_config_and_reconnect, Qt.QueuedConnection)
-        self.config_editor.config_saved.connect(self.on_config_changed) 
+        self.config_editor.config_saved.connect(self.client.reload_config_and_reconnect, Qt.DirectConnection)
         self.config_editor.setWindowModality(Qt.ApplicationModal)
         self.config_editor.show()
             
     def set_logging_level(self):
-        """Настроить уровень логирования в зависимости от конфигурации."""
-        level = self.config_file.get('logging', 'level', fallback='INFO').upper()
-        levels = {
-            'DEBUG': logging.DEBUG,
-            'INFO': logging.INFO,
-            'WARNING': logging.WARNING,
-            'ERROR': logging.ERROR,
-            'CRITICAL': logging.CRITICAL
-        }
-
-        log.setLevel(levels.get(level, logging.INFO))
-
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-
-        log.handlers = []
-        log.addHandler(handler)
-
-    @pyqtSlot()
-    def on_config_changed(self):
-        """Обработчик изменений в конфигурационном файле."""
-        self.config_file.read(self.config_path)
-        try:
-            self.timeout_response = self.config_file.getint('server', 'timeout_response')
+        """Настроить уровень логирования по настройкам клиента."""
+        log.setLevel(self.client.settings.log_level)
+
+        if not log.handlers:
+            handler = logging.StreamHandler()
+            formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+            handler.setFormatter(formatter)
+            log.addHandler(handler)
+
+    @pyqtSlot(object)
+    def on_settings_changed(self, components):
+        """Применяет настройки, которые клиент уже перечитал; components — затронутые компоненты."""
+        if 'logging' in components:
             self.set_logging_level()
-
-        except ValueError as e:
-            self.log_event(f"Ошибка при чтении таймаутов: {e}")
-
-    def log_event(self, event_message):
-        """Запись события в лог с учетом уровня логирования."""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-
-        log.debug(f"{timestamp} - {event_message}")
-        self.log_widget.append(f"{timestamp} - {event_message}")
+        if 'gui' in components:
+            self.log_event("Размер и частота обновления журнала окна применятся после перезапуска", logging.INFO)
 
     @pyqtSlot()
     def on_server_ready(self):
@@ -194,11 +234,62 @@ class Window(QMainWindow):
         self.notify_user("Сервер недоступен.", success=False)
         self.unlock_ui() 
 
-    @pyqtSlot(str)
-    def handle_error_signal(self, error_message):
-        """Обработка ошибок."""
-        self.notify_user(error_message, success=False)
-        self.log_event(f"Ошибка: {error_message}")
+    @pyqtSlot(list)
+    def on_client_events(self, events):
+        """Обрабатывает пачку событий клиента за один проход.
+
+        Каждое событие попадает в журнал, а строка статуса, прогресс и
+        блокировка интерфейса обновляются один раз по итогу всей пачки.
+        """
+        status = None
+        request_finished = False
+
+        for kind, *args in events:
+            if kind == EVENT_RESPONSE:
+                request_id, response = args
+                if request_id != self.current_request_id:
+                    log.debug(f"Ответ на неактуальный запрос {request_id} проигнорирован")
+                    continue
+                self.current_request_id = None
+                self.response_data = response
+                status = (f"Ответ от сервера: {response}", True)
+                request_finished = True
+            elif kind == EVENT_TIMEOUT:
+                if args[0] != self.current_request_id:
+                    continue
+                self.current_request_id = None
+                status = ("Время ожидания истекло. Сервер может быть недоступен.", False)
+                request_finished = True
+            elif kind == EVENT_FAILED:
+                request_id, error = args
+                if request_id != self.current_request_id:
+                    continue
+                self.current_request_id = None
+                status = (f"Запрос не доставлен: {error}", False)
+                request_finished = True
+            elif kind == EVENT_ERROR:
+                status = (f"Ошибка: {args[0]}", False)
+            elif kind == EVENT_QUEUED:
+                request_id, queued = args
+                message = f"Нет соединения: запрос сохранён и будет отправлен после подключения (в очереди: {queued})"
+                self.log_event(message, logging.WARNING)
+                if request_id == self.current_request_id:
+                    status = (message, False)
+                continue
+            elif kind == EVENT_CACHE:
+                hit, stats = args
+                self.log_event(f"Кэш клиента: {'попадание' if hit else 'промах'} ({stats})")
+                continue
+            else:
+                continue
+
+            message, success = status
+            self.log_event(message, logging.INFO if success else logging.ERROR)
+
+        if status is not None:
+            self.set_status(*status)
+        if request_finished:
+            self.finish_request()
 
     def set_delay(self):
         """Устанавливает задержку обработки на сервере, заданную пользователем."""
@@ -212,7 +303,7 @@ class Window(QMainWindow):
             self.log_event(f"Установлена задержка: {self.process_time_in_seconds} сек.")
         except ValueError:
             self.label2.setText("Введите корректное число для задержки.")
-            self.log_event("Попытка установить некорректное значение задержки.")
+            self.log_event("Попытка установить некорректное значение задержки.", logging.WARNING)
 
     def start_timer(self):
         if self.process_time_in_seconds == 0:
@@ -226,10 +317,6 @@ class Window(QMainWindow):
             self.timer_label.setText(f"Оставшееся время: {self.process_time_in_seconds} сек.")
             self.process_timer.start(1000)  
 
-        self.timeout_timer.setSingleShot(True)
-        self.timeout_timer.start(self.timeout_response * 1000)
-
- 
     @pyqtSlot()
     def update_progress(self):
         """Обновляет прогресс-бар и отображение оставшегося времени."""
@@ -240,13 +327,6 @@ class Window(QMainWindow):
         else:
             self.process_timer.stop()
 
-    @pyqtSlot()
-    def on_timeout(self):
-        """Обрабатывает истечение времени ожидания ответа от сервера."""
-        self.notify_user("Время ожидания истекло. Сервер может быть недоступен.", success=False)
-        self.unlock_ui()
-        self.request_processed.emit()
-
     def sending_request(self):
         """Отправляет запрос."""
         if not self.client._running:
@@ -268,40 +348,27 @@ class Window(QMainWindow):
             return
         
         delay = self.process_time_in_seconds if self.process_time_in_seconds > 0 else 0
-        self.log_event(f"Отправка запроса с числом: {number}")
+        operation = self.operation_input.currentText()
+        self.log_event(f"Отправка запроса {operation} с числом: {number}")
         self.processing_request = True
-        self.client.send_request_signal.emit(str(number), delay)
+        use_cache = not self.bypass_cache_input.isChecked()
+        self.current_request_id = self.client.submit_request(str(number), delay, operation, use_cache)
         self.start_timer()
         self.lock_ui()
 
-    @pyqtSlot(int)
-    def display_response(self, response):
-        """Сохраняет и отображает ответ от сервера."""
-        if self.request_cancelled:
-            self.request_cancelled = False
-            return 
-
-        log.debug(f"Получен ответ от сервера: {response}")
-        
-        if response is None:
-            self.notify_user("Ответ от сервера не получен. Сервер может быть недоступен.", success=False)
-            self.unlock_ui()
-        else:    
-            self.response_data = response
-            self.notify_user(f"Ответ от сервера: {self.response_data}", success=True)
-            self.timeout_timer.stop()
-            self.process_timer.stop()
-            self.timer_label.setText("Оставшееся время: 0 сек.")
-            self.progress_bar.setValue(0)
-            self.unlock_ui()
-        
+    def finish_request(self):
+        """Сбрасывает прогресс и разблокирует интерфейс после ответа или таймаута."""
+        self.process_timer.stop()
+        self.timer_label.setText("Оставшееся время: 0 сек.")
+        self.progress_bar.setValue(0)
         self.request_processed.emit()
 
     @pyqtSlot(bool)
     def cancel_request(self):
         """Отмена текущего запроса."""
-        self.timeout_timer.stop()
-        self.request_cancelled = True
+        if self.current_request_id is not None:
+            self.client.cancel_request_signal.emit(self.current_request_id)
+            self.current_request_id = None
         self.processing_request = False
         self.process_timer.stop()
         self.notify_user("Запрос отменен.", success=False)
@@ -331,6 +398,8 @@ class Window(QMainWindow):
     def set_ui_state(self, enabled):
         self.send_button.setEnabled(enabled)
         self.input_field.setEnabled(enabled)
+        self.operation_input.setEnabled(enabled)
+        self.bypass_cache_input.setEnabled(enabled)
         self.set_delay_button.setEnabled(enabled)
         self.input_field2.setEnabled(enabled)
         self.cancel_button.setVisible(not enabled)
\ No newline at end of file
@@ -0,0 +1,47 @@
+import configparser
+import pytest
+from rabbitmq_client.cache import ResponseCache, load_cache_config
+from tests.conftest import FakeClock
+
+
+def test_cache_is_keyed_by_operation_and_value():
+    cache = ResponseCache(max_size=10, ttl=60)
+    cache.put('double', 2, 4)
+    assert cache.get('double', 2) == 4
+    assert cache.get('count_primes', 2) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+    assert cache.hit_rate == 0.5
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_size=2, ttl=60)
+    cache.put('double', 1, 2)
+    cache.put('double', 2, 4)
+    cache.get('double', 1)
+    cache.put('double', 3, 6)
+    assert cache.get('double', 2) is None
+    assert cache.get('double', 1) == 2
+    assert len(cache) == 2
+
+
+def test_cache_entries_expire():
+    clock = FakeClock()
+    cache = ResponseCache(max_size=10, ttl=5, clock=clock)
+    cache.put('double', 1, 2)
+    clock.now = 5
+    assert cache.get('double', 1) is None
+    assert len(cache) == 0
+
+
+def test_cache_skips_unknown_operations():
+    cache = ResponseCache(max_size=10, ttl=60)
+    cache.put('random', 1, 42)
+    assert len(cache) == 0
+
+
+def test_load_cache_config():
+    config = configparser.ConfigParser()
+    assert load_cache_config(config) == (False, 1000, 300.0)
+    config.read_dict({'cache': {'enabled': 'true', 'ttl': '0'}})
+    with pytest.raises(ValueError):
+        load_cache_config(config)
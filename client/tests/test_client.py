@@ -0,0 +1,66 @@
+import threading
+import time
+from PyQt5.QtCore import Qt
+from rabbitmq_client.client import EVENT_ERROR, EVENT_RESPONSE, RMQClient
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+
+
+def make_client(tmp_path, ui_flush_ms):
+    config_path = tmp_path / 'client_config.ini'
+    config_path.write_text(
+        "[client]\n"
+        "uuid = u\n"
+        f"ui_flush_ms = {ui_flush_ms}\n"
+        "[outbox]\n"
+        "enabled = false\n"
+    )
+    broker = MemoryBroker()
+    client = RMQClient(str(config_path), transport_factory=lambda: MemoryTransport(broker))
+    batches = []
+    # Сигнал приходит из потока клиента, а цикла событий Qt в тестах нет
+    client.ui_events_signal.connect(batches.append, Qt.DirectConnection)
+    return client, batches
+
+
+def start(client):
+    thread = threading.Thread(target=client.run)
+    thread.start()
+    deadline = time.monotonic() + 2
+    while client.loop is None or not client.loop.is_running():
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+    return thread
+
+
+def test_ui_events_are_coalesced_into_one_batch(tmp_path):
+    client, batches = make_client(tmp_path, ui_flush_ms=50)
+    thread = start(client)
+    try:
+        for request_id in range(3):
+            client.post_ui_event(EVENT_RESPONSE, str(request_id), request_id)
+        deadline = time.monotonic() + 2
+        while not batches:
+            assert time.monotonic() < deadline
+            time.sleep(0.001)
+    finally:
+        client.stop()
+        thread.join(5)
+
+    assert batches[0] == [(EVENT_RESPONSE, str(i), i) for i in range(3)]
+
+
+def test_stop_flushes_pending_events_and_resets_the_flag(tmp_path):
+    # Сброс запланирован позже остановки: события отдаёт сам run()
+    client, batches = make_client(tmp_path, ui_flush_ms=10000)
+    thread = start(client)
+    client.post_ui_event(EVENT_ERROR, "before stop")
+    client.stop()
+    thread.join(5)
+    assert not thread.is_alive()
+    assert (EVENT_ERROR, "before stop") in [event for batch in batches for event in batch]
+
+    # Цикла больше нет: событие отдаётся сразу, а не копится за флагом
+    batches.clear()
+    client.post_ui_event(EVENT_ERROR, "after stop")
+    assert batches == [[(EVENT_ERROR, "after stop")]]
+
@@ -0,0 +1,203 @@
+import asyncio
+import uuid
+import pytest
+from rabbitmq_client.core import CODECS, ClientCore
+from rabbitmq_common.codecs import CONTENT_TYPES, ERROR_TYPE, REQUEST_BATCH_TYPE, RESPONSE_BATCH_TYPE, Response
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_common.transport import DEFAULT_EXCHANGE, UnroutableError
+
+
+class FakeMessage:
+    def __init__(self, body, type=None, content_type=None, correlation_id=None):
+        self.body = body
+        self.type = type
+        self.content_type = content_type
+        self.correlation_id = correlation_id
+
+
+def echo_responses(body, message_type, content_type=None):
+    """Удвоенные числа запросов сообщения, пакетом ответов в обратном порядке и тем же кодеком."""
+    codec = CODECS.find(content_type)
+    if message_type == REQUEST_BATCH_TYPE:
+        requests = codec.decode_request_batch(body)
+    else:
+        requests = [codec.decode_request(body)]
+    return codec.encode_response_batch([Response(request.request_id, request.request * 2)
+                                        for request in reversed(requests)])
+
+
+class EchoTransport:
+    """Отвечает на каждый запрос удвоенным числом."""
+
+    is_closed = False
+
+    def __init__(self, core, answer=True):
+        self.core = core
+        self.answer = answer
+        self.published = []
+
+    async def publish(self, exchange, routing_key, body, correlation_id=None, reply_to=None, type=None,
+                      content_type=None, mandatory=False):
+        self.published.append(FakeMessage(body, type, content_type))
+        if self.answer:
+            await self.core.on_response(
+                FakeMessage(echo_responses(body, type, content_type), RESPONSE_BATCH_TYPE, content_type)
+            )
+
+
+def make_core(answer=True, client_uuid='client-uuid', **kwargs):
+    core = ClientCore(client_uuid, 'bews', **kwargs)
+    core.transport = EchoTransport(core, answer)
+    core._consumer_tag = 'ctag'
+    return core
+
+
+def test_many_requests_in_flight_are_batched_and_matched():
+    async def scenario():
+        core = make_core(batch_linger=0.01, batch_size=50)
+        results = await asyncio.gather(*(core.request(i) for i in range(120)))
+        return core, results
+
+    core, results = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(120)]
+    assert len(core.transport.published) == 3
+    assert len(core.inflight) == 0
+
+
+def test_full_batch_cancels_its_linger_timer():
+    async def scenario():
+        core = make_core(answer=False, batch_linger=0.2, batch_size=2)
+        for request_id in ('a', 'b'):
+            core.submit(request_id, 1, 0, 'double', lambda response, error: None)
+        await asyncio.sleep(0.1)
+        # Следующая пачка ждёт свой полный срок, а не остаток таймера первой
+        core.submit('c', 1, 0, 'double', lambda response, error: None)
+        await asyncio.sleep(0.15)
+        sent_early = len(core.transport.published)
+        await asyncio.sleep(0.15)
+        return sent_early, len(core.transport.published)
+
+    assert asyncio.run(scenario()) == (1, 2)
+
+
+def test_request_times_out_without_response():
+    async def scenario():
+        core = make_core(answer=False, batch_linger=0, timeout_response=0.05)
+        with pytest.raises(TimeoutError):
+            await core.request(1)
+        return core
+
+    core = asyncio.run(scenario())
+    assert len(core.inflight) == 0
+
+
+def test_error_response_fails_request_without_waiting_for_timeout():
+    async def scenario():
+        core = make_core(answer=False, batch_linger=0, timeout_response=30)
+        errors = []
+        core.submit('req-1', 1, 0, 'missing', lambda response, error: errors.append(error))
+        await core.on_response(FakeMessage(b"Unknown operation 'missing'", ERROR_TYPE, correlation_id='req-1'))
+        return core, errors
+
+    core, errors = asyncio.run(scenario())
+    assert [str(error) for error in errors] == ["Unknown operation 'missing'"]
+    assert len(core.inflight) == 0
+
+
+def test_submit_requires_connection():
+    core = ClientCore('client-uuid', 'bews')
+    with pytest.raises(ConnectionError):
+        core.submit('id', 1, 0, 'double', lambda response, error: None)
+
+
+def test_core_talks_to_echo_server_over_memory_broker():
+    async def scenario():
+        broker = MemoryBroker()
+        server = MemoryTransport(broker)
+        await server.connect('localhost', 5672, 'guest', 'guest')
+        await server.declare_exchange('bews')
+        await server.declare_queue('bews', durable=True, bind_to='bews')
+
+        async def echo(delivery):
+            body = echo_responses(delivery.body, delivery.type, delivery.content_type)
+            await server.publish(DEFAULT_EXCHANGE, delivery.reply_to, body, type=RESPONSE_BATCH_TYPE,
+                                 content_type=delivery.content_type)
+            await delivery.ack()
+
+        await server.consume('bews', echo, prefetch_count=10)
+
+        core = ClientCore('client-uuid', 'bews', batch_linger=0.005, transport_factory=lambda: MemoryTransport(broker))
+        await core.connect('localhost', 5672, 'guest', 'guest')
+        results = await asyncio.gather(*(core.request(i) for i in range(20)))
+        await core.close()
+        return broker, results
+
+    broker, results = asyncio.run(scenario())
+    assert results == [i * 2 for i in range(20)]
+    # Эксклюзивная очередь ответов удаляется вместе с соединением клиента
+    assert 'client-uuid' not in broker.queues
+
+
+def test_failed_channel_setup_closes_the_connection():
+    async def scenario():
+        broker = MemoryBroker()
+        # Очередь ответов занята другим соединением: setup_channel падает
+        other = MemoryTransport(broker)
+        await other.connect('localhost', 5672, 'guest', 'guest')
+        await other.declare_queue('client-uuid', exclusive=True)
+
+        for _ in range(3):
+            core = ClientCore('client-uuid', 'bews', transport_factory=lambda: MemoryTransport(broker))
+            with pytest.raises(PermissionError):
+                await core.connect('localhost', 5672, 'guest', 'guest')
+        return broker, other
+
+    broker, other = asyncio.run(scenario())
+    assert broker.connections == {other}
+
+
+def test_compact_codec_is_used_for_uuid_requests_and_falls_back_to_protobuf():
+    async def scenario(client_uuid):
+        core = make_core(client_uuid=client_uuid, batch_linger=0.01, batch_size=50, codec='compact')
+        results = await asyncio.gather(*(core.request(i) for i in range(60)))
+        return core, results
+
+    core, results = asyncio.run(scenario(str(uuid.uuid4())))
+    assert results == [i * 2 for i in range(60)]
+    assert {message.content_type for message in core.transport.published} == {CONTENT_TYPES['compact']}
+    assert core.codec_fallbacks == 0
+
+    # Имя очереди ответов не UUID: compact не подходит, запросы уходят в protobuf
+    core, results = asyncio.run(scenario('client-uuid'))
+    assert results == [i * 2 for i in range(60)]
+    assert {message.content_type for message in core.transport.published} == {CONTENT_TYPES['protobuf']}
+    assert core.codec_fallbacks == len(core.transport.published)
+
+
+def test_submit_rejects_values_outside_int32():
+    core = make_core()
+    with pytest.raises(ValueError):
+        core.submit('id', 2 ** 31, 0, 'double', lambda response, error: None)
+
+
+def test_request_to_missing_shard_queue_fails_without_waiting_for_timeout():
+    async def scenario():
+        broker = MemoryBroker()
+        server = MemoryTransport(broker)
+        await server.connect('localhost', 5672, 'guest', 'guest')
+        await server.declare_exchange('bews')
+        # Сервер работает без шардов, а клиент настроен на четыре
+        await server.declare_queue('bews', durable=True, bind_to='bews')
+
+        errors = []
+        core = ClientCore('client-uuid', 'bews', batch_linger=0, shards=4, timeout_response=30,
+                          on_error=errors.append, transport_factory=lambda: MemoryTransport(broker))
+        await core.connect('localhost', 5672, 'guest', 'guest')
+        with pytest.raises(UnroutableError):
+            await asyncio.wait_for(core.request(1), 1)
+        await core.close()
+        return core, errors
+
+    core, errors = asyncio.run(scenario())
+    assert len(core.inflight) == 0
+    assert len(errors) == 1 and 'shards' in errors[0]
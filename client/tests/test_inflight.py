@@ -0,0 +1,77 @@
+import pytest
+from rabbitmq_client.inflight import InflightTable
+from tests.conftest import FakeClock
+
+
+class Recorder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, name):
+        return lambda response, error: self.calls.append((name, response, error))
+
+
+def test_responses_are_matched_out_of_order():
+    table = InflightTable(clock=FakeClock())
+    done = Recorder()
+    for name in ("a", "b", "c"):
+        table.add(name, 10, done(name))
+
+    table.resolve("c", 3)
+    table.resolve("a", 1)
+    assert [(name, response) for name, response, _ in done.calls] == [("c", 3), ("a", 1)]
+    assert len(table) == 1 and "b" in table
+
+
+def test_each_request_expires_on_its_own_deadline():
+    clock = FakeClock()
+    table = InflightTable(clock=clock)
+    done = Recorder()
+    table.add("slow", 30, done("slow"))
+    table.add("fast", 5, done("fast"))
+    assert table.next_deadline() == 5
+
+    clock.now = 6
+    assert [entry.request_id for entry in table.expire()] == ["fast"]
+    name, response, error = done.calls[0]
+    assert name == "fast" and response is None and isinstance(error, TimeoutError)
+    assert table.next_deadline() == 30
+
+
+def test_late_and_cancelled_responses_are_ignored():
+    clock = FakeClock()
+    table = InflightTable(clock=clock)
+    done = Recorder()
+    table.add("late", 1, done("late"))
+    table.add("cancelled", 1, done("cancelled"))
+
+    table.cancel("cancelled")
+    clock.now = 2
+    table.expire()
+    assert table.resolve("late", 1) is None
+    assert table.resolve("cancelled", 1) is None
+    assert [name for name, _, _ in done.calls] == ["late"]
+    assert table.next_deadline() is None
+
+
+def test_duplicate_request_id_is_rejected():
+    table = InflightTable(clock=FakeClock())
+    table.add("a", 1, lambda response, error: None)
+    with pytest.raises(KeyError):
+        table.add("a", 1, lambda response, error: None)
+
+
+def test_thousands_in_flight():
+    clock = FakeClock()
+    table = InflightTable(clock=clock)
+    resolved = []
+    for i in range(5000):
+        table.add(str(i), i % 7 + 1, lambda response, error: resolved.append(error is None))
+
+    for i in range(0, 5000, 2):
+        table.resolve(str(i), i)
+    clock.now = 100
+    table.expire()
+    assert len(resolved) == 5000
+    assert sum(resolved) == 2500
+    assert len(table) == 0
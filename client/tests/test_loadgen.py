@@ -0,0 +1,47 @@
+import asyncio
+from rabbitmq_client.loadgen import percentile, run_load, summarize
+
+
+def test_percentile_nearest_rank():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile(values, 100) == 100
+    assert percentile([], 50) is None
+
+
+def test_summarize_reports_milliseconds():
+    summary = summarize([0.001, 0.002, 0.010], timeouts=1, errors=0, elapsed=2.0)
+    assert summary['requests'] == 4
+    assert summary['throughput'] == 1.5
+    assert summary['latency_ms'] == {'p50': 2.0, 'p90': 10.0, 'p99': 10.0, 'max': 10.0}
+
+
+class FakeCore:
+    def __init__(self):
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.calls = 0
+
+    async def request(self, value, delay=0, operation='double'):
+        self.calls += 1
+        call = self.calls
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        await asyncio.sleep(0.001)
+        self.in_flight -= 1
+        if call % 10 == 0:
+            raise TimeoutError()
+        return value * 2
+
+
+def test_run_load_respects_concurrency():
+    core = FakeCore()
+    summary = asyncio.run(run_load(core, 50, concurrency=5))
+    assert core.max_in_flight == 5
+    assert (summary['ok'], summary['timeouts'], summary['errors']) == (45, 5, 0)
+
+
+def test_run_load_paces_by_rate():
+    summary = asyncio.run(run_load(FakeCore(), 20, rate=200))
+    assert summary['elapsed_seconds'] >= 0.09
@@ -0,0 +1,59 @@
+import logging
+import time
+from PyQt5.QtCore import Qt
+from rabbitmq_client.log_model import EventLogModel, LevelFilterProxyModel
+
+
+def test_appends_are_batched_until_flush():
+    model = EventLogModel(capacity=10)
+    inserted = []
+    model.rowsInserted.connect(lambda parent, first, last: inserted.append((first, last)))
+
+    for i in range(3):
+        model.append(logging.INFO, f"event {i}", timestamp="t")
+    assert model.rowCount() == 0
+
+    model.flush()
+    assert inserted == [(0, 2)]
+    assert model.data(model.index(2)) == "t - event 2"
+
+
+def test_ring_buffer_keeps_latest_events():
+    model = EventLogModel(capacity=5)
+    for i in range(8):
+        model.append(logging.INFO, str(i), timestamp="t")
+        if i % 3 == 0:
+            model.flush()
+    model.flush()
+
+    assert model.rowCount() == 5
+    assert [model.entry(row)[2] for row in range(5)] == ["3", "4", "5", "6", "7"]
+
+
+def test_level_filter():
+    model = EventLogModel(capacity=10)
+    proxy = LevelFilterProxyModel()
+    proxy.setSourceModel(model)
+    model.append(logging.INFO, "info", timestamp="t")
+    model.append(logging.ERROR, "error", timestamp="t")
+    model.flush()
+
+    proxy.set_min_level(logging.WARNING)
+    assert proxy.rowCount() == 1
+    assert proxy.data(proxy.index(0, 0)) == "t - error"
+    assert proxy.data(proxy.index(0, 0), Qt.ForegroundRole) is not None
+
+
+def test_hundred_thousand_events_stay_bounded_and_fast():
+    model = EventLogModel(capacity=10000)
+    started = time.perf_counter()
+    for i in range(100000):
+        model.append(logging.INFO, f"event {i}", timestamp="t")
+        if i % 1000 == 999:
+            model.flush()
+    model.flush()
+
+    assert model.rowCount() == 10000
+    assert len(model._buffer) == 10000
+    assert model.entry(9999)[2] == "event 99999"
+    assert time.perf_counter() - started < 5
@@ -0,0 +1,167 @@
+import asyncio
+import configparser
+import pytest
+from rabbitmq_client.client import EVENT_ERROR, EVENT_RESPONSE, RMQClient
+from rabbitmq_client.client_state import DisconnectedState
+from rabbitmq_client.core import CODECS
+from rabbitmq_client.outbox import Outbox, load_outbox_config
+from rabbitmq_common.codecs import Response
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_common.transport import DEFAULT_EXCHANGE
+
+
+def test_outbox_keeps_order_and_dedupes_by_request_id(tmp_path):
+    outbox = Outbox(tmp_path / 'outbox.sqlite3', max_size=10)
+    assert outbox.put('a', 'double', 1, 0)
+    assert outbox.put('b', 'double', 2, 3)
+    assert not outbox.put('a', 'double', 1, 0)
+    assert len(outbox) == 2
+    assert outbox.peek(10) == [('a', 'double', 1, 0), ('b', 'double', 2, 3)]
+
+    assert outbox.remove('a')
+    assert not outbox.remove('a')
+    assert outbox.peek(10) == [('b', 'double', 2, 3)]
+    outbox.close()
+
+
+def test_outbox_is_bounded(tmp_path):
+    outbox = Outbox(tmp_path / 'outbox.sqlite3', max_size=1)
+    outbox.put('a', 'double', 1, 0)
+    with pytest.raises(RuntimeError):
+        outbox.put('b', 'double', 2, 0)
+    outbox.close()
+
+
+def test_outbox_survives_restart_only_after_commit(tmp_path):
+    path = tmp_path / 'outbox.sqlite3'
+    outbox = Outbox(path)
+    outbox.put('a', 'double', 1, 0)
+    outbox.commit()
+    assert not outbox.dirty
+    outbox.put('b', 'double', 2, 0)
+    assert outbox.dirty
+    # Незафиксированная запись теряется при аварийном завершении
+    outbox.db.rollback()
+    outbox.db.close()
+
+    reopened = Outbox(path)
+    assert len(reopened) == 1
+    assert reopened.peek(10) == [('a', 'double', 1, 0)]
+    reopened.close()
+
+
+def test_load_outbox_config_validates_values():
+    config = configparser.ConfigParser()
+    config.read_dict({'outbox': {'commit_ms': '20'}})
+    assert load_outbox_config(config) == (True, 'client_outbox.sqlite3', 10000, 200.0, 0.02)
+
+    config.read_dict({'outbox': {'replay_rate': '0'}})
+    with pytest.raises(ValueError):
+        load_outbox_config(config)
+
+
+async def start_echo_server(broker):
+    """Сервер на MemoryBroker, отвечающий на каждый запрос удвоенным числом; возвращает список request_id."""
+    server = MemoryTransport(broker)
+    received = []
+
+    async def echo(delivery):
+        codec = CODECS.find(delivery.content_type)
+        request = codec.decode_request(delivery.body)
+        received.append(request.request_id)
+        await server.publish(DEFAULT_EXCHANGE, request.return_address,
+                             codec.encode_response(Response(request.request_id, request.request * 2)),
+                             content_type=delivery.content_type)
+        await delivery.ack()
+
+    await server.connect('localhost', 5672, 'guest', 'guest')
+    await server.declare_exchange('bews')
+    await server.declare_queue('bews', durable=True, bind_to='bews')
+    await server.consume('bews', echo, prefetch_count=10)
+    return received
+
+
+async def start_client(tmp_path, broker, batch_linger_ms=0):
+    config_path = tmp_path / 'client_config.ini'
+    config_path.write_text(
+        "[client]\n"
+        f"batch_linger_ms = {batch_linger_ms}\n"
+        "ui_flush_ms = 0\n"
+        "[outbox]\n"
+        f"path = {tmp_path / 'outbox.sqlite3'}\n"
+        "replay_rate = 100000\n"
+        "commit_ms = 0\n"
+    )
+    client = RMQClient(str(config_path), transport_factory=lambda: MemoryTransport(broker))
+    events = []
+    client.ui_events_signal.connect(events.extend)
+    client.loop = asyncio.get_running_loop()
+    client._stop_event = asyncio.Event()
+    client._running = True
+    client.open_outbox()
+    return client, events
+
+
+async def wait_until(predicate, timeout=2):
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not predicate():
+        assert asyncio.get_running_loop().time() < deadline
+        await asyncio.sleep(0.001)
+
+
+def test_replay_keeps_requests_until_answered_and_drops_bad_rows(tmp_path):
+    async def scenario():
+        broker = MemoryBroker()
+        received = await start_echo_server(broker)
+        client, events = await start_client(tmp_path, broker)
+        client.outbox.put('a', 'double', 1, 0)
+        client.outbox.put('bad', 'double', 2 ** 40, 0)
+        client.outbox.put('b', 'double', 2, 0)
+        client.outbox.commit()
+
+        assert await client.connect_to_rabbitmq()
+        client.start_replay(from_start=True)
+        await wait_until(lambda: not len(client.outbox))
+        await wait_until(lambda: len([e for e in events if e[0] == EVENT_RESPONSE]) == 2)
+        await client.close_connection()
+        client.close_outbox()
+        return received, events
+
+    received, events = asyncio.run(scenario())
+    assert received == ['a', 'b']
+    assert [event for event in events if event[0] == EVENT_RESPONSE] == [(EVENT_RESPONSE, 'a', 2),
+                                                                          (EVENT_RESPONSE, 'b', 4)]
+    assert any(event[0] == EVENT_ERROR and 'bad' in event[1] for event in events)
+    assert Outbox(tmp_path / 'outbox.sqlite3').peek(10) == []
+
+
+def test_replayed_request_lost_with_connection_is_sent_again(tmp_path):
+    async def scenario():
+        broker = MemoryBroker()
+        received = await start_echo_server(broker)
+        client, events = await start_client(tmp_path, broker, batch_linger_ms=50)
+        client.outbox.put('a', 'double', 3, 0)
+        client.outbox.commit()
+
+        assert await client.connect_to_rabbitmq()
+        client.start_replay(from_start=True)
+        await wait_until(lambda: not client.replaying)
+        # Соединение обрывается, пока запрос ждёт в пакете клиента
+        client.core.transport.drop()
+        await asyncio.sleep(0.06)
+        assert received == []
+        # Запись остаётся в журнале и после перезапуска клиента
+        assert Outbox(tmp_path / 'outbox.sqlite3').peek(10) == [('a', 'double', 3, 0)]
+
+        client.change_state(DisconnectedState())
+        await client.close_connection()
+        assert await client.connect_to_rabbitmq()
+        client.start_replay(from_start=True)
+        await wait_until(lambda: not len(client.outbox))
+        await client.close_connection()
+        client.close_outbox()
+        return received, events
+
+    received, events = asyncio.run(scenario())
+    assert received == ['a']
+    assert [event for event in events if event[0] == EVENT_RESPONSE] == [(EVENT_RESPONSE, 'a', 6)]
@@ -0,0 +1,86 @@
+import logging
+import os
+import configparser
+import pytest
+from rabbitmq_client.client import RMQClient
+from rabbitmq_client.config import SETTINGS_COMPONENTS, load_client_settings
+from rabbitmq_common.settings import ConfigFile, affected_components
+
+
+def write(path, text, mtime_ns):
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def test_reload_detects_only_real_changes(tmp_path):
+    path = tmp_path / 'client_config.ini'
+    write(path, "[rabbitmq]\nhost = a\n", 1_000_000_000)
+    source = ConfigFile(path)
+    assert source.reload()
+    assert not source.reload()
+
+    # Тот же текст с новым mtime — не изменение
+    write(path, "[rabbitmq]\nhost = a\n", 2_000_000_000)
+    assert not source.reload()
+
+    write(path, "[rabbitmq]\nhost = b\n", 3_000_000_000)
+    assert source.reload()
+    assert source.config.get('rabbitmq', 'host') == 'b'
+
+
+def test_missing_file_gives_empty_config(tmp_path):
+    source = ConfigFile(tmp_path / 'absent.ini')
+    assert source.load().sections() == []
+
+
+def test_diff_maps_fields_to_components():
+    config = configparser.ConfigParser()
+    config.read_dict({'client': {'uuid': 'u'}})
+    old = load_client_settings(config)
+
+    config.read_dict({'client': {'batch_size': '10'}, 'logging': {'level': 'DEBUG'}})
+    new = load_client_settings(config)
+    assert affected_components(old, new, SETTINGS_COMPONENTS) == {'batching', 'logging'}
+    assert affected_components(old, old, SETTINGS_COMPONENTS) == set()
+    assert affected_components(None, old, SETTINGS_COMPONENTS) == set(SETTINGS_COMPONENTS)
+
+
+def test_invalid_settings_are_rejected():
+    config = configparser.ConfigParser()
+    config.read_dict({'client': {'uuid': 'u', 'batch_size': '0'}})
+    with pytest.raises(ValueError):
+        load_client_settings(config)
+
+
+def test_hosts_become_failover_endpoints():
+    config = configparser.ConfigParser()
+    config.read_dict({'client': {'uuid': 'u'}, 'rabbitmq': {'host': 'a', 'port': '5673'}})
+    old = load_client_settings(config)
+    assert old.endpoints == (('a', 5673),)
+
+    config.read_dict({'rabbitmq': {'hosts': 'a:5673, b:5674'}})
+    new = load_client_settings(config)
+    assert new.endpoints == (('a', 5673), ('b', 5674))
+    assert affected_components(old, new, SETTINGS_COMPONENTS) == {'connection', 'failover'}
+
+
+def test_client_starts_on_defaults_when_config_is_invalid(tmp_path):
+    path = tmp_path / 'client_config.ini'
+    path.write_text("[client]\nuuid = u\nbatch_size = 0\n")
+    client = RMQClient(str(path))
+    assert client.settings.batch_size == 100
+    assert client.settings.client_uuid == 'u'
+    assert 'batch_size' in client._config_error
+
+
+def test_client_reload_reports_changed_components(tmp_path):
+    path = tmp_path / 'client_config.ini'
+    write(path, "[client]\nuuid = u\n", 1_000_000_000)
+    client = RMQClient(str(path))
+    changes = []
+    client.settings_changed_signal.connect(changes.append)
+
+    write(path, "[client]\nuuid = u\n\n[logging]\nlevel = DEBUG\n", 2_000_000_000)
+    client._reload_config_and_reconnect()
+    assert changes == [{'logging'}]
+    assert client.settings.log_level == logging.DEBUG
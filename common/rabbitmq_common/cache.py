@@ -0,0 +1,57 @@
+"""LRU-кэш с ограниченным временем жизни записей.
+
+На нём построены кэш ответов клиента и кэш повторных доставок сервера.
+"""
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """LRU-кэш: не больше max_size записей, каждая живёт ttl секунд.
+
+    Устаревшая запись удаляется при обращении к ней, а при переполнении
+    вытесняется запись, к которой дольше всего не обращались. max_size = 0
+    отключает кэш. max_size и ttl можно менять на ходу; новый ttl действует
+    для записей, добавленных после изменения.
+    """
+
+    def __init__(self, max_size, ttl, clock=time.monotonic):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hit_rate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def get(self, key):
+        """Возвращает сохранённое значение или None, если записи нет или она устарела."""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        expires_at, value = entry
+        if expires_at <= self.clock():
+            del self._entries[key]
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def put(self, key, value):
+        if self.max_size == 0:
+            return
+        self._entries[key] = (self.clock() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
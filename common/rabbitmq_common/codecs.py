@@ -0,0 +1,255 @@
+"""Кодеки тела сообщений, выбираемые по AMQP-свойству content_type.
+
+Запросы и ответы передаются между кодеком и остальным кодом как Request и Response —
+кортежи с полями одноимённых сообщений protobuf. Сервер отвечает тем же
+кодеком, которым закодирован запрос; сообщение без content_type считается
+protobuf.
+
+protobuf — кодек по умолчанию, совместимый со старыми клиентами.
+compact  — фиксированная раскладка struct: UUID в 16 байтах, числа в 4.
+           Подходит только для запросов, у которых request_id и
+           return_address — UUID в каноническом виде; иначе encode_*
+           бросает ValueError, и клиент отправляет сообщение через protobuf.
+"""
+import struct
+from typing import NamedTuple
+
+PROTOBUF = 'protobuf'
+COMPACT = 'compact'
+DEFAULT_CODEC = PROTOBUF
+
+# Имя кодека в настройках -> значение content_type
+CONTENT_TYPES = {
+    PROTOBUF: 'application/x-protobuf',
+    COMPACT: 'application/x-bews-compact',
+}
+
+# Значения AMQP-свойства type: пакеты запросов и ответов и ответ с ошибкой.
+# На ответ с ошибкой correlation_id — request_id невыполненного запроса,
+# тело — текст ошибки в UTF-8 с content_type ERROR_CONTENT_TYPE
+REQUEST_BATCH_TYPE = 'RequestBatch'
+RESPONSE_BATCH_TYPE = 'ResponseBatch'
+ERROR_TYPE = 'Error'
+ERROR_CONTENT_TYPE = 'text/plain; charset=utf-8'
+
+
+class Request(NamedTuple):
+    return_address: str
+    request_id: str
+    process_time_in_seconds: float
+    request: int
+    operation: str = 'double'
+
+
+class Response(NamedTuple):
+    request_id: str
+    response: int
+
+
+class ProtobufCodec:
+    """Кодек на сообщениях msg.proto; messages — сгенерированный модуль *_pb2 пакета.
+
+    Объекты сообщений создаются один раз и переиспользуются: разбор идёт в
+    тот же объект, а наружу отдаются кортежи, поэтому переиспользование
+    безопасно и между await.
+    """
+
+    name = PROTOBUF
+    content_type = CONTENT_TYPES[PROTOBUF]
+
+    def __init__(self, messages):
+        self._request = messages.Request()
+        self._response = messages.Response()
+        self._request_batch = messages.RequestBatch()
+        self._response_batch = messages.ResponseBatch()
+
+    @staticmethod
+    def _fill_request(message, request):
+        message.return_address = request.return_address
+        message.request_id = request.request_id
+        message.process_time_in_seconds = request.process_time_in_seconds
+        message.request = request.request
+        message.operation = request.operation
+
+    @staticmethod
+    def _to_request(message):
+        return Request(message.return_address, message.request_id, message.process_time_in_seconds,
+                       message.request, message.operation)
+
+    def encode_request(self, request):
+        self._fill_request(self._request, request)
+        return self._request.SerializeToString()
+
+    def encode_request_batch(self, requests):
+        batch = self._request_batch
+        del batch.requests[:]
+        for request in requests:
+            self._fill_request(batch.requests.add(), request)
+        return batch.SerializeToString()
+
+    def decode_request(self, body):
+        self._request.Clear()
+        self._request.ParseFromString(body)
+        return self._to_request(self._request)
+
+    def decode_request_batch(self, body):
+        self._request_batch.Clear()
+        self._request_batch.ParseFromString(body)
+        return [self._to_request(message) for message in self._request_batch.requests]
+
+    def encode_response(self, response):
+        self._response.request_id = response.request_id
+        self._response.response = response.response
+        return self._response.SerializeToString()
+
+    def encode_response_batch(self, responses):
+        batch = self._response_batch
+        del batch.responses[:]
+        for response in responses:
+            message = batch.responses.add()
+            message.request_id = response.request_id
+            message.response = response.response
+        return batch.SerializeToString()
+
+    def decode_response(self, body):
+        self._response.Clear()
+        self._response.ParseFromString(body)
+        return Response(self._response.request_id, self._response.response)
+
+    def decode_response_batch(self, body):
+        self._response_batch.Clear()
+        self._response_batch.ParseFromString(body)
+        return [Response(message.request_id, message.response) for message in self._response_batch.responses]
+
+
+def _uuid_bytes(value):
+    """16 байт UUID; ValueError, если строка не UUID в каноническом виде."""
+    raw = bytes.fromhex(value.replace('-', ''))
+    if len(raw) != 16 or _uuid_str(raw) != value:
+        raise ValueError(f"not a canonical UUID: {value!r}")
+    return raw
+
+
+def _uuid_str(raw):
+    h = raw.hex()
+    return f'{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}'
+
+
+class CompactCodec:
+    """Двоичный кодек с фиксированной раскладкой записей.
+
+    Одиночное сообщение кодируется как пакет из одной записи.
+    Пакет запросов: версия (1 байт), число записей (2), return_address (16),
+    число операций (1), таблица имён операций (длина 1 байт + UTF-8), затем
+    записи по 25 байт: request_id (16), задержка float32, значение int32,
+    номер операции (1). Пакет ответов: версия, число записей и записи по
+    20 байт: request_id (16), значение int32.
+    """
+
+    name = COMPACT
+    content_type = CONTENT_TYPES[COMPACT]
+    VERSION = 1
+
+    _request_header = struct.Struct('<BH16sB')
+    _request = struct.Struct('<16sfiB')
+    _response_header = struct.Struct('<BH')
+    _response = struct.Struct('<16si')
+
+    def encode_request(self, request):
+        return self.encode_request_batch([request])
+
+    def encode_request_batch(self, requests):
+        return_address = requests[0].return_address
+        operations = {}
+        records = []
+        try:
+            for request in requests:
+                if request.return_address != return_address:
+                    raise ValueError("requests of one batch must share return_address")
+                index = operations.setdefault(request.operation, len(operations))
+                records.append(self._request.pack(
+                    _uuid_bytes(request.request_id), request.process_time_in_seconds, request.request, index
+                ))
+            parts = [self._request_header.pack(self.VERSION, len(requests), _uuid_bytes(return_address),
+                                               len(operations))]
+        except struct.error as e:
+            raise ValueError(str(e)) from e
+        for operation in operations:
+            name = operation.encode()
+            parts.append(bytes((len(name),)) + name)
+        parts.extend(records)
+        return b''.join(parts)
+
+    def decode_request(self, body):
+        requests = self.decode_request_batch(body)
+        if len(requests) != 1:
+            raise ValueError(f"expected one request, got {len(requests)}")
+        return requests[0]
+
+    def decode_request_batch(self, body):
+        version, count, return_address, operation_count = self._request_header.unpack_from(body)
+        self._check_version(version)
+        return_address = _uuid_str(return_address)
+        offset = self._request_header.size
+        operations = []
+        for _ in range(operation_count):
+            length = body[offset]
+            operations.append(body[offset + 1:offset + 1 + length].decode())
+            offset += 1 + length
+        if len(body) - offset != count * self._request.size:
+            raise ValueError("truncated compact request batch")
+        return [
+            Request(return_address, _uuid_str(request_id), delay, value, operations[index])
+            for request_id, delay, value, index in self._request.iter_unpack(body[offset:])
+        ]
+
+    def encode_response(self, response):
+        return self.encode_response_batch([response])
+
+    def encode_response_batch(self, responses):
+        parts = [self._response_header.pack(self.VERSION, len(responses))]
+        try:
+            for response in responses:
+                parts.append(self._response.pack(_uuid_bytes(response.request_id), response.response))
+        except struct.error as e:
+            raise ValueError(str(e)) from e
+        return b''.join(parts)
+
+    def decode_response(self, body):
+        responses = self.decode_response_batch(body)
+        if len(responses) != 1:
+            raise ValueError(f"expected one response, got {len(responses)}")
+        return responses[0]
+
+    def decode_response_batch(self, body):
+        version, count = self._response_header.unpack_from(body)
+        self._check_version(version)
+        records = body[self._response_header.size:]
+        if len(records) != count * self._response.size:
+            raise ValueError("truncated compact response batch")
+        return [Response(_uuid_str(request_id), value) for request_id, value in self._response.iter_unpack(records)]
+
+    def _check_version(self, version):
+        if version != self.VERSION:
+            raise ValueError(f"unsupported compact codec version {version}")
+
+
+class CodecRegistry:
+    """Кодеки по content_type; сообщение без content_type декодируется кодеком по умолчанию."""
+
+    def __init__(self, *codecs, default=DEFAULT_CODEC):
+        self._by_content_type = {codec.content_type: codec for codec in codecs}
+        self._by_name = {codec.name: codec for codec in codecs}
+        self.default = self._by_name[default]
+
+    def find(self, content_type):
+        """Кодек для content_type; LookupError для неизвестного типа."""
+        if not content_type:
+            return self.default
+        codec = self._by_content_type.get(content_type)
+        if codec is None:
+            raise LookupError(f"unsupported content type {content_type!r}")
+        return codec
+
+    def by_name(self, name):
+        return self._by_name[name]
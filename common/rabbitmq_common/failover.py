@@ -0,0 +1,114 @@
+"""Переключение между узлами брокера с экспоненциальной задержкой и джиттером.
+
+Клиент и сервер перебирают узлы из [rabbitmq] hosts и не повторяют
+попытки к упавшему узлу чаще, чем позволяет его задержка.
+"""
+import random
+import time
+
+DEFAULT_PORT = 5672
+DEFAULT_BACKOFF_INITIAL = 0.05
+DEFAULT_BACKOFF_MAX = 5.0
+DEFAULT_BACKOFF_MULTIPLIER = 2.0
+DEFAULT_ATTEMPT_TIMEOUT = 1.0
+
+
+def parse_endpoints(value, default_port=DEFAULT_PORT):
+    """Разбирает список 'host[:port]' через запятую в кортеж пар (host, port)."""
+    endpoints = []
+    for item in value.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        host, _, port = item.rpartition(':') if ':' in item else (item, '', '')
+        endpoints.append((host, int(port) if port else default_port))
+    if not endpoints:
+        raise ValueError("rabbitmq.hosts must list at least one endpoint")
+    return tuple(endpoints)
+
+
+def load_failover_config(config):
+    """Читает узлы брокера и параметры переподключения из секции [rabbitmq].
+
+    hosts — узлы через запятую; без него используется пара host/port.
+    """
+    port = config.getint('rabbitmq', 'port', fallback=DEFAULT_PORT)
+    hosts = config.get('rabbitmq', 'hosts', fallback='') or config.get('rabbitmq', 'host', fallback='localhost')
+    endpoints = parse_endpoints(hosts, port)
+    backoff_initial = config.getfloat('rabbitmq', 'backoff_initial_ms', fallback=DEFAULT_BACKOFF_INITIAL * 1000) / 1000
+    backoff_max = config.getfloat('rabbitmq', 'backoff_max_ms', fallback=DEFAULT_BACKOFF_MAX * 1000) / 1000
+    attempt_timeout = config.getfloat('rabbitmq', 'attempt_timeout_ms', fallback=DEFAULT_ATTEMPT_TIMEOUT * 1000) / 1000
+
+    if backoff_initial <= 0 or backoff_max < backoff_initial:
+        raise ValueError("rabbitmq.backoff_initial_ms must be positive and not above backoff_max_ms")
+    if attempt_timeout <= 0:
+        raise ValueError("rabbitmq.attempt_timeout_ms must be positive")
+
+    return endpoints, backoff_initial, backoff_max, attempt_timeout
+
+
+class EndpointRotation:
+    """Выбирает узел брокера для следующей попытки подключения.
+
+    После каждой неудачи подряд задержка узла растёт экспоненциально до
+    backoff_max; половина задержки случайна, чтобы клиенты и воркеры не
+    стучались в узел одновременно. Узлы перебираются по кругу, и первым
+    берётся тот, чья задержка истекает раньше, поэтому после потери узла
+    следующая попытка сразу идёт к здоровому.
+    """
+
+    def __init__(self, endpoints, backoff_initial=DEFAULT_BACKOFF_INITIAL, backoff_max=DEFAULT_BACKOFF_MAX,
+                 multiplier=DEFAULT_BACKOFF_MULTIPLIER, clock=time.monotonic, rng=None):
+        if not endpoints:
+            raise ValueError("at least one endpoint is required")
+        self.endpoints = tuple(endpoints)
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.multiplier = multiplier
+        self.clock = clock
+        self.rng = rng if rng is not None else random.Random()
+        self.current = None
+        self.lost_at = None
+        self.last_recovery = None
+        self._failures = [0] * len(self.endpoints)
+        self._retry_at = [0.0] * len(self.endpoints)
+        self._next = 0
+
+    def backoff(self, failures):
+        """Задержка после failures неудач подряд."""
+        delay = min(self.backoff_max, self.backoff_initial * self.multiplier ** (failures - 1))
+        return delay / 2 + self.rng.uniform(0, delay / 2)
+
+    def next(self):
+        """Возвращает (endpoint, wait): узел для попытки и сколько секунд ждать перед ней."""
+        now = self.clock()
+        count = len(self.endpoints)
+        order = [(self._next + offset) % count for offset in range(count)]
+        index = min(order, key=lambda i: max(self._retry_at[i], now))
+        self._next = (index + 1) % count
+        return self.endpoints[index], max(0.0, self._retry_at[index] - now)
+
+    def failed(self, endpoint):
+        index = self.endpoints.index(endpoint)
+        self._failures[index] += 1
+        self._retry_at[index] = self.clock() + self.backoff(self._failures[index])
+
+    def lost(self):
+        """Соединение оборвалось: засекает начало простоя и откладывает текущий узел."""
+        if self.lost_at is None:
+            self.lost_at = self.clock()
+        if self.current is not None:
+            self.failed(self.current)
+            self.current = None
+
+    def connected(self, endpoint):
+        """Отмечает успешное подключение; возвращает время восстановления в секундах или None."""
+        index = self.endpoints.index(endpoint)
+        self._failures[index] = 0
+        self._retry_at[index] = 0.0
+        self.current = endpoint
+        if self.lost_at is None:
+            return None
+        self.last_recovery = self.clock() - self.lost_at
+        self.lost_at = None
+        return self.last_recovery
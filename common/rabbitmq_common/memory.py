@@ -0,0 +1,263 @@
+"""Брокер сообщений в памяти процесса для тестов и бенчмарков.
+
+MemoryBroker повторяет нужную часть семантики AMQP: прямые обменники,
+эксклюзивные очереди ответов и prefetch. С ним путь запрос-ответ можно
+прогонять без брокера со скоростью памяти.
+"""
+import asyncio
+import itertools
+import logging
+from collections import deque
+from typing import NamedTuple, Optional
+from rabbitmq_common.transport import DEFAULT_EXCHANGE, Transport, UnroutableError
+
+log = logging.getLogger(__name__)
+
+
+class MemoryMessage(NamedTuple):
+    body: bytes
+    correlation_id: Optional[str] = None
+    reply_to: Optional[str] = None
+    type: Optional[str] = None
+    content_type: Optional[str] = None
+    redelivered: bool = False
+
+
+class MemoryDelivery:
+    """Доставка из брокера в памяти; ack() и nack() освобождают место в окне prefetch."""
+
+    def __init__(self, consumer, message):
+        self._consumer = consumer
+        self._message = message
+        self._settled = consumer.no_ack
+        self.body = message.body
+        self.correlation_id = message.correlation_id
+        self.reply_to = message.reply_to
+        self.type = message.type
+        self.content_type = message.content_type
+        self.redelivered = message.redelivered
+
+    async def ack(self):
+        self._settle()
+        self._consumer.queue.dispatch()
+
+    async def nack(self, requeue=True):
+        self._settle()
+        if requeue:
+            # Возвращённое сообщение встаёт в начало очереди, как в RabbitMQ
+            self._consumer.queue.put(self._message._replace(redelivered=True), front=True)
+        else:
+            self._consumer.queue.dispatch()
+
+    def _settle(self):
+        if self._consumer.transport.is_closed:
+            raise ConnectionError("Channel is closed")
+        if self._settled:
+            raise RuntimeError("Delivery is already settled")
+        self._settled = True
+        self._consumer.unacked.discard(self)
+
+
+class _MemoryConsumer:
+    def __init__(self, transport, queue, callback, prefetch_count, no_ack):
+        self.transport = transport
+        self.queue = queue
+        self.callback = callback
+        self.prefetch_count = prefetch_count
+        self.no_ack = no_ack
+        self.unacked = set()
+
+    @property
+    def has_capacity(self):
+        return self.no_ack or not self.prefetch_count or len(self.unacked) < self.prefetch_count
+
+    def deliver(self, message):
+        delivery = MemoryDelivery(self, message)
+        if not self.no_ack:
+            self.unacked.add(delivery)
+        self.transport.spawn(self.callback(delivery))
+
+
+class _MemoryQueue:
+    def __init__(self, name, owner=None, auto_delete=False):
+        self.name = name
+        self.owner = owner
+        self.auto_delete = auto_delete
+        self.messages = deque()
+        self.consumers = []
+        self._next = 0
+
+    def put(self, message, front=False):
+        if front:
+            self.messages.appendleft(message)
+        else:
+            self.messages.append(message)
+        self.dispatch()
+
+    def dispatch(self):
+        """Раздаёт сообщения подписчикам по кругу, пока у них есть место в окне prefetch."""
+        while self.messages and self.consumers:
+            for offset in range(len(self.consumers)):
+                consumer = self.consumers[(self._next + offset) % len(self.consumers)]
+                if consumer.has_capacity:
+                    self._next = (self._next + offset + 1) % len(self.consumers)
+                    consumer.deliver(self.messages.popleft())
+                    break
+            else:
+                return
+
+
+class MemoryBroker:
+    """Брокер в памяти процесса для тестов и бенчмарков.
+
+    crash() имитирует потерю узла: все соединения обрываются, а новые
+    отклоняются до restore().
+    """
+
+    def __init__(self):
+        self.exchanges = {}
+        self.queues = {}
+        self.available = True
+        self.connections = set()
+        self._tags = itertools.count(1)
+
+    def crash(self):
+        self.available = False
+        for transport in list(self.connections):
+            transport.drop()
+
+    def restore(self):
+        self.available = True
+
+    def route(self, exchange, routing_key):
+        if exchange == DEFAULT_EXCHANGE:
+            return [routing_key] if routing_key in self.queues else []
+        if exchange not in self.exchanges:
+            raise ValueError(f"Exchange '{exchange}' is not declared")
+        return self.exchanges[exchange].get(routing_key, ())
+
+    def delete_queue(self, name):
+        self.queues.pop(name, None)
+        for bindings in self.exchanges.values():
+            for queues in bindings.values():
+                if name in queues:
+                    queues.remove(name)
+
+
+class MemoryTransport(Transport):
+    """Транспорт поверх MemoryBroker.
+
+    broker — MemoryBroker или словарь {host: MemoryBroker}, если нужно
+    несколько узлов. Закрытие соединения, как и в AMQP, возвращает в
+    очереди неподтверждённые доставки и удаляет эксклюзивные очереди.
+    """
+
+    def __init__(self, broker):
+        super().__init__()
+        self._brokers = broker
+        self.broker = None
+        self._consumers = {}
+        self._tasks = set()
+
+    @property
+    def is_closed(self):
+        return self.broker is None
+
+    async def connect(self, host, port, login, password, timeout=None):
+        broker = self._brokers[host] if isinstance(self._brokers, dict) else self._brokers
+        if not broker.available:
+            raise ConnectionRefusedError(f"Memory broker {host}:{port} is down")
+        self.broker = broker
+        broker.connections.add(self)
+
+    async def close(self):
+        self.drop()
+
+    def drop(self):
+        broker = self.broker
+        if broker is None:
+            return
+        self.broker = None
+        broker.connections.discard(self)
+
+        for consumer in self._consumers.values():
+            if consumer in consumer.queue.consumers:
+                consumer.queue.consumers.remove(consumer)
+            for delivery in list(consumer.unacked):
+                delivery._settled = True
+                consumer.queue.put(delivery._message._replace(redelivered=True), front=True)
+            consumer.unacked.clear()
+            if consumer.queue.auto_delete and not consumer.queue.consumers:
+                broker.delete_queue(consumer.queue.name)
+        self._consumers.clear()
+
+        for name, queue in list(broker.queues.items()):
+            if queue.owner is self:
+                broker.delete_queue(name)
+        self._notify_closed()
+
+    def spawn(self, coro):
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._on_task_done)
+
+    def _on_task_done(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Consumer callback failed: %s", task.exception())
+
+    def _require_broker(self):
+        if self.broker is None:
+            raise ConnectionError("Connection is closed")
+        return self.broker
+
+    async def declare_exchange(self, name):
+        self._require_broker().exchanges.setdefault(name, {})
+
+    async def declare_queue(self, name, durable=False, exclusive=False, auto_delete=False,
+                            bind_to=None, routing_key=None):
+        broker = self._require_broker()
+        queue = broker.queues.get(name)
+        if queue is None:
+            queue = broker.queues[name] = _MemoryQueue(name, self if exclusive else None, auto_delete)
+        elif queue.owner is not None and queue.owner is not self:
+            raise PermissionError(f"Queue '{name}' is locked by another connection")
+
+        if bind_to is not None:
+            queues = broker.exchanges[bind_to].setdefault(routing_key or name, [])
+            if name not in queues:
+                queues.append(name)
+        return name
+
+    async def publish(self, exchange, routing_key, body, correlation_id=None, reply_to=None, type=None,
+                      content_type=None, mandatory=False):
+        broker = self._require_broker()
+        message = MemoryMessage(body, correlation_id, reply_to, type, content_type)
+        queues = broker.route(exchange, routing_key)
+        if mandatory and not queues:
+            raise UnroutableError(f"No queue is bound to '{exchange}' with key '{routing_key}'")
+        for name in queues:
+            broker.queues[name].put(message)
+
+    async def consume(self, queue, callback, prefetch_count=0, no_ack=False):
+        broker = self._require_broker()
+        consumer_tag = f'ctag-{next(broker._tags)}'
+        consumer = _MemoryConsumer(self, broker.queues[queue], callback, prefetch_count, no_ack)
+        self._consumers[consumer_tag] = consumer
+        consumer.queue.consumers.append(consumer)
+        consumer.queue.dispatch()
+        return consumer_tag
+
+    async def cancel(self, consumer_tag):
+        # Подписчик остаётся в _consumers: его неподтверждённые доставки вернутся в очередь при закрытии
+        consumer = self._consumers.get(consumer_tag)
+        if consumer is None:
+            return
+        queue = consumer.queue
+        if consumer in queue.consumers:
+            queue.consumers.remove(consumer)
+        if queue.auto_delete and not queue.consumers and self.broker is not None:
+            self.broker.delete_queue(queue.name)
+
+    async def queue_depth(self, queue):
+        return len(self._require_broker().queues[queue].messages)
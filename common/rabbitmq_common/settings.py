@@ -0,0 +1,82 @@
+"""Чтение ini-файла с проверкой изменений.
+
+Каждый пакет описывает свои типизированные настройки, а чтение файла,
+проверка изменений и разбор разницы по компонентам у них общие.
+"""
+import configparser
+import hashlib
+import logging
+from pathlib import Path
+
+log = logging.getLogger(__name__)
+
+
+class ConfigFile:
+    """Ini-файл в памяти, который перечитывается только при реальном изменении.
+
+    reload() сначала сравнивает mtime и размер файла и только если они
+    изменились, читает его и сравнивает sha256 содержимого. Пересохранение
+    того же содержимого не считается изменением.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.config = configparser.ConfigParser()
+        self.digest = None
+        self._stamp = None
+
+    def load(self):
+        self.reload()
+        return self.config
+
+    def reload(self):
+        """Перечитывает файл, если он изменился; возвращает True, если изменилось содержимое."""
+        stamp = self._stat()
+        if self.digest is not None and stamp == self._stamp:
+            return False
+
+        try:
+            data = self.path.read_bytes()
+        except FileNotFoundError:
+            log.warning("Config file not found: %s", self.path)
+            data = b''
+
+        self._stamp = stamp
+        digest = hashlib.sha256(data).hexdigest()
+        if digest == self.digest:
+            return False
+
+        config = configparser.ConfigParser()
+        config.read_string(data.decode('utf-8'), source=str(self.path))
+        self.config = config
+        self.digest = digest
+        log.info("Loaded configuration from %s (sha256 %s)", self.path, digest[:12])
+        return True
+
+    def save(self):
+        """Записывает текущие значения на диск и запоминает их как прочитанные."""
+        with open(self.path, 'w') as config_file:
+            self.config.write(config_file)
+        self._stamp = None
+        self.digest = None
+        self.reload()
+
+    def _stat(self):
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+
+def changed_fields(old, new):
+    """Имена полей, значения которых различаются у двух снимков настроек (NamedTuple)."""
+    if old is None:
+        return set(new._fields)
+    return {name for name in new._fields if getattr(old, name) != getattr(new, name)}
+
+
+def affected_components(old, new, components):
+    """Компоненты, которые нужно пересоздать; components — {компонент: поля, от которых он зависит}."""
+    changed = changed_fields(old, new)
+    return {component for component, fields in components.items() if changed.intersection(fields)}
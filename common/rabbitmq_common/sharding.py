@@ -0,0 +1,74 @@
+"""Шардирование очереди запросов по client_uuid.
+
+При [rabbitmq] shards = N > 1 запросы идут в N очередей <exchange>.0 ...
+<exchange>.N-1, каждая привязана к обменнику ключом, совпадающим с её
+именем. Клиент выбирает шард jump consistent hash (Lamping, Veach) от
+своего client_uuid, поэтому все его запросы попадают в одну очередь и
+сохраняют порядок, а при изменении N переезжает лишь ~1/N клиентов.
+При N = 1 остаётся прежняя единственная очередь <exchange>.
+
+Сервер объявляет и привязывает все шарды, а потребляет подмножество из
+[consumer] shards:
+    all        — все шарды (по умолчанию);
+    auto       — шарды с номером shard % workers == worker_id;
+    0,2,4-7    — явный список номеров и диапазонов.
+"""
+import hashlib
+
+DEFAULT_SHARDS = 1
+
+
+def load_sharding_config(config):
+    """Читает число шардов очереди запросов из секции [rabbitmq]."""
+    shards = config.getint('rabbitmq', 'shards', fallback=DEFAULT_SHARDS)
+    if shards < 1:
+        raise ValueError("rabbitmq.shards must be at least 1")
+    return shards
+
+
+def jump_hash(key, buckets):
+    """Номер корзины 0..buckets-1 для 64-битного ключа (jump consistent hash)."""
+    b, j = -1, 0
+    while j < buckets:
+        b = j
+        key = (key * 2862933555777941757 + 1) & 0xFFFFFFFFFFFFFFFF
+        j = int((b + 1) * ((1 << 31) / ((key >> 33) + 1)))
+    return b
+
+
+def shard_for(value, shards):
+    """Шард для строки value; хеш не зависит от процесса, в отличие от hash()."""
+    if shards == 1:
+        return 0
+    key = int.from_bytes(hashlib.blake2b(value.encode(), digest_size=8).digest(), 'big')
+    return jump_hash(key, shards)
+
+
+def shard_queue(exchange, shard, shards):
+    """Имя очереди шарда; оно же ключ маршрутизации."""
+    if shards == 1:
+        return exchange
+    return f'{exchange}.{shard}'
+
+
+def parse_shard_set(value, shards, worker_id=0, workers=1):
+    """Номера шардов, которые потребляет воркер, по значению [consumer] shards."""
+    value = (value or 'all').strip()
+    if value == 'all':
+        return list(range(shards))
+    if value == 'auto':
+        # Воркеров больше, чем шардов: лишние делят шарды с остальными
+        return [shard for shard in range(shards) if shard % workers == worker_id % workers] or [worker_id % shards]
+
+    selected = set()
+    for part in value.split(','):
+        first, dash, last = part.strip().partition('-')
+        try:
+            first = int(first)
+            last = int(last) if dash else first
+        except ValueError:
+            raise ValueError(f"consumer.shards has an invalid item: {part.strip()!r}") from None
+        if not 0 <= first <= last < shards:
+            raise ValueError(f"consumer.shards item {part.strip()!r} is outside 0-{shards - 1}")
+        selected.update(range(first, last + 1))
+    return sorted(selected)
@@ -0,0 +1,192 @@
+"""Транспорт сообщений клиента и сервера.
+
+Транспорт публикует сообщения и подписывается на очереди, а доставка
+подтверждается или возвращается через её собственные ack() и nack().
+Доставка — объект с полями body, correlation_id, reply_to, type,
+content_type и redelivered; у RabbitMQ это aio_pika.IncomingMessage.
+Транспорт в памяти процесса для тестов и бенчмарков — в модуле memory.
+"""
+import asyncio
+import logging
+from abc import ABC, abstractmethod
+import aio_pika
+from aio_pika.exceptions import AMQPConnectionError, AMQPError, PublishError
+
+log = logging.getLogger(__name__)
+
+# Обменник по умолчанию: ключ маршрутизации — имя очереди
+DEFAULT_EXCHANGE = ''
+
+# Ошибки, после которых соединение с узлом брокера непригодно: обрыв,
+# зависание или отказ брокера в команде, закрывший канал
+CONNECTION_ERRORS = (OSError, asyncio.TimeoutError, AMQPError)
+
+
+class UnroutableError(Exception):
+    """Сообщение, опубликованное с mandatory=True, не попало ни в одну очередь."""
+
+
+class Transport(ABC):
+    """Соединение с брокером, через которое идут все сообщения клиента или сервера."""
+
+    def __init__(self):
+        self._close_callbacks = []
+
+    @property
+    @abstractmethod
+    def is_closed(self):
+        pass
+
+    def add_close_callback(self, callback):
+        """callback() вызывается, когда соединение закрыто или потеряно."""
+        self._close_callbacks.append(callback)
+
+    def _notify_closed(self):
+        callbacks, self._close_callbacks = self._close_callbacks, []
+        for callback in callbacks:
+            callback()
+
+    @abstractmethod
+    async def connect(self, host, port, login, password, timeout=None):
+        """Подключается к узлу; ConnectionError или OSError, если узел недоступен."""
+
+    @abstractmethod
+    async def close(self):
+        pass
+
+    @abstractmethod
+    async def declare_exchange(self, name):
+        """Объявляет прямой (direct) обменник."""
+
+    @abstractmethod
+    async def declare_queue(self, name, durable=False, exclusive=False, auto_delete=False,
+                            bind_to=None, routing_key=None):
+        """Объявляет очередь и, если задан bind_to, привязывает её к обменнику; возвращает имя очереди.
+
+        По умолчанию ключ привязки совпадает с именем очереди.
+        """
+
+    @abstractmethod
+    async def publish(self, exchange, routing_key, body, correlation_id=None, reply_to=None, type=None,
+                      content_type=None, mandatory=False):
+        """Публикует сообщение; с mandatory=True бросает UnroutableError, если брокер вернул его."""
+
+    @abstractmethod
+    async def consume(self, queue, callback, prefetch_count=0, no_ack=False):
+        """Подписывает корутину callback(delivery) на очередь; возвращает тег подписки.
+
+        prefetch_count ограничивает число неподтверждённых доставок (0 — без ограничения).
+        """
+
+    @abstractmethod
+    async def cancel(self, consumer_tag):
+        pass
+
+    @abstractmethod
+    async def queue_depth(self, queue):
+        """Число сообщений, ожидающих в очереди."""
+
+
+class RabbitMQTransport(Transport):
+    """Транспорт поверх aio_pika: одно соединение и один канал.
+
+    Закрытие канала брокером (например, после ошибки в команде) считается
+    потерей соединения: неподтверждённые публикации этого канала уже не
+    подтвердятся, и работать дальше можно только через новое соединение.
+    """
+
+    def __init__(self, publisher_confirms=True):
+        super().__init__()
+        self.publisher_confirms = publisher_confirms
+        self.connection = None
+        self.channel = None
+        self._exchanges = {}
+        self._queues = {}
+        self._consumers = {}
+
+    @property
+    def is_closed(self):
+        return self.connection is None or self.connection.is_closed or self.channel.is_closed
+
+    async def connect(self, host, port, login, password, timeout=None):
+        try:
+            self.connection = await aio_pika.connect(
+                host=host, port=port, login=login, password=password, timeout=timeout
+            )
+        except AMQPConnectionError as e:
+            raise ConnectionError(str(e)) from e
+        try:
+            self.channel = await self.connection.channel(
+                publisher_confirms=self.publisher_confirms, on_return_raises=self.publisher_confirms
+            )
+        except Exception as e:
+            # Без канала соединение бесполезно, а незакрытым оно осталось бы висеть
+            connection, self.connection = self.connection, None
+            await connection.close()
+            if isinstance(e, AMQPError):
+                raise ConnectionError(str(e)) from e
+            raise
+        self.connection.close_callbacks.add(self._on_closed)
+        self.channel.close_callbacks.add(self._on_closed)
+
+    def _on_closed(self, *args):
+        self._notify_closed()
+
+    async def close(self):
+        if self.connection is not None and not self.connection.is_closed:
+            await self.connection.close()
+
+    async def declare_exchange(self, name):
+        self._exchanges[name] = await self.channel.declare_exchange(
+            name, aio_pika.ExchangeType.DIRECT, durable=True, auto_delete=False
+        )
+
+    async def declare_queue(self, name, durable=False, exclusive=False, auto_delete=False,
+                            bind_to=None, routing_key=None):
+        queue = await self.channel.declare_queue(
+            name, durable=durable, exclusive=exclusive, auto_delete=auto_delete
+        )
+        if bind_to is not None:
+            await queue.bind(self._exchanges[bind_to], routing_key=routing_key or queue.name)
+        self._queues[queue.name] = queue
+        return queue.name
+
+    async def publish(self, exchange, routing_key, body, correlation_id=None, reply_to=None, type=None,
+                      content_type=None, mandatory=False):
+        if exchange == DEFAULT_EXCHANGE:
+            target = self.channel.default_exchange
+        else:
+            target = self._exchanges.get(exchange) or await self.channel.get_exchange(exchange)
+        try:
+            await target.publish(
+                aio_pika.Message(
+                    body=body, correlation_id=correlation_id, reply_to=reply_to, type=type, content_type=content_type
+                ),
+                routing_key=routing_key,
+                mandatory=mandatory
+            )
+        except PublishError as e:
+            raise UnroutableError(f"No queue is bound to '{exchange}' with key '{routing_key}'") from e
+
+    async def consume(self, queue, callback, prefetch_count=0, no_ack=False):
+        if prefetch_count:
+            await self.channel.set_qos(prefetch_count=prefetch_count)
+        consumer_tag = await self._queues[queue].consume(callback, no_ack=no_ack)
+        self._consumers[consumer_tag] = queue
+        return consumer_tag
+
+    async def cancel(self, consumer_tag):
+        queue = self._consumers.pop(consumer_tag, None)
+        if queue is not None:
+            await self._queues[queue].cancel(consumer_tag)
+
+    async def queue_depth(self, queue):
+        # Пассивное объявление несуществующей очереди закрывает канал, поэтому
+        # оно идёт через отдельный короткоживущий канал, а не через рабочий
+        channel = await self.connection.channel(publisher_confirms=False)
+        try:
+            declared = await channel.declare_queue(queue, passive=True)
+            return declared.declaration_result.message_count
+        finally:
+            if not channel.is_closed:
+                await channel.close()
@@ -0,0 +1,13 @@
+from setuptools import setup, find_packages
+
+setup(
+    name='rabbitmq_common',
+    version='1.0.0',
+    author='R&EC SPb ETU',
+    author_email='info@nicetu.spb.ru',
+    url='http://nicetu.spb.ru',
+    description='Работа с брокером сообщений, общая часть клиента и сервера',
+    long_description="",
+    zip_safe=False,
+    packages=find_packages(exclude=['tests']),
+)
@@ -0,0 +1,8 @@
+class FakeClock:
+    """Часы для clock=: время сдвигается присваиванием now."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
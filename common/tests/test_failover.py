@@ -0,0 +1,52 @@
+import configparser
+import random
+import pytest
+from rabbitmq_common.failover import EndpointRotation, load_failover_config, parse_endpoints
+from tests.conftest import FakeClock
+
+
+def test_parse_endpoints_uses_default_port():
+    assert parse_endpoints("a:5673, b ,", 5672) == (('a', 5673), ('b', 5672))
+    with pytest.raises(ValueError):
+        parse_endpoints(" , ", 5672)
+
+
+def test_load_failover_config_falls_back_to_host():
+    config = configparser.ConfigParser()
+    config.read_dict({'rabbitmq': {'host': 'rabbit', 'port': '5673'}})
+    endpoints, backoff_initial, backoff_max, attempt_timeout = load_failover_config(config)
+    assert endpoints == (('rabbit', 5673),)
+    assert (backoff_initial, backoff_max, attempt_timeout) == (0.05, 5.0, 1.0)
+
+    config.read_dict({'rabbitmq': {'hosts': 'a,b:5674', 'backoff_max_ms': '10'}})
+    with pytest.raises(ValueError):
+        load_failover_config(config)
+
+
+def test_failed_endpoint_is_skipped_until_its_backoff_expires():
+    clock = FakeClock()
+    rotation = EndpointRotation([('a', 1), ('b', 1)], backoff_initial=1.0, backoff_max=8.0, clock=clock)
+
+    endpoint, wait = rotation.next()
+    assert (endpoint, wait) == (('a', 1), 0.0)
+    rotation.connected(endpoint)
+
+    clock.now = 100.0
+    rotation.lost()
+    # Здоровый узел пробуется сразу, упавший — только после задержки
+    assert rotation.next() == (('b', 1), 0.0)
+    rotation.failed(('b', 1))
+    rotation.failed(('b', 1))
+    endpoint, wait = rotation.next()
+    assert endpoint == ('a', 1) and 0.5 <= wait <= 1.0
+
+    clock.now = 101.5
+    assert rotation.connected(('a', 1)) == pytest.approx(1.5)
+    assert rotation.last_recovery == pytest.approx(1.5)
+
+
+def test_backoff_grows_exponentially_with_jitter_up_to_max():
+    rotation = EndpointRotation([('a', 1)], backoff_initial=0.1, backoff_max=1.0, rng=random.Random(1))
+    for failures, limit in [(1, 0.1), (2, 0.2), (3, 0.4), (4, 0.8), (5, 1.0), (10, 1.0)]:
+        delay = rotation.backoff(failures)
+        assert limit / 2 <= delay <= limit
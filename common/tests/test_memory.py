@@ -0,0 +1,86 @@
+import asyncio
+import pytest
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_common.transport import DEFAULT_EXCHANGE
+
+
+async def connect(broker):
+    transport = MemoryTransport(broker)
+    await transport.connect('localhost', 5672, 'guest', 'guest')
+    return transport
+
+
+def test_direct_exchange_routes_by_key():
+    async def scenario():
+        transport = await connect(MemoryBroker())
+        await transport.declare_exchange('bews')
+        await transport.declare_queue('requests', bind_to='bews', routing_key='bews')
+        await transport.declare_queue('other', bind_to='bews')
+
+        await transport.publish('bews', 'bews', b'1', correlation_id='a')
+        await transport.publish('bews', 'unbound', b'2')
+        await transport.publish(DEFAULT_EXCHANGE, 'other', b'3')
+        return await transport.queue_depth('requests'), await transport.queue_depth('other')
+
+    assert asyncio.run(scenario()) == (1, 1)
+
+
+def test_prefetch_limits_unacked_deliveries_and_nack_requeues():
+    async def scenario():
+        transport = await connect(MemoryBroker())
+        await transport.declare_queue('requests')
+        for i in range(5):
+            await transport.publish(DEFAULT_EXCHANGE, 'requests', str(i).encode())
+
+        received = []
+
+        async def callback(delivery):
+            received.append(delivery)
+
+        await transport.consume('requests', callback, prefetch_count=2)
+        await asyncio.sleep(0)
+        assert [d.body for d in received] == [b'0', b'1']
+
+        await received[0].nack(requeue=True)
+        await asyncio.sleep(0)
+        assert received[2].body == b'0' and received[2].redelivered
+        with pytest.raises(RuntimeError):
+            await received[0].ack()
+
+        for delivery in received[1:3]:
+            await delivery.ack()
+        await asyncio.sleep(0)
+        return [d.body for d in received]
+
+    assert asyncio.run(scenario()) == [b'0', b'1', b'0', b'2', b'3']
+
+
+def test_closing_connection_requeues_unacked_and_drops_exclusive_queues():
+    async def scenario():
+        broker = MemoryBroker()
+        server = await connect(broker)
+        client = await connect(broker)
+        await server.declare_queue('requests')
+        await client.declare_queue('reply', exclusive=True, auto_delete=True)
+        with pytest.raises(PermissionError):
+            await server.declare_queue('reply')
+
+        await client.publish(DEFAULT_EXCHANGE, 'requests', b'x')
+        deliveries = []
+
+        async def callback(delivery):
+            deliveries.append(delivery)
+
+        await server.consume('requests', callback)
+        await asyncio.sleep(0)
+        lost = []
+        server.add_close_callback(lambda: lost.append(True))
+        broker.crash()
+        return broker, deliveries, lost
+
+    broker, deliveries, lost = asyncio.run(scenario())
+    assert lost == [True]
+    assert 'reply' not in broker.queues
+    assert list(broker.queues['requests'].messages)[0].redelivered
+    with pytest.raises(ConnectionError):
+        asyncio.run(deliveries[0].ack())
@@ -0,0 +1,27 @@
+import os
+from typing import NamedTuple
+from rabbitmq_common.settings import ConfigFile, affected_components
+
+
+def test_reload_ignores_rewrite_with_same_content(tmp_path):
+    path = tmp_path / 'server_config.ini'
+    path.write_text("[logging]\nlevel = INFO\n")
+    source = ConfigFile(path)
+    assert source.load().get('logging', 'level') == 'INFO'
+
+    path.write_text("[logging]\nlevel = INFO\n")
+    os.utime(path, ns=(1, 1))
+    assert not source.reload()
+
+    path.write_text("[logging]\nlevel = DEBUG\n")
+    assert source.reload()
+    assert source.config.get('logging', 'level') == 'DEBUG'
+
+
+def test_affected_components():
+    class Settings(NamedTuple):
+        host: str
+        level: str
+
+    components = {'connection': ('host',), 'logging': ('level',)}
+    assert affected_components(Settings('a', 'INFO'), Settings('a', 'DEBUG'), components) == {'logging'}
@@ -0,0 +1,41 @@
+import configparser
+import uuid
+import pytest
+from rabbitmq_common.sharding import jump_hash, load_sharding_config, parse_shard_set, shard_for, shard_queue
+
+
+def test_jump_hash_moves_only_keys_that_go_to_the_new_shard():
+    keys = range(1, 10001)
+    before = [jump_hash(key * 0x9E3779B97F4A7C15, 8) for key in keys]
+    after = [jump_hash(key * 0x9E3779B97F4A7C15, 9) for key in keys]
+
+    assert set(before) == set(range(8))
+    moved = [new for old, new in zip(before, after) if old != new]
+    assert set(moved) == {8}
+    assert 0.08 < len(moved) / len(keys) < 0.14
+
+
+def test_shard_for_is_stable_and_single_shard_keeps_legacy_queue():
+    client_uuid = str(uuid.uuid4())
+    assert shard_for(client_uuid, 16) == shard_for(client_uuid, 16)
+    assert shard_for(client_uuid, 1) == 0
+    assert shard_queue('bews', 0, 1) == 'bews'
+    assert shard_queue('bews', 3, 4) == 'bews.3'
+
+
+def test_parse_shard_set():
+    assert parse_shard_set(None, 4) == [0, 1, 2, 3]
+    assert parse_shard_set('auto', 5, worker_id=1, workers=2) == [1, 3]
+    assert parse_shard_set('auto', 2, worker_id=2, workers=3) == [0]
+    assert parse_shard_set('0, 2-3', 4) == [0, 2, 3]
+    for value in ('4', '1-', 'x'):
+        with pytest.raises(ValueError):
+            parse_shard_set(value, 4)
+
+
+def test_load_sharding_config_validates_count():
+    config = configparser.ConfigParser()
+    assert load_sharding_config(config) == 1
+    config.read_dict({'rabbitmq': {'shards': '0'}})
+    with pytest.raises(ValueError):
+        load_sharding_config(config)
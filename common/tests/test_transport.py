@@ -0,0 +1,99 @@
+import asyncio
+import aio_pika
+import pytest
+from aio_pika.exceptions import AMQPChannelError
+from rabbitmq_common.transport import RabbitMQTransport
+
+
+class FakeChannel:
+    """Канал aio_pika, который закрывается брокером на пассивном объявлении неизвестной очереди."""
+
+    def __init__(self, queues):
+        self.queues = queues
+        self.close_callbacks = set()
+        self.is_closed = False
+
+    def broker_close(self):
+        self.is_closed = True
+        for callback in list(self.close_callbacks):
+            callback(self, None)
+
+    async def declare_queue(self, name, passive=False):
+        if name not in self.queues:
+            self.broker_close()
+            raise LookupError(f"NOT_FOUND - no queue '{name}'")
+
+        class Declared:
+            class declaration_result:
+                message_count = self.queues[name]
+        return Declared
+
+    async def close(self):
+        self.is_closed = True
+
+
+class FakeConnection:
+    def __init__(self, queues):
+        self.queues = queues
+        self.channels = []
+        self.close_callbacks = set()
+        self.is_closed = False
+        self.channel_error = None
+
+    async def channel(self, publisher_confirms=True, on_return_raises=False):
+        if self.channel_error is not None:
+            raise self.channel_error
+        channel = FakeChannel(self.queues)
+        self.channels.append(channel)
+        return channel
+
+    async def close(self):
+        self.is_closed = True
+
+
+def connect_fake(monkeypatch, queues, connection=None):
+    connection = connection or FakeConnection(queues)
+
+    async def fake_connect(**kwargs):
+        return connection
+
+    monkeypatch.setattr(aio_pika, 'connect', fake_connect)
+    transport = RabbitMQTransport()
+    lost = []
+    transport.add_close_callback(lambda: lost.append(True))
+    return transport, lost
+
+
+def test_queue_depth_does_not_touch_the_working_channel(monkeypatch):
+    transport, lost = connect_fake(monkeypatch, {'bews.0': 7})
+
+    async def scenario():
+        await transport.connect('localhost', 5672, 'guest', 'guest')
+        depth = await transport.queue_depth('bews.0')
+        with pytest.raises(LookupError):
+            await transport.queue_depth('bews.1')
+        return depth
+
+    assert asyncio.run(scenario()) == 7
+    working, *probes = transport.connection.channels
+    assert len(probes) == 2 and all(channel.is_closed for channel in probes)
+    assert not transport.is_closed and lost == []
+
+
+def test_channel_closed_by_broker_counts_as_lost_connection(monkeypatch):
+    transport, lost = connect_fake(monkeypatch, {})
+    asyncio.run(transport.connect('localhost', 5672, 'guest', 'guest'))
+
+    transport.channel.broker_close()
+    assert transport.is_closed and lost == [True]
+
+
+def test_connection_is_closed_when_channel_cannot_be_opened(monkeypatch):
+    connection = FakeConnection({})
+    connection.channel_error = AMQPChannelError("channel refused")
+    transport, lost = connect_fake(monkeypatch, {}, connection)
+
+    with pytest.raises(ConnectionError):
+        asyncio.run(transport.connect('localhost', 5672, 'guest', 'guest'))
+    assert connection.is_closed
+    assert transport.is_closed
@@ -1,59 +1,340 @@
+import argparse
+import functools
 import logging
-import aio_pika
+import signal
 import asyncio
-from pathlib import Path
-from rabbitmq_server.server_state import ServerContext, WaitingState, load_server_config
-from rabbitmq_server.config import configure_logging
+import configparser
+from rabbitmq_server.server_state import ServerContext, WaitingState
+from rabbitmq_server.config import configure_logging, stop_listener, worker_log_file
+from rabbitmq_server.consumer import Consumer
+from rabbitmq_server.publisher import ResponsePublisher
+from rabbitmq_server.scheduler import DelayScheduler
+from rabbitmq_common.failover import EndpointRotation
+from rabbitmq_common.settings import ConfigFile, affected_components
+from rabbitmq_common.transport import CONNECTION_ERRORS, RabbitMQTransport
+from rabbitmq_server.dedupe import DedupeCache
+from rabbitmq_server.handlers import Dispatcher
+from rabbitmq_server.metrics import MetricsServer, ServerMetrics
+from rabbitmq_server.pipeline import Pipeline
+from rabbitmq_common.sharding import parse_shard_set, shard_queue
+from rabbitmq_server.settings import (
+    CONFIG_PATH, RESTART_COMPONENTS, SETTINGS_COMPONENTS, load_server_settings
+)
+from rabbitmq_server.supervisor import Supervisor
 
 log = logging.getLogger(__name__)
 
-async def main():
-    """Основная функция сервера"""
+# Минимальное время на отправку накопленных ответов, даже если срок остановки вышел;
+# столько же планировщик ждёт досрочной отправки отложенных ответов
+PUBLISH_FLUSH_GRACE = 1.0
 
-    config = load_server_config()
-    configure_logging(level=config['logging']['level'], log_file=config['logging']['file'])
+async def wait_for_signal(signals):
+    """Ждёт одного из сигналов остановки"""
 
-    rabbit_config = config['rabbitmq']
-    connection_string = (
-        f"amqp://{rabbit_config['user']}:{rabbit_config['password']}"
-        f"@{rabbit_config['host']}:{rabbit_config['port']}/"
-    )
+    loop = asyncio.get_running_loop()
+    stop = asyncio.Event()
+    for signum in signals:
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except NotImplementedError:
+            # Windows: у цикла событий нет add_signal_handler
+            signal.signal(signum, lambda *args: loop.call_soon_threadsafe(stop.set))
+    try:
+        await stop.wait()
+    finally:
+        for signum in signals:
+            try:
+                loop.remove_signal_handler(signum)
+            except NotImplementedError:
+                signal.signal(signum, signal.SIG_DFL)
+
+async def drain(consumer, scheduler, publisher, timeout):
+    """Плавно останавливает обработку за timeout секунд.
+
+    Потребитель перестаёт принимать доставки и дообрабатывает принятые,
+    планировщик отправляет отложенные ответы, публикатор дожидается
+    подтверждений брокера.
+    """
+
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + timeout
+
+    def remaining():
+        return max(0.0, deadline - loop.time())
+
+    await consumer.stop(timeout=remaining())
+    await scheduler.drain(timeout=remaining(), grace=PUBLISH_FLUSH_GRACE)
+    await scheduler.close()
+    await publisher.close(timeout=max(remaining(), PUBLISH_FLUSH_GRACE))
+
+async def connect_with_failover(rotation, settings, stop, metrics=None, transport_factory=RabbitMQTransport):
+    """Подключается к первому доступному узлу брокера и возвращает транспорт; None, если пришёл сигнал остановки.
+
+    Упавший узел пропускается, пока не истечёт его задержка, а попытка к
+    зависшему узлу длится не дольше attempt_timeout.
+    """
+
+    while not stop.is_set():
+        endpoint, wait = rotation.next()
+        if wait > 0:
+            try:
+                await asyncio.wait_for(stop.wait(), wait)
+                return None
+            except asyncio.TimeoutError:
+                pass
+
+        host, port = endpoint
+        transport = transport_factory()
+        try:
+            await transport.connect(host, port, settings.user, settings.password, timeout=settings.attempt_timeout)
+        except (OSError, asyncio.TimeoutError) as e:
+            rotation.failed(endpoint)
+            log.warning("Cannot connect to RabbitMQ at %s:%s: %s", host, port, e)
+            continue
+
+        recovery = rotation.connected(endpoint)
+        if recovery is None:
+            log.info("Connected to RabbitMQ at %s:%s", host, port)
+        else:
+            log.info("Reconnected to RabbitMQ at %s:%s in %.0f ms", host, port, recovery * 1000)
+            if metrics is not None:
+                metrics.reconnects.inc()
+                metrics.recovery_seconds.set(recovery)
+        return transport
+    return None
+
+async def serve_connection(transport, settings, stop, metrics, dedupe, dispatcher, consumed_shards=(0,)):
+    """Обслуживает очередь запросов по одному соединению до остановки или обрыва.
 
-    connection = await aio_pika.connect_robust(connection_string)
-    log.info("Connected to RabbitMQ")
+    Объявляются все шарды очереди запросов, а потребляются только
+    consumed_shards. При остановке обработка плавно завершается за
+    settings.shutdown_timeout секунд, при обрыве — без ожидания: непринятые брокером
+    сообщения вернутся в очередь.
+    """
 
-    async with connection:
-        channel = await connection.channel()
+    lost = asyncio.Event()
+    transport.add_close_callback(lost.set)
+
+    try:
+        publisher = ResponsePublisher(
+            transport, batch_size=settings.publisher_batch_size, linger=settings.publisher_linger,
+            buffer_size=settings.publisher_buffer_size, metrics=metrics
+        )
+        await publisher.start()
+        scheduler = DelayScheduler(publisher)
+        await scheduler.start()
 
         # Настройка контекста сервера
-        context = ServerContext(channel, config)
+        context = ServerContext(
+            transport, settings,
+            publisher=publisher, scheduler=scheduler, dedupe=dedupe, dispatcher=dispatcher, metrics=metrics,
+            pipeline=Pipeline.from_settings(settings)
+        )
         context.set_state(WaitingState())
 
-        exchange = await channel.declare_exchange(
-            rabbit_config['exchange'],
-            aio_pika.ExchangeType.DIRECT,
-            durable=True,
-            auto_delete=False
+        consumed = [shard_queue(settings.exchange, shard, settings.shards) for shard in consumed_shards]
+        consumer = Consumer(
+            context, consumed, prefetch_count=settings.prefetch_count, workers=settings.consumer_workers
         )
-        log.info(f"Exchange '{rabbit_config['exchange']}' declared.")
 
-        queue = await channel.declare_queue(
-            rabbit_config['exchange'],
-            durable=True,
-            auto_delete=True
-        )
+        stopped = asyncio.ensure_future(stop.wait())
+        closed = asyncio.ensure_future(lost.wait())
+        try:
+            await transport.declare_exchange(settings.exchange)
+            log.info("Exchange '%s' declared.", settings.exchange)
+
+            # Шард без привязки терял бы запросы своих клиентов, поэтому
+            # привязываются все шарды, даже не потребляемые этим воркером.
+            # Шарды не удаляются с уходом потребителя: иначе запросы к шарду
+            # упавшего воркера терялись бы до его перезапуска
+            for shard in range(settings.shards):
+                await transport.declare_queue(
+                    shard_queue(settings.exchange, shard, settings.shards),
+                    durable=True,
+                    bind_to=settings.exchange
+                )
+
+            await consumer.start()
+            log.info("Server is listening on queues: %s", ', '.join(consumed))
+
+            metrics.in_flight.func = lambda: consumer.in_flight
+            metrics.delay_queue_size.func = lambda: len(scheduler)
+            metrics.watch_queue_depth(transport, consumed)
+
+            await asyncio.wait([stopped, closed], return_when=asyncio.FIRST_COMPLETED)
+        finally:
+            # Сюда же попадает ошибка объявления или подписки: потребитель,
+            # планировщик и публикатор останавливаются, а ошибка уходит в serve
+            stopped.cancel()
+            closed.cancel()
+            if stop.is_set():
+                log.info("Server shutdown initiated, draining for up to %s seconds...", settings.shutdown_timeout)
+                await drain(consumer, scheduler, publisher, settings.shutdown_timeout)
+            else:
+                if lost.is_set():
+                    log.warning("Connection to RabbitMQ lost")
+                await drain(consumer, scheduler, publisher, 0)
+    finally:
+        await transport.close()
 
-        await queue.bind(exchange, routing_key=rabbit_config['exchange'])
+def reload_settings(config_source, settings):
+    """Перечитывает файл настроек; возвращает (настройки, затронутые компоненты).
 
-        await queue.consume(lambda message: asyncio.create_task(context.handle_request(message)))
-        log.info(f"Server is listening on queue: {queue.name}")
+    При ошибке в файле остаются прежние настройки.
+    """
+    try:
+        if not config_source.reload():
+            return settings, set()
+        new_settings = load_server_settings(config_source.config)
+    except (configparser.Error, ValueError) as e:
+        log.error("Invalid configuration, keeping previous settings: %s", e)
+        return settings, set()
 
+    components = affected_components(settings, new_settings, SETTINGS_COMPONENTS)
+    if components:
+        log.info("Configuration changed: %s", ', '.join(sorted(components)))
+    deferred = components & RESTART_COMPONENTS
+    if deferred:
+        log.warning("Changes to %s take effect after restart", ', '.join(sorted(deferred)))
+    return new_settings, components
+
+async def serve(settings, worker_id=0, stop_signals=(signal.SIGTERM, signal.SIGINT), stop=None,
+                transport_factory=RabbitMQTransport, workers=1, config_source=None):
+    """Обслуживает очередь запросов в одном цикле событий до сигнала остановки.
+
+    Соединение ставится с первым доступным узлом из [rabbitmq] hosts; после
+    обрыва сервер переключается на следующий узел, а кэш повторов,
+    обработчики и метрики переживают переподключение. stop — событие для
+    остановки без сигнала, transport_factory — транспорт (например,
+    MemoryTransport для тестов и бенчмарков), workers — число процессов-
+    воркеров для распределения шардов ([consumer] shards = auto).
+    config_source — ConfigFile, который перечитывается после обрыва:
+    настройки соединения, публикатора, потребителя и конвейера применяются
+    при следующем подключении.
+    """
+
+    rotation = EndpointRotation(settings.endpoints, settings.backoff_initial, settings.backoff_max)
+    consumed_shards = parse_shard_set(settings.consumer_shards, settings.shards, worker_id, workers)
+
+    metrics = ServerMetrics()
+    dedupe = DedupeCache(max_size=settings.dedupe_max_size, ttl=settings.dedupe_ttl)
+    dispatcher = Dispatcher(thread_workers=settings.thread_workers, process_workers=settings.process_workers)
+
+    metrics_server = None
+    if settings.metrics_enabled:
+        # В многопроцессном режиме каждый воркер слушает свой порт
+        metrics_server = MetricsServer(
+            metrics.registry, host=settings.metrics_host, port=settings.metrics_port + worker_id
+        )
         try:
-            log.info("Server is running. Press Ctrl+C to stop.")
-            while True:
-                await asyncio.sleep(3600)
-        except KeyboardInterrupt:
-            log.info("Server shutdown initiated...")
+            await metrics_server.start()
+        except OSError as e:
+            # Занятый порт метрик не должен мешать обработке запросов
+            log.error("Cannot serve metrics on %s:%s, continuing without them: %s",
+                      metrics_server.host, metrics_server.port, e)
+            metrics_server = None
+
+    stop = stop if stop is not None else asyncio.Event()
+    signal_task = asyncio.ensure_future(wait_for_signal(stop_signals))
+    signal_task.add_done_callback(lambda task: stop.set())
+    try:
+        log.info("Server is running. Press Ctrl+C or send SIGTERM to stop.")
+        while not stop.is_set():
+            transport = await connect_with_failover(rotation, settings, stop, metrics, transport_factory)
+            if transport is None:
+                break
+            try:
+                await serve_connection(transport, settings, stop, metrics, dedupe, dispatcher, consumed_shards)
+            except CONNECTION_ERRORS as e:
+                # Брокер отказал в объявлении или подписке, либо соединение
+                # оборвалось посреди них: переподключаемся, как при обрыве
+                log.error("RabbitMQ connection failed: %s", e)
+            if stop.is_set():
+                break
+
+            rotation.lost()
+            if config_source is None:
+                continue
+            new_settings, components = reload_settings(config_source, settings)
+            try:
+                new_shards = parse_shard_set(new_settings.consumer_shards, new_settings.shards, worker_id, workers)
+            except ValueError as e:
+                log.error("Invalid configuration, keeping previous settings: %s", e)
+                continue
+            settings, consumed_shards = new_settings, new_shards
+            if 'failover' in components:
+                rotation = EndpointRotation(settings.endpoints, settings.backoff_initial, settings.backoff_max)
+    finally:
+        signal_task.cancel()
+        await asyncio.gather(signal_task, return_exceptions=True)
+        dispatcher.shutdown()
+        if metrics_server is not None:
+            await metrics_server.close()
+        log.info("Dedupe cache: hits=%s, misses=%s", dedupe.hits, dedupe.misses)
+
+    log.info("Server stopped")
+
+def setup_logging(settings, worker_id=None):
+    """Настраивает логирование по секции [logging]; воркер пишет в свой файл"""
+
+    return configure_logging(
+        level=settings.log_level,
+        log_file=settings.log_file if worker_id is None else worker_log_file(settings.log_file, worker_id),
+        max_bytes=settings.log_max_bytes,
+        backup_count=settings.log_backup_count,
+        sample_every=settings.log_sample_every
+    )
+
+def load_settings(config_source):
+    """Читает настройки при запуске; некорректный файл завершает процесс с сообщением об ошибке."""
+
+    try:
+        return load_server_settings(config_source.load())
+    except (configparser.Error, ValueError) as e:
+        raise SystemExit(f"Invalid configuration in {config_source.path}: {e}")
+
+def run_worker(worker_id, workers=1):
+    """Точка входа процесса-воркера в многопроцессном режиме"""
+
+    config_source = ConfigFile(CONFIG_PATH)
+    settings = load_settings(config_source)
+    listener = setup_logging(settings, worker_id)
+    log.info("Worker %s is starting", worker_id)
+    try:
+        # SIGINT воркеры игнорируют, остановку рассылает супервизор
+        asyncio.run(serve(
+            settings, worker_id, stop_signals=(signal.SIGTERM,), workers=workers, config_source=config_source
+        ))
+    finally:
+        # Процесс завершается через os._exit, atexit-обработчики не сработают
+        stop_listener(listener)
+
+def main(argv=None):
+    """Основная функция сервера"""
+
+    parser = argparse.ArgumentParser(prog='rabbitmq_server')
+    parser.add_argument(
+        '--workers', type=int, default=None,
+        help="number of worker processes (default: [server] workers or 1)"
+    )
+    args = parser.parse_args(argv)
+
+    config_source = ConfigFile(CONFIG_PATH)
+    settings = load_settings(config_source)
+    setup_logging(settings)
+
+    workers = args.workers or settings.workers
+    if workers > 1:
+        supervisor = Supervisor(
+            functools.partial(run_worker, workers=workers),
+            workers,
+            restart_delay=settings.restart_delay,
+            # Запас сверх срока плавной остановки на закрытие соединения
+            shutdown_timeout=settings.shutdown_timeout + 5
+        )
+        supervisor.run()
+    else:
+        asyncio.run(serve(settings, config_source=config_source))
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    main()
@@ -1,6 +1,11 @@
+import atexit
 import configparser
+import contextvars
 import pathlib
 import logging
+import queue
+import zlib
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 def load_config(path=None):
     """Загружает конфигурацию из указанного ini-файла."""
@@ -30,14 +35,121 @@ def load_config(path=None):
         'client': client_config
     }
 
-def configure_logging(level, log_file):
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+DEFAULT_SAMPLE_EVERY = 1
+
+# Логгеры, которые пишут по строке на каждое сообщение
+HOT_PATH_LOGGERS = ('rabbitmq_server.server_state', 'rabbitmq_server.pipeline')
+
+LOG_FORMAT = "%(asctime)s - %(levelname)s - %(message)s"
+
+# Ключ запроса (request_id или correlation_id пакета), который сейчас обрабатывает конвейер
+log_request_key = contextvars.ContextVar('log_request_key', default=None)
+
+
+def is_sampled(key, every):
+    """Попадает ли запрос key в выборку одного из every запросов."""
+    return zlib.crc32(key.encode()) % every == 0
+
+
+class SamplingFilter(logging.Filter):
+    """Пропускает INFO-записи и ниже одного из every запросов; WARNING и выше проходят всегда.
+
+    Выборка зависит только от ключа запроса из log_request_key, поэтому
+    строки одного запроса остаются или отбрасываются все вместе, одинаково
+    во всех воркерах и при повторной доставке. Записи вне запроса не
+    прореживаются.
+    """
+
+    def __init__(self, every):
+        super().__init__()
+        self.every = every
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.every <= 1:
+            return True
+        key = log_request_key.get()
+        return key is None or is_sampled(key, self.every)
+
+
+class LazyQueueHandler(QueueHandler):
+    """QueueHandler, который не форматирует запись в потоке цикла событий.
+
+    Сообщение собирается из msg и args уже в потоке QueueListener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class LogListener(QueueListener):
+    """QueueListener, который сам помнит, запущен ли он: stop() можно вызывать повторно."""
+
+    def __init__(self, queue, *handlers, respect_handler_level=False):
+        super().__init__(queue, *handlers, respect_handler_level=respect_handler_level)
+        self.running = False
+
+    def start(self):
+        super().start()
+        self.running = True
+
+    def stop(self):
+        if not self.running:
+            return
+        self.running = False
+        super().stop()
+
+
+def stop_listener(listener):
+    """Останавливает LogListener, дописав оставшиеся записи; повторный вызов ничего не делает."""
+    listener.stop()
+
+
+def worker_log_file(log_file, worker_id):
+    """Файл журнала воркера: Log_File.log -> Log_File.worker1.log.
+
+    RotatingFileHandler не рассчитан на запись из нескольких процессов:
+    ротация в одном воркере оборвала бы файл под остальными.
+    """
+    path = pathlib.Path(log_file)
+    return path.with_name(f"{path.stem}.worker{worker_id}{path.suffix}")
+
+
+def configure_logging(level, log_file, max_bytes=DEFAULT_MAX_BYTES, backup_count=DEFAULT_BACKUP_COUNT,
+                      sample_every=DEFAULT_SAMPLE_EVERY, stream=None):
+    """Настраивает неблокирующее логирование.
+
+    Записи уходят в очередь, а в консоль и в ротируемый файл их пишет
+    фоновый QueueListener. INFO-записи горячего пути прореживаются:
+    сохраняются записи одного из sample_every запросов.
+    """
     log_level = getattr(logging, level.upper(), logging.INFO)
 
-    logging.basicConfig(
-        level=log_level,
-        format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(log_file)
-        ]
-    )
+    formatter = logging.Formatter(LOG_FORMAT)
+    handlers = [
+        logging.StreamHandler(stream),
+        RotatingFileHandler(log_file, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+    ]
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue = queue.SimpleQueue()
+    listener = LogListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(stop_listener, listener)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(log_level)
+
+    for name in HOT_PATH_LOGGERS:
+        hot_logger = logging.getLogger(name)
+        for old_filter in [f for f in hot_logger.filters if isinstance(f, SamplingFilter)]:
+            hot_logger.removeFilter(old_filter)
+        hot_logger.addFilter(SamplingFilter(sample_every))
+
+    return listener
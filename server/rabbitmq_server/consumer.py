@@ -0,0 +1,135 @@
+import asyncio
+import logging
+import time
+
+log = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH_COUNT = 64
+DEFAULT_WORKERS = 16
+
+
+def load_consumer_config(config):
+    """Читает параметры потребителя из секции [consumer]."""
+    prefetch_count = config.getint('consumer', 'prefetch_count', fallback=DEFAULT_PREFETCH_COUNT)
+    workers = config.getint('consumer', 'workers', fallback=DEFAULT_WORKERS)
+
+    if prefetch_count < 1:
+        raise ValueError("consumer.prefetch_count must be positive")
+    if workers < 1:
+        raise ValueError("consumer.workers must be positive")
+
+    return prefetch_count, workers
+
+
+class Consumer:
+    """Потребитель очередей с общим ограниченным пулом обработчиков.
+
+    queue — имя очереди или список имён (шарды очереди запросов). Брокер
+    отдаёт не больше prefetch_count неподтверждённых сообщений на очередь,
+    а обработку выполняет фиксированное число задач-воркеров. Когда все
+    воркеры заняты и локальный буфер заполнен, callback потребителя ждёт
+    свободного места, и новые доставки не принимаются.
+    """
+
+    def __init__(self, context, queue, prefetch_count=DEFAULT_PREFETCH_COUNT, workers=DEFAULT_WORKERS):
+        self.context = context
+        self.queues = [queue] if isinstance(queue, str) else list(queue)
+        self.prefetch_count = prefetch_count
+        self.workers = workers
+        self._buffer = None
+        self._tasks = []
+        self._consumer_tags = []
+        self._active = 0
+        self._waiting = 0
+        self._closing = False
+
+    @property
+    def in_flight(self):
+        """Число сообщений, принятых от брокера и ещё не обработанных."""
+        if self._buffer is None:
+            return 0
+        return self._waiting + self._buffer.qsize() + self._active
+
+    async def start(self):
+        self._buffer = asyncio.Queue(maxsize=self.workers)
+        self._tasks = [
+            asyncio.create_task(self._worker(), name=f"consumer-worker-{i}")
+            for i in range(self.workers)
+        ]
+        for queue in self.queues:
+            self._consumer_tags.append(await self.context.transport.consume(
+                queue, self._on_message, prefetch_count=self.prefetch_count
+            ))
+        log.info("Consumer started: queues=%s, prefetch_count=%s, workers=%s",
+                 ', '.join(self.queues), self.prefetch_count, self.workers)
+
+    async def stop(self, timeout=None):
+        """Прекращает приём доставок, дожидается обработки принятых и останавливает воркеры.
+
+        Сообщения, которые не успели обработать за timeout секунд,
+        возвращаются брокеру (nack с requeue).
+        """
+        self._closing = True
+        for consumer_tag in self._consumer_tags:
+            try:
+                await self.context.transport.cancel(consumer_tag)
+            except Exception as e:
+                # Канал уже закрыт вместе с соединением: брокер сам вернёт доставки в очередь
+                log.warning("Failed to cancel consumer: %s", e)
+        self._consumer_tags = []
+
+        if self._buffer is not None and timeout != 0:
+            try:
+                await asyncio.wait_for(self._drain(), timeout)
+            except asyncio.TimeoutError:
+                log.warning("Consumer did not drain in %s seconds, %s messages left", timeout, self.in_flight)
+
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        while self._buffer is not None and not self._buffer.empty():
+            message, _ = self._buffer.get_nowait()
+            await self._requeue(message)
+        log.info("Consumer stopped")
+
+    async def _drain(self):
+        while True:
+            await self._buffer.join()
+            if self._waiting == 0:
+                return
+            await asyncio.sleep(0.01)
+
+    async def _requeue(self, message):
+        try:
+            await message.nack(requeue=True)
+        except Exception as e:
+            log.error("Failed to requeue message: %s", e)
+
+    async def _on_message(self, message):
+        if self._closing:
+            # Доставка пришла после basic.cancel
+            await self._requeue(message)
+            return
+
+        # Ожидание здесь и есть обратное давление: пока буфер полон,
+        # сообщение не передаётся воркерам. Момент приёма нужен для
+        # проверки срока и метрики задержки.
+        self._waiting += 1
+        try:
+            await self._buffer.put((message, time.perf_counter()))
+        finally:
+            self._waiting -= 1
+
+    async def _worker(self):
+        while True:
+            message, received_at = await self._buffer.get()
+            self._active += 1
+            try:
+                await self.context.handle_request(message, received_at)
+            except Exception as e:
+                log.error("Unhandled error in consumer worker: %s", e)
+            finally:
+                self._active -= 1
+                self._buffer.task_done()
@@ -0,0 +1,34 @@
+import time
+from rabbitmq_common.cache import TTLCache
+
+DEFAULT_MAX_SIZE = 10000
+DEFAULT_TTL = 300.0
+
+
+def load_dedupe_config(config):
+    """Читает параметры кэша повторных доставок из секции [dedupe]."""
+    max_size = config.getint('dedupe', 'max_size', fallback=DEFAULT_MAX_SIZE)
+    ttl = config.getfloat('dedupe', 'ttl', fallback=DEFAULT_TTL)
+
+    if max_size < 0:
+        raise ValueError("dedupe.max_size must not be negative")
+    if ttl <= 0:
+        raise ValueError("dedupe.ttl must be positive")
+
+    return max_size, ttl
+
+
+class DedupeCache(TTLCache):
+    """LRU-кэш готовых ответов с ограниченным временем жизни записей.
+
+    Ключ — request_id запроса (или correlation_id пакета), значение —
+    сериализованный ответ и его AMQP-тип: get() возвращает пару
+    (body, message_type). Повторная доставка того же запроса отвечается из
+    кэша без вызова обработчика.
+    """
+
+    def __init__(self, max_size=DEFAULT_MAX_SIZE, ttl=DEFAULT_TTL, clock=time.monotonic):
+        super().__init__(max_size, ttl, clock)
+
+    def put(self, key, body, message_type=None):
+        super().put(key, (body, message_type))
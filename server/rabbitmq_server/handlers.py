@@ -0,0 +1,119 @@
+import asyncio
+import logging
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from rabbitmq_server.utils import count_primes, double_number, double_numbers
+
+log = logging.getLogger(__name__)
+
+# Где выполняется обработчик
+INLINE = 'inline'
+THREAD = 'thread'
+PROCESS = 'process'
+MODES = (INLINE, THREAD, PROCESS)
+
+DEFAULT_THREAD_WORKERS = 4
+
+
+class UnknownOperation(ValueError):
+    """В реестре нет обработчика операции; клиенту отправляется ответ с ошибкой."""
+
+
+class Handler:
+    """Описание операции: функция, режим выполнения и необязательный пакетный вариант."""
+
+    def __init__(self, name, func, mode=INLINE, batch_func=None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown handler mode '{mode}' for operation '{name}'")
+        self.name = name
+        self.func = func
+        self.mode = mode
+        self.batch_func = batch_func
+
+    def run_many(self, values):
+        if self.batch_func is not None:
+            return self.batch_func(values)
+        return [self.func(value) for value in values]
+
+
+# Реестр операций, доступных клиентам через поле Request.operation
+registry = {}
+
+
+def register(name, mode=INLINE, batch=None):
+    """Декоратор, регистрирующий функцию как обработчик операции name."""
+    def decorator(func):
+        registry[name] = Handler(name, func, mode=mode, batch_func=batch)
+        return func
+    return decorator
+
+
+register('double', batch=double_numbers)(double_number)
+register('count_primes', mode=PROCESS)(count_primes)
+
+
+def _run_many(handler, values):
+    # Вызывается в пуле потоков или процессов: весь пакет за одну передачу
+    return handler.run_many(values)
+
+
+def load_handlers_config(config):
+    """Читает размеры пулов из секции [handlers]."""
+    thread_workers = config.getint('handlers', 'thread_workers', fallback=DEFAULT_THREAD_WORKERS)
+    process_workers = config.getint('handlers', 'process_workers', fallback=os.cpu_count() or 1)
+
+    if thread_workers < 1:
+        raise ValueError("handlers.thread_workers must be positive")
+    if process_workers < 1:
+        raise ValueError("handlers.process_workers must be positive")
+
+    return thread_workers, process_workers
+
+
+class Dispatcher:
+    """Вызывает обработчики из реестра в цикле событий или в пулах исполнителей.
+
+    Пулы создаются при первом обращении к операции соответствующего режима.
+    """
+
+    def __init__(self, handlers=None, thread_workers=DEFAULT_THREAD_WORKERS, process_workers=1):
+        self.handlers = registry if handlers is None else handlers
+        self.thread_workers = thread_workers
+        self.process_workers = process_workers
+        self._executors = {}
+
+    def get(self, operation):
+        handler = self.handlers.get(operation)
+        if handler is None:
+            raise UnknownOperation(f"Unknown operation '{operation}'")
+        return handler
+
+    async def call(self, operation, value):
+        handler = self.get(operation)
+        if handler.mode == INLINE:
+            return handler.func(value)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(handler.mode), handler.func, value)
+
+    async def call_many(self, operation, values):
+        handler = self.get(operation)
+        if handler.mode == INLINE:
+            return handler.run_many(values)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor(handler.mode), _run_many, handler, values)
+
+    def shutdown(self):
+        for executor in self._executors.values():
+            executor.shutdown(wait=True, cancel_futures=True)
+        self._executors.clear()
+
+    def _executor(self, mode):
+        executor = self._executors.get(mode)
+        if executor is None:
+            if mode == THREAD:
+                executor = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix='handler')
+            else:
+                executor = ProcessPoolExecutor(max_workers=self.process_workers)
+            self._executors[mode] = executor
+            log.info("Started %s pool for handlers", mode)
+        return executor
@@ -0,0 +1,259 @@
+import asyncio
+import bisect
+import logging
+
+log = logging.getLogger(__name__)
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9100
+
+# Границы корзин гистограмм задержек, в секундах
+LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def load_metrics_config(config):
+    """Читает параметры HTTP-эндпоинта метрик из секции [metrics]."""
+    enabled = config.getboolean('metrics', 'enabled', fallback=False)
+    host = config.get('metrics', 'host', fallback=DEFAULT_HOST)
+    port = config.getint('metrics', 'port', fallback=DEFAULT_PORT)
+    return enabled, host, port
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Монотонный счётчик. Если задан func, значение берётся из него при выдаче."""
+
+    kind = 'counter'
+
+    def __init__(self, name, help, func=None, labels=''):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labels = labels
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        value = self.func() if self.func is not None else self.value
+        return [(f'{self.name}{{{self.labels}}}' if self.labels else self.name, value)]
+
+
+class Gauge(Counter):
+    """Текущее значение, которое может как расти, так и уменьшаться."""
+
+    kind = 'gauge'
+
+    def set(self, value):
+        self.value = value
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram:
+    """Гистограмма с фиксированными корзинами в формате Prometheus."""
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labels=''):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def samples(self):
+        samples = []
+        cumulative = 0
+        prefix = f'{self.labels},' if self.labels else ''
+        for bound, count in zip(self.buckets + (float('inf'),), self.counts):
+            cumulative += count
+            samples.append((f'{self.name}_bucket{{{prefix}le="{_format_value(float(bound))}"}}', cumulative))
+        suffix = f'{{{self.labels}}}' if self.labels else ''
+        samples.append((f'{self.name}_sum{suffix}', self.sum))
+        samples.append((f'{self.name}_count{suffix}', self.count))
+        return samples
+
+
+class Family:
+    """Метрики одного имени, различающиеся значением одной метки.
+
+    Дочерняя метрика создаётся при первом обращении к labels(value).
+    """
+
+    def __init__(self, metric_class, name, help, label, **kwargs):
+        self.metric_class = metric_class
+        self.kind = metric_class.kind
+        self.name = name
+        self.help = help
+        self.label = label
+        self.kwargs = kwargs
+        self.children = {}
+
+    def labels(self, value):
+        child = self.children.get(value)
+        if child is None:
+            child = self.children[value] = self.metric_class(
+                self.name, self.help, labels=f'{self.label}="{value}"', **self.kwargs
+            )
+        return child
+
+    def samples(self):
+        return [sample for child in self.children.values() for sample in child.samples()]
+
+
+class Registry:
+    """Набор метрик и асинхронных сборщиков, которые обновляют их перед выдачей."""
+
+    def __init__(self):
+        self._metrics = []
+        self._collectors = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def add_collector(self, collector):
+        """collector — корутинная функция без аргументов, вызывается при каждом запросе метрик."""
+        self._collectors.append(collector)
+
+    async def collect(self):
+        for collector in self._collectors:
+            try:
+                await collector()
+            except Exception as e:
+                log.warning("Metrics collector failed: %s", e)
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.kind}')
+            for name, value in metric.samples():
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+class ServerMetrics:
+    """Метрики сервера; горячий путь только увеличивает счётчики и пополняет корзины."""
+
+    def __init__(self):
+        self.registry = Registry()
+        self.request_latency = self.registry.add(Histogram(
+            'rabbitmq_server_request_latency_seconds',
+            'Time from receiving a request to the broker confirming its response'
+        ))
+        self.handler_seconds = self.registry.add(Histogram(
+            'rabbitmq_server_handler_seconds', 'Time spent in the operation handler'
+        ))
+        self.requests = self.registry.add(Counter(
+            'rabbitmq_server_requests_total', 'Deliveries received from the request queue'
+        ))
+        self.publish_errors = self.registry.add(Counter(
+            'rabbitmq_server_publish_errors_total', 'Responses the broker failed to confirm'
+        ))
+        self.nacks = self.registry.add(Counter(
+            'rabbitmq_server_nacks_total', 'Request deliveries rejected with basic.nack'
+        ))
+        self.in_flight = self.registry.add(Gauge(
+            'rabbitmq_server_in_flight', 'Deliveries accepted by the consumer and not yet handled'
+        ))
+        self.delay_queue_size = self.registry.add(Gauge(
+            'rabbitmq_server_delay_queue_size', 'Delayed responses waiting in the scheduler'
+        ))
+        self.queue_depth = self.registry.add(Gauge(
+            'rabbitmq_server_queue_depth', 'Ready messages in the consumed request queues'
+        ))
+        self.reconnects = self.registry.add(Counter(
+            'rabbitmq_server_reconnects_total', 'Reconnections to RabbitMQ after a lost connection'
+        ))
+        self.recovery_seconds = self.registry.add(Gauge(
+            'rabbitmq_server_recovery_seconds', 'Time from losing the connection to the last reconnection'
+        ))
+        self.stage_seconds = self.registry.add(Family(
+            Histogram, 'rabbitmq_server_stage_seconds', 'Time spent in each request pipeline stage', 'stage'
+        ))
+        self.stage_errors = self.registry.add(Family(
+            Counter, 'rabbitmq_server_stage_errors_total', 'Requests that failed in a pipeline stage', 'stage'
+        ))
+        self._queue_depth_source = None
+
+    def watch_queue_depth(self, transport, queue_names):
+        """Обновляет queue_depth суммой по очередям, спрашивая транспорт при каждом запросе метрик.
+
+        После переподключения вызывается снова с новым транспортом.
+        """
+        if self._queue_depth_source is None:
+            self.registry.add_collector(self._collect_queue_depth)
+        self._queue_depth_source = (transport, list(queue_names))
+
+    async def _collect_queue_depth(self):
+        transport, queue_names = self._queue_depth_source
+        depth = 0
+        for queue_name in queue_names:
+            depth += await transport.queue_depth(queue_name)
+        self.queue_depth.set(depth)
+
+
+class MetricsServer:
+    """Минимальный HTTP-сервер на asyncio, отдающий метрики в текстовом формате Prometheus."""
+
+    def __init__(self, registry, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self.registry = registry
+        self.host = host
+        self.port = port
+        self._server = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+        log.info("Metrics are served on http://%s:%s/metrics", self.host, self.port)
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = await reader.readline()
+            while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                pass
+
+            parts = request_line.decode('latin-1').split()
+            if len(parts) >= 2 and parts[0] == 'GET' and parts[1].split('?')[0] == '/metrics':
+                await self.registry.collect()
+                status, content_type, body = '200 OK', CONTENT_TYPE, self.registry.render().encode()
+            else:
+                status, content_type, body = '404 Not Found', 'text/plain', b'Not Found\n'
+
+            writer.write(
+                f'HTTP/1.1 {status}\r\nContent-Type: {content_type}\r\n'
+                f'Content-Length: {len(body)}\r\nConnection: close\r\n\r\n'.encode() + body
+            )
+            await writer.drain()
+        except Exception as e:
+            log.warning("Metrics request failed: %s", e)
+        finally:
+            writer.close()
@@ -0,0 +1,365 @@
+"""Конвейер обработки запроса: последовательность этапов с замером времени.
+
+Каждая доставка проходит этапы по порядку; этап читает и дополняет общий
+Job. Время каждого этапа попадает в гистограмму
+rabbitmq_server_stage_seconds{stage="..."}, поэтому под нагрузкой видно,
+куда уходит время. Ошибка этапа обрабатывается его политикой:
+reject  — nack без возврата в очередь (по умолчанию);
+requeue — nack с возвратом в очередь;
+skip    — записать в журнал и перейти к следующему этапу; недоступна для
+          обязательных этапов, без которых следующим нечего обрабатывать.
+Если запрос не выполнен по вине самого запроса — неизвестная операция
+(UnknownOperation), ошибка обработчика или кодирования ответа, — политика
+reject вместо nack отправляет на каждый запрос доставки сообщение с
+type = Error и текстом ошибки в теле, чтобы клиент не ждал ответа до таймаута.
+
+Состав конвейера задаётся секцией [pipeline]:
+    stages = decode, validate, deadline, dedupe, compute, encode, publish
+    deadline_ms = 0
+    <этап>_on_error = reject | requeue | skip
+Этапы decode, compute, encode и publish обязательны и идут в этом порядке.
+Новые этапы регистрируются декоратором register.
+"""
+import logging
+import math
+import time
+from rabbitmq_common.codecs import ERROR_CONTENT_TYPE, ERROR_TYPE, REQUEST_BATCH_TYPE, RESPONSE_BATCH_TYPE, Response
+from rabbitmq_server.config import log_request_key
+from rabbitmq_server.handlers import UnknownOperation
+
+log = logging.getLogger(__name__)
+
+REJECT = 'reject'
+REQUEUE = 'requeue'
+SKIP = 'skip'
+ERROR_POLICIES = (REJECT, REQUEUE, SKIP)
+
+REQUIRED_STAGES = ('decode', 'compute', 'encode', 'publish')
+DEFAULT_STAGES = ('decode', 'validate', 'deadline', 'dedupe', 'compute', 'encode', 'publish')
+DEFAULT_DEADLINE_MS = 0
+
+# Имя этапа -> класс этапа
+registry = {}
+
+
+def register(name):
+    """Декоратор, регистрирующий класс этапа под именем name."""
+    def decorator(cls):
+        cls.name = name
+        registry[name] = cls
+        return cls
+    return decorator
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class Job:
+    """Состояние одной доставки на пути через конвейер."""
+
+    __slots__ = (
+        'message', 'received_at', 'batch', 'codec', 'requests', 'key', 'results',
+        'body', 'message_type', 'cached', 'cache', 'settled'
+    )
+
+    def __init__(self, message, received_at):
+        self.message = message
+        self.received_at = received_at
+        self.batch = message.type == REQUEST_BATCH_TYPE
+        self.codec = None
+        self.requests = None
+        # Ключ кэша повторов и correlation_id ответа
+        self.key = None
+        self.results = None
+        self.body = None
+        self.message_type = RESPONSE_BATCH_TYPE if self.batch else None
+        self.cached = False
+        self.cache = None
+        # Доставка подтверждена, отклонена или передана публикатору
+        self.settled = False
+
+    @property
+    def routing_key(self):
+        return self.requests[0].return_address
+
+    @property
+    def delay(self):
+        # Клиент собирает в пакет запросы с одинаковой задержкой
+        return max(request.process_time_in_seconds for request in self.requests)
+
+
+class Stage:
+    """Этап конвейера; run() бросает исключение, чтобы применить политику on_error."""
+
+    name = None
+    on_error = REJECT
+    # Ошибка этапа относится к запросу, и клиенту при reject отправляется ответ с ошибкой
+    error_reply = False
+
+    async def run(self, context, job):
+        raise NotImplementedError
+
+
+@register('decode')
+class DecodeStage(Stage):
+    async def run(self, context, job):
+        message = job.message
+        job.codec = context.codecs.find(message.content_type)
+        if job.batch:
+            job.requests = job.codec.decode_request_batch(message.body)
+            job.key = message.correlation_id
+            log_request_key.set(job.key)
+            log.info("Received RequestBatch: ID=%s, Size=%s", job.key, len(job.requests))
+        else:
+            request = job.codec.decode_request(message.body)
+            job.requests = [request]
+            job.key = request.request_id
+            log_request_key.set(job.key)
+            log.info("Received Request: ID=%s, Request=%s", request.request_id, request.request)
+
+
+@register('validate')
+class ValidateStage(Stage):
+    async def run(self, context, job):
+        if not job.requests:
+            raise ValueError("empty request batch")
+        return_address = job.routing_key
+        if not return_address:
+            raise ValueError("request has no return_address")
+        for request in job.requests:
+            if request.return_address != return_address:
+                raise ValueError("requests of one batch must share return_address")
+            if not (request.process_time_in_seconds >= 0 and math.isfinite(request.process_time_in_seconds)):
+                raise ValueError(f"invalid delay {request.process_time_in_seconds} for ID={request.request_id}")
+            context.dispatcher.get(request.operation)
+
+
+@register('deadline')
+class DeadlineStage(Stage):
+    """Отклоняет запросы, которые ждали в сервере дольше deadline секунд (0 — без ограничения)."""
+
+    def __init__(self, deadline=DEFAULT_DEADLINE_MS / 1000):
+        self.deadline = deadline
+
+    async def run(self, context, job):
+        if self.deadline <= 0:
+            return
+        waited = time.perf_counter() - job.received_at
+        if waited > self.deadline:
+            raise DeadlineExceeded(f"request ID={job.key} waited {waited * 1000:.0f} ms")
+
+
+@register('dedupe')
+class DedupeStage(Stage):
+    """Находит готовый ответ на повторную доставку; при промахе ответ будет сохранён."""
+
+    on_error = SKIP
+
+    async def run(self, context, job):
+        if context.dedupe is None:
+            return
+        cached = context.dedupe.get(job.key)
+        if cached is None:
+            job.cache = context.dedupe
+            return
+        job.body, job.message_type = cached
+        job.cached = True
+
+
+@register('compute')
+class ComputeStage(Stage):
+    error_reply = True
+
+    async def run(self, context, job):
+        if job.cached:
+            return
+        dispatcher = context.dispatcher
+        handler_started = time.perf_counter()
+        if not job.batch:
+            request = job.requests[0]
+            job.results = [await dispatcher.call(request.operation, request.request)]
+            log.info("Processed request: %s(%s) -> Response: %s", request.operation, request.request, job.results[0])
+        else:
+            # Запросы одной операции обрабатываются одним вызовом
+            groups = {}
+            for index, request in enumerate(job.requests):
+                groups.setdefault(request.operation, []).append(index)
+
+            job.results = [None] * len(job.requests)
+            for operation, indexes in groups.items():
+                values = [job.requests[index].request for index in indexes]
+                for index, result in zip(indexes, await dispatcher.call_many(operation, values)):
+                    job.results[index] = result
+        context.metrics.handler_seconds.observe(time.perf_counter() - handler_started)
+
+
+@register('encode')
+class EncodeStage(Stage):
+    error_reply = True
+
+    async def run(self, context, job):
+        if job.cached:
+            return
+        responses = [Response(request.request_id, result) for request, result in zip(job.requests, job.results)]
+        if job.batch:
+            job.body = job.codec.encode_response_batch(responses)
+        else:
+            job.body = job.codec.encode_response(responses[0])
+
+
+@register('publish')
+class PublishStage(Stage):
+    """Отправляет ответ сразу или через планировщик, если задана задержка.
+
+    Доставка подтверждается публикатором после подтверждения ответа брокером.
+    Отложенный ответ передаётся планировщику, а доставка подтверждается
+    немедленно, чтобы не занимать окно prefetch на время задержки. Ответ из
+    кэша повторов отправляется сразу, без выдерживания задержки.
+    """
+
+    async def run(self, context, job):
+        message = job.message
+        if job.cache is not None:
+            job.cache.put(job.key, job.body, job.message_type)
+
+        delay = 0 if job.cached else job.delay
+        if delay > 0:
+            context.scheduler.schedule(
+                delay, job.body, job.routing_key, job.key, job.message_type, job.codec.content_type
+            )
+            await message.ack()
+            job.settled = True
+            log.info("Scheduled response for ID=%s in %s seconds", job.key, delay)
+            return
+
+        await context.publisher.publish(
+            job.body,
+            routing_key=job.routing_key,
+            correlation_id=job.key,
+            delivery=message,
+            message_type=job.message_type,
+            received_at=job.received_at,
+            content_type=job.codec.content_type
+        )
+        job.settled = True
+        if job.cached:
+            log.info("Answered ID=%s from dedupe cache (redelivered=%s)", job.key, message.redelivered)
+        else:
+            log.info("Queued response for ID=%s", job.key)
+
+
+async def publish_error(context, job, error):
+    """Отвечает на каждый запрос доставки сообщением ERROR_TYPE с текстом error.
+
+    Доставка подтверждается публикатором вместе с последним из ответов.
+    """
+    body = str(error).encode()
+    last = len(job.requests) - 1
+    for index, request in enumerate(job.requests):
+        await context.publisher.publish(
+            body,
+            routing_key=job.routing_key,
+            correlation_id=request.request_id,
+            delivery=job.message if index == last else None,
+            message_type=ERROR_TYPE,
+            content_type=ERROR_CONTENT_TYPE
+        )
+    job.settled = True
+
+
+def load_pipeline_config(config):
+    """Читает состав конвейера из секции [pipeline]; возвращает (stages, policies, deadline)."""
+    value = config.get('pipeline', 'stages', fallback=None)
+    stages = tuple(name.strip() for name in value.split(',') if name.strip()) if value else DEFAULT_STAGES
+    deadline = config.getfloat('pipeline', 'deadline_ms', fallback=DEFAULT_DEADLINE_MS) / 1000
+
+    unknown = [name for name in stages if name not in registry]
+    if unknown:
+        raise ValueError(f"pipeline.stages has unknown stages: {', '.join(unknown)}")
+    if len(set(stages)) != len(stages):
+        raise ValueError("pipeline.stages lists a stage more than once")
+    required = [name for name in stages if name in REQUIRED_STAGES]
+    if tuple(required) != REQUIRED_STAGES:
+        raise ValueError(f"pipeline.stages must include {', '.join(REQUIRED_STAGES)} in this order")
+    if deadline < 0:
+        raise ValueError("pipeline.deadline_ms must not be negative")
+
+    policies = {}
+    for name in stages:
+        policy = config.get('pipeline', f'{name}_on_error', fallback=None)
+        if policy is None:
+            continue
+        if policy not in ERROR_POLICIES:
+            raise ValueError(f"pipeline.{name}_on_error must be one of: {', '.join(ERROR_POLICIES)}")
+        if policy == SKIP and name in REQUIRED_STAGES:
+            raise ValueError(f"pipeline.{name}_on_error cannot be {SKIP}: the stage is required")
+        policies[name] = policy
+
+    return stages, policies, deadline
+
+
+class Pipeline:
+    """Прогоняет доставку через этапы, замеряя каждый и применяя политики ошибок.
+
+    Доставка, которую этапы так и не подтвердили и не отклонили, в конце
+    отклоняется без возврата в очередь, чтобы не занимать окно prefetch.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+
+    @classmethod
+    def build(cls, names=DEFAULT_STAGES, policies=None, deadline=DEFAULT_DEADLINE_MS / 1000):
+        stages = []
+        for name in names:
+            stage = DeadlineStage(deadline) if name == 'deadline' else registry[name]()
+            if policies and name in policies:
+                stage.on_error = policies[name]
+            stages.append(stage)
+        return cls(stages)
+
+    @classmethod
+    def from_settings(cls, settings):
+        return cls.build(settings.pipeline_stages, settings.pipeline_policies, settings.pipeline_deadline)
+
+    @property
+    def names(self):
+        return [stage.name for stage in self.stages]
+
+    async def process(self, context, message, received_at=None):
+        job = Job(message, received_at if received_at is not None else time.perf_counter())
+        # Записи журнала относятся к этой доставке, пока DecodeStage не назначит ключ
+        token = log_request_key.set(None)
+        try:
+            await self._process(context, message, job)
+        finally:
+            log_request_key.reset(token)
+
+    async def _process(self, context, message, job):
+        metrics = context.metrics
+        for stage in self.stages:
+            started = time.perf_counter()
+            try:
+                await stage.run(context, job)
+            except Exception as e:
+                metrics.stage_errors.labels(stage.name).inc()
+                if stage.on_error == SKIP:
+                    log.warning("Stage %s failed for ID=%s, skipping: %s", stage.name, job.key, e)
+                    continue
+                if (stage.on_error == REJECT and (stage.error_reply or isinstance(e, UnknownOperation))
+                        and job.requests and job.routing_key):
+                    log.warning("Stage %s failed for ID=%s, answering with an error: %s", stage.name, job.key, e)
+                    await publish_error(context, job, e)
+                    return
+                log.error("Error processing message in stage %s: %s", stage.name, e)
+                metrics.nacks.inc()
+                await message.nack(requeue=stage.on_error == REQUEUE)
+                return
+            finally:
+                metrics.stage_seconds.labels(stage.name).observe(time.perf_counter() - started)
+
+        if not job.settled:
+            log.error("Delivery ID=%s was not settled by the pipeline, rejecting", job.key)
+            metrics.nacks.inc()
+            await message.nack(requeue=False)
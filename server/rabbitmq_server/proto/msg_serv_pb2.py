@@ -1,6 +1,6 @@
 # -*- coding: utf-8 -*-
 # Generated by the protocol buffer compiler.  DO NOT EDIT!
-# source: msg_serv.proto
+# source: msg.proto
 # Protobuf Python Version: 5.26.1
 """Generated protocol buffer code."""
 from google.protobuf import descriptor as _descriptor
@@ -14,15 +14,19 @@ _sym_db = _symbol_database.Default()
 
 
 
-DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\x0emsg_serv.proto\x12\x11TestTask.Messages\"g\n\x07Request\x12\x16\n\x0ereturn_address\x18\x01 \x02(\t\x12\x12\n\nrequest_id\x18\x02 \x02(\t\x12\x1f\n\x17process_time_in_seconds\x18\x03 \x01(\x02\x12\x0f\n\x07request\x18\x04 \x02(\x05\"0\n\x08Response\x12\x12\n\nrequest_id\x18\x01 \x02(\t\x12\x10\n\x08response\x18\x02 \x02(\x05')
+DESCRIPTOR = _descriptor_pool.Default().AddSerializedFile(b'\n\tmsg.proto\x12\x11TestTask.Messages\"\x82\x01\n\x07Request\x12\x16\n\x0ereturn_address\x18\x01 \x02(\t\x12\x12\n\nrequest_id\x18\x02 \x02(\t\x12\x1f\n\x17process_time_in_seconds\x18\x03 \x01(\x02\x12\x0f\n\x07request\x18\x04 \x02(\x05\x12\x19\n\toperation\x18\x05 \x01(\t:\x06\x64ouble\"0\n\x08Response\x12\x12\n\nrequest_id\x18\x01 \x02(\t\x12\x10\n\x08response\x18\x02 \x02(\x05\"<\n\x0cRequestBatch\x12,\n\x08requests\x18\x01 \x03(\x0b\x32\x1a.TestTask.Messages.Request\"?\n\rResponseBatch\x12.\n\tresponses\x18\x01 \x03(\x0b\x32\x1b.TestTask.Messages.Response')
 
 _globals = globals()
 _builder.BuildMessageAndEnumDescriptors(DESCRIPTOR, _globals)
 _builder.BuildTopDescriptorsAndMessages(DESCRIPTOR, 'msg_serv_pb2', _globals)
 if not _descriptor._USE_C_DESCRIPTORS:
   DESCRIPTOR._loaded_options = None
-  _globals['_REQUEST']._serialized_start=37
-  _globals['_REQUEST']._serialized_end=140
-  _globals['_RESPONSE']._serialized_start=142
-  _globals['_RESPONSE']._serialized_end=190
+  _globals['_REQUEST']._serialized_start=33
+  _globals['_REQUEST']._serialized_end=163
+  _globals['_RESPONSE']._serialized_start=165
+  _globals['_RESPONSE']._serialized_end=213
+  _globals['_REQUESTBATCH']._serialized_start=215
+  _globals['_REQUESTBATCH']._serialized_end=275
+  _globals['_RESPONSEBATCH']._serialized_start=277
+  _globals['_RESPONSEBATCH']._serialized_end=340
 # @@protoc_insertion_point(module_scope)
@@ -0,0 +1,137 @@
+import asyncio
+import logging
+import time
+from rabbitmq_common.transport import DEFAULT_EXCHANGE
+
+log = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 100
+DEFAULT_LINGER_MS = 0
+DEFAULT_BUFFER_SIZE = 1000
+
+
+def load_publisher_config(config):
+    """Читает параметры публикатора из секции [publisher]."""
+    batch_size = config.getint('publisher', 'batch_size', fallback=DEFAULT_BATCH_SIZE)
+    linger_ms = config.getfloat('publisher', 'linger_ms', fallback=DEFAULT_LINGER_MS)
+    buffer_size = config.getint('publisher', 'buffer_size', fallback=DEFAULT_BUFFER_SIZE)
+
+    if batch_size < 1:
+        raise ValueError("publisher.batch_size must be positive")
+    if buffer_size < 1:
+        raise ValueError("publisher.buffer_size must be positive")
+    if linger_ms < 0:
+        raise ValueError("publisher.linger_ms must not be negative")
+
+    return batch_size, linger_ms / 1000, buffer_size
+
+
+class ResponsePublisher:
+    """Конвейерная отправка ответов с подтверждениями публикации.
+
+    Ответы копятся в ограниченном буфере и уходят пачками до batch_size
+    штук. Публикации пачки не ждут друг друга, подтверждения брокера
+    обрабатываются асинхронно. Доставка запроса подтверждается (ack) только
+    после подтверждения её ответа. Транспорт должен подтверждать публикации
+    (publisher confirms).
+
+    Каждый ответ публикуется отдельно, кадры и подтверждения пачки не
+    объединяются, поэтому linger > 0 только добавляет задержку каждому
+    ответу; по умолчанию он выключен.
+    """
+
+    def __init__(self, transport, batch_size=DEFAULT_BATCH_SIZE, linger=DEFAULT_LINGER_MS / 1000,
+                 buffer_size=DEFAULT_BUFFER_SIZE, metrics=None):
+        self.transport = transport
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self.linger = linger
+        self.buffer_size = buffer_size
+        self._buffer = None
+        self._unconfirmed = None
+        self._pending = set()
+        self._task = None
+
+    @property
+    def pending(self):
+        """Число ответов в буфере и ожидающих подтверждения брокера."""
+        queued = self._buffer.qsize() if self._buffer is not None else 0
+        return queued + len(self._pending)
+
+    async def start(self):
+        self._buffer = asyncio.Queue(maxsize=self.buffer_size)
+        self._unconfirmed = asyncio.Semaphore(self.buffer_size)
+        self._task = asyncio.create_task(self._run(), name="response-publisher")
+
+    async def publish(self, body, routing_key, correlation_id, delivery=None, message_type=None, received_at=None,
+                      content_type=None):
+        """Ставит ответ в очередь на отправку.
+
+        Ждёт только если буфер заполнен. delivery — входящее сообщение,
+        которое нужно подтвердить после публикации ответа; received_at —
+        момент получения запроса по time.perf_counter() для метрики задержки;
+        content_type — кодек тела ответа.
+        """
+        await self._buffer.put((body, routing_key, correlation_id, delivery, message_type, received_at, content_type))
+
+    async def close(self, timeout=None):
+        """Отправляет всё накопленное, дожидается подтверждений и останавливается."""
+        if self._task is None:
+            return
+        try:
+            await asyncio.wait_for(self._flush(), timeout)
+        except asyncio.TimeoutError:
+            log.error("Publisher did not flush in %s seconds, %s responses unconfirmed", timeout, self.pending)
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _flush(self):
+        await self._buffer.join()
+        if self._pending:
+            await asyncio.gather(*self._pending, return_exceptions=True)
+
+    async def _run(self):
+        while True:
+            batch = [await self._buffer.get()]
+            if self.linger > 0 and self._buffer.qsize() < self.batch_size - 1:
+                await asyncio.sleep(self.linger)
+            while len(batch) < self.batch_size and not self._buffer.empty():
+                batch.append(self._buffer.get_nowait())
+
+            for item in batch:
+                await self._unconfirmed.acquire()
+                task = asyncio.create_task(self._publish_one(*item))
+                self._pending.add(task)
+                task.add_done_callback(self._pending.discard)
+                self._buffer.task_done()
+
+    async def _publish_one(self, body, routing_key, correlation_id, delivery, message_type, received_at, content_type):
+        try:
+            await self.transport.publish(
+                DEFAULT_EXCHANGE, routing_key, body, correlation_id=correlation_id, type=message_type,
+                content_type=content_type
+            )
+            published = True
+        except Exception as e:
+            log.error("Failed to publish response for Request ID=%s: %s", correlation_id, e)
+            published = False
+            if self.metrics is not None:
+                self.metrics.publish_errors.inc()
+        finally:
+            self._unconfirmed.release()
+
+        if published and received_at is not None and self.metrics is not None:
+            self.metrics.request_latency.observe(time.perf_counter() - received_at)
+
+        if delivery is None:
+            return
+        try:
+            if published:
+                await delivery.ack()
+            else:
+                if self.metrics is not None:
+                    self.metrics.nacks.inc()
+                await delivery.nack(requeue=True)
+        except Exception as e:
+            log.error("Failed to settle delivery for Request ID=%s: %s", correlation_id, e)
@@ -0,0 +1,108 @@
+import asyncio
+import heapq
+import itertools
+import logging
+
+log = logging.getLogger(__name__)
+
+
+class DelayScheduler:
+    """Планировщик отложенных ответов на куче, упорядоченной по времени отправки.
+
+    Ответ вычисляется сразу, а сюда попадают только готовые байты и адрес
+    получателя. Одна фоновая задача спит до ближайшего срока и передаёт
+    созревшие ответы публикатору, поэтому отложенный запрос не держит
+    ни корутину, ни неподтверждённую доставку.
+    """
+
+    def __init__(self, publisher):
+        self.publisher = publisher
+        self._heap = []
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self._idle = asyncio.Event()
+        self._idle.set()
+        self._flush_all = False
+        self._task = None
+
+    def __len__(self):
+        return len(self._heap)
+
+    async def start(self):
+        self._task = asyncio.create_task(self._run(), name="delay-scheduler")
+
+    def schedule(self, delay, body, routing_key, correlation_id, message_type=None, content_type=None):
+        """Планирует публикацию ответа через delay секунд."""
+        due = asyncio.get_running_loop().time() + delay
+        entry = (due, next(self._counter), body, routing_key, correlation_id, message_type, content_type)
+        heapq.heappush(self._heap, entry)
+        self._idle.clear()
+        if self._heap[0] is entry:
+            self._wakeup.set()
+
+    async def drain(self, timeout=None, grace=None):
+        """Ждёт отправки всех запланированных ответов не дольше timeout секунд.
+
+        Ответы, срок которых не наступил к концу ожидания, отправляются
+        досрочно: доставки этих запросов уже подтверждены, и иначе ответы
+        были бы потеряны. Досрочная отправка ждёт не дольше grace секунд
+        (например, если публикатор не принимает ответы из-за обрыва);
+        не отправленные за это время ответы отбрасываются с записью в журнал.
+        """
+        if self._heap:
+            log.info("Waiting for %s scheduled responses", len(self._heap))
+        try:
+            await asyncio.wait_for(self._idle.wait(), timeout)
+            return
+        except asyncio.TimeoutError:
+            log.warning("Publishing %s scheduled responses ahead of time", len(self._heap))
+            self._flush_all = True
+            self._wakeup.set()
+
+        try:
+            await asyncio.wait_for(self._idle.wait(), grace)
+        except asyncio.TimeoutError:
+            dropped, self._heap = self._heap, []
+            self._idle.set()
+            log.error(
+                "Dropped %s scheduled responses not published in %s seconds: %s",
+                len(dropped), grace, ', '.join(str(entry[4]) for entry in sorted(dropped))
+            )
+
+    async def close(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            timeout = 0 if self._flush_all else self._heap[0][0] - loop.time()
+            if timeout > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self._publish_due(float('inf') if self._flush_all else loop.time())
+
+    async def _publish_due(self, now):
+        while self._heap and self._heap[0][0] <= now:
+            _, _, body, routing_key, correlation_id, message_type, content_type = heapq.heappop(self._heap)
+            await self.publisher.publish(
+                body,
+                routing_key=routing_key,
+                correlation_id=correlation_id,
+                message_type=message_type,
+                content_type=content_type
+            )
+        if not self._heap:
+            self._idle.set()
@@ -0,0 +1,130 @@
+"""Типизированные настройки сервера из server_config.ini.
+
+Значения по секциям читают load_*_config модулей, которым они нужны;
+здесь они собираются в один снимок, который читается один раз и
+сравнивается с предыдущим при перечитывании файла.
+"""
+from pathlib import Path
+from typing import Dict, NamedTuple, Optional, Tuple
+from rabbitmq_common.failover import load_failover_config
+from rabbitmq_common.sharding import load_sharding_config
+from rabbitmq_server.config import DEFAULT_BACKUP_COUNT, DEFAULT_MAX_BYTES, DEFAULT_SAMPLE_EVERY
+from rabbitmq_server.consumer import load_consumer_config
+from rabbitmq_server.dedupe import load_dedupe_config
+from rabbitmq_server.handlers import load_handlers_config
+from rabbitmq_server.metrics import load_metrics_config
+from rabbitmq_server.pipeline import load_pipeline_config
+from rabbitmq_server.publisher import load_publisher_config
+
+CONFIG_PATH = Path(__file__).parent.parent / 'server_config.ini'
+
+DEFAULT_SHUTDOWN_TIMEOUT = 30.0
+DEFAULT_RESTART_DELAY = 1.0
+
+
+class ServerSettings(NamedTuple):
+    """Типизированный снимок server_config.ini."""
+    endpoints: Tuple[Tuple[str, int], ...]
+    user: str
+    password: str
+    exchange: str
+    shards: int
+    consumer_shards: Optional[str]
+    backoff_initial: float
+    backoff_max: float
+    attempt_timeout: float
+    prefetch_count: int
+    consumer_workers: int
+    publisher_batch_size: int
+    publisher_linger: float
+    publisher_buffer_size: int
+    dedupe_max_size: int
+    dedupe_ttl: float
+    thread_workers: int
+    process_workers: int
+    pipeline_stages: Tuple[str, ...]
+    pipeline_policies: Dict[str, str]
+    pipeline_deadline: float
+    metrics_enabled: bool
+    metrics_host: str
+    metrics_port: int
+    log_level: str
+    log_file: str
+    log_max_bytes: int
+    log_backup_count: int
+    log_sample_every: int
+    workers: int
+    restart_delay: float
+    shutdown_timeout: float
+
+
+# Какие компоненты сервера пересоздаются при изменении каких настроек.
+# Соединение, публикатор, потребитель и конвейер создаются заново при каждом
+# подключении; остальные живут весь процесс (см. RESTART_COMPONENTS)
+SETTINGS_COMPONENTS = {
+    'connection': ('endpoints', 'user', 'password', 'exchange', 'shards', 'consumer_shards', 'attempt_timeout'),
+    'failover': ('endpoints', 'backoff_initial', 'backoff_max'),
+    'consumer': ('prefetch_count', 'consumer_workers'),
+    'publisher': ('publisher_batch_size', 'publisher_linger', 'publisher_buffer_size'),
+    'pipeline': ('pipeline_stages', 'pipeline_policies', 'pipeline_deadline'),
+    'shutdown': ('shutdown_timeout',),
+    'dedupe': ('dedupe_max_size', 'dedupe_ttl'),
+    'handlers': ('thread_workers', 'process_workers'),
+    'metrics': ('metrics_enabled', 'metrics_host', 'metrics_port'),
+    'logging': ('log_level', 'log_file', 'log_max_bytes', 'log_backup_count', 'log_sample_every'),
+    'supervisor': ('workers', 'restart_delay'),
+}
+
+# Компоненты, изменения которых вступают в силу только после перезапуска
+RESTART_COMPONENTS = frozenset({'dedupe', 'handlers', 'metrics', 'logging', 'supervisor'})
+
+
+def load_server_settings(config):
+    """Собирает ServerSettings из ConfigParser; ValueError при некорректных значениях."""
+    endpoints, backoff_initial, backoff_max, attempt_timeout = load_failover_config(config)
+    prefetch_count, consumer_workers = load_consumer_config(config)
+    publisher_batch_size, publisher_linger, publisher_buffer_size = load_publisher_config(config)
+    dedupe_max_size, dedupe_ttl = load_dedupe_config(config)
+    thread_workers, process_workers = load_handlers_config(config)
+    pipeline_stages, pipeline_policies, pipeline_deadline = load_pipeline_config(config)
+    metrics_enabled, metrics_host, metrics_port = load_metrics_config(config)
+    settings = ServerSettings(
+        endpoints=endpoints,
+        user=config.get('rabbitmq', 'user', fallback='guest'),
+        password=config.get('rabbitmq', 'password', fallback='guest'),
+        exchange=config.get('rabbitmq', 'exchange', fallback='bews'),
+        shards=load_sharding_config(config),
+        consumer_shards=config.get('consumer', 'shards', fallback=None),
+        backoff_initial=backoff_initial,
+        backoff_max=backoff_max,
+        attempt_timeout=attempt_timeout,
+        prefetch_count=prefetch_count,
+        consumer_workers=consumer_workers,
+        publisher_batch_size=publisher_batch_size,
+        publisher_linger=publisher_linger,
+        publisher_buffer_size=publisher_buffer_size,
+        dedupe_max_size=dedupe_max_size,
+        dedupe_ttl=dedupe_ttl,
+        thread_workers=thread_workers,
+        process_workers=process_workers,
+        pipeline_stages=pipeline_stages,
+        pipeline_policies=pipeline_policies,
+        pipeline_deadline=pipeline_deadline,
+        metrics_enabled=metrics_enabled,
+        metrics_host=metrics_host,
+        metrics_port=metrics_port,
+        log_level=config.get('logging', 'level', fallback='INFO').upper(),
+        log_file=config.get('logging', 'file', fallback='Log_File.log'),
+        log_max_bytes=config.getint('logging', 'max_bytes', fallback=DEFAULT_MAX_BYTES),
+        log_backup_count=config.getint('logging', 'backup_count', fallback=DEFAULT_BACKUP_COUNT),
+        log_sample_every=config.getint('logging', 'sample_every', fallback=DEFAULT_SAMPLE_EVERY),
+        workers=config.getint('server', 'workers', fallback=1),
+        restart_delay=config.getfloat('server', 'restart_delay', fallback=DEFAULT_RESTART_DELAY),
+        shutdown_timeout=config.getfloat('server', 'shutdown_timeout', fallback=DEFAULT_SHUTDOWN_TIMEOUT)
+    )
+
+    if settings.workers < 1:
+        raise ValueError("server.workers must be at least 1")
+    if settings.shutdown_timeout < 0 or settings.restart_delay < 0:
+        raise ValueError("server.shutdown_timeout and server.restart_delay must not be negative")
+    return settings
@@ -0,0 +1,92 @@
+import logging
+import multiprocessing
+import multiprocessing.connection
+import signal
+import time
+
+log = logging.getLogger(__name__)
+
+
+def _bootstrap(target, worker_id):
+    """Сбрасывает унаследованные от супервизора обработчики сигналов."""
+    # Остановкой воркеров управляет супервизор через SIGTERM
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    target(worker_id)
+
+
+class Supervisor:
+    """Запускает N процессов-воркеров и следит за ними.
+
+    Упавший воркер перезапускается, а SIGTERM/SIGINT, полученные
+    супервизором, рассылаются всем воркерам.
+    """
+
+    def __init__(self, target, workers, restart_delay=1.0, shutdown_timeout=10.0):
+        self.target = target
+        self.workers = workers
+        self.restart_delay = restart_delay
+        self.shutdown_timeout = shutdown_timeout
+        self._processes = {}
+        self._stopping = False
+
+    def run(self):
+        previous_handlers = {
+            signum: signal.signal(signum, self._on_signal)
+            for signum in (signal.SIGTERM, signal.SIGINT)
+        }
+        try:
+            for worker_id in range(self.workers):
+                self._spawn(worker_id)
+            log.info("Supervisor started %s workers", self.workers)
+
+            while not self._stopping:
+                sentinels = {process.sentinel: worker_id for worker_id, process in self._processes.items()}
+                for sentinel in multiprocessing.connection.wait(list(sentinels), timeout=0.5):
+                    if self._stopping:
+                        break
+                    self._restart(sentinels[sentinel])
+        finally:
+            self._shutdown()
+            for signum, handler in previous_handlers.items():
+                signal.signal(signum, handler)
+
+    def stop(self):
+        self._stopping = True
+
+    def _on_signal(self, signum, frame):
+        log.info("Supervisor received signal %s, stopping workers...", signum)
+        self.stop()
+
+    def _spawn(self, worker_id):
+        process = multiprocessing.Process(
+            target=_bootstrap,
+            args=(self.target, worker_id),
+            name=f"rabbitmq_server-worker-{worker_id}",
+        )
+        process.start()
+        self._processes[worker_id] = process
+        log.info("Worker %s started with pid %s", worker_id, process.pid)
+
+    def _restart(self, worker_id):
+        process = self._processes[worker_id]
+        process.join()
+        log.warning("Worker %s (pid %s) exited with code %s, restarting", worker_id, process.pid, process.exitcode)
+        time.sleep(self.restart_delay)
+        if not self._stopping:
+            self._spawn(worker_id)
+
+    def _shutdown(self):
+        for process in self._processes.values():
+            if process.is_alive():
+                process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        for worker_id, process in self._processes.items():
+            process.join(max(0.0, deadline - time.monotonic()))
+            if process.is_alive():
+                log.error("Worker %s did not stop in time, killing it", worker_id)
+                process.kill()
+                process.join()
+        self._processes.clear()
+        log.info("All workers stopped")
@@ -3,3 +3,28 @@ def double_number(number: int) -> int:
     Для тестов
     """
     return number * 2
+
+def double_numbers(numbers):
+    """
+    Пакетный вариант double_number
+    """
+    return [number * 2 for number in numbers]
+
+MAX_PRIME_LIMIT = 10_000_000
+
+def count_primes(limit: int) -> int:
+    """
+    Количество простых чисел, не превосходящих limit (решето Эратосфена).
+    Пример тяжёлой для процессора операции.
+    """
+    if limit > MAX_PRIME_LIMIT:
+        raise ValueError(f"limit must not exceed {MAX_PRIME_LIMIT}")
+    if limit < 2:
+        return 0
+
+    sieve = bytearray([1]) * (limit + 1)
+    sieve[0] = sieve[1] = 0
+    for number in range(2, int(limit ** 0.5) + 1):
+        if sieve[number]:
+            sieve[number * number::number] = bytes(len(range(number * number, limit + 1, number)))
+    return sum(sieve)
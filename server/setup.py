@@ -9,5 +9,6 @@ setup(
     description='Работа с брокером сообщений, серверная часть',
     long_description="",
     zip_safe=False,
+    install_requires=['rabbitmq_common'],
     packages=find_packages(),
 )
@@ -0,0 +1,63 @@
+from rabbitmq_server.proto import msg_serv_pb2
+
+
+class FakeClock:
+    """Часы для clock=: время сдвигается присваиванием now."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FakePublisher:
+    def __init__(self):
+        self.published = []
+        self.content_types = []
+
+    async def publish(self, body, routing_key, correlation_id, delivery=None, message_type=None, received_at=None,
+                      content_type=None):
+        self.published.append((body, routing_key, correlation_id, delivery, message_type))
+        self.content_types.append(content_type)
+
+    @property
+    def correlation_ids(self):
+        return [correlation_id for _, _, correlation_id, _, _ in self.published]
+
+
+class FakeScheduler:
+    def __init__(self):
+        self.scheduled = []
+
+    def schedule(self, delay, body, routing_key, correlation_id, message_type=None, content_type=None):
+        self.scheduled.append((delay, routing_key, correlation_id))
+
+
+class FakeMessage:
+    """Доставка с телом body; nacked — 'requeue', 'reject' или None."""
+
+    def __init__(self, body, type=None, correlation_id=None, content_type=None):
+        self.body = body
+        self.type = type
+        self.content_type = content_type
+        self.correlation_id = correlation_id
+        self.redelivered = False
+        self.acked = False
+        self.nacked = None
+
+    async def ack(self):
+        self.acked = True
+
+    async def nack(self, requeue=True):
+        self.nacked = 'requeue' if requeue else 'reject'
+
+
+def make_request(value, request_id="req-1", delay=0, operation="double"):
+    request = msg_serv_pb2.Request()
+    request.return_address = "client-queue"
+    request.request_id = request_id
+    request.request = value
+    request.process_time_in_seconds = delay
+    request.operation = operation
+    return request
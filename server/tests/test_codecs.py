@@ -0,0 +1,56 @@
+import uuid
+import pytest
+from rabbitmq_common.codecs import CONTENT_TYPES, CodecRegistry, CompactCodec, ProtobufCodec, Request, Response
+from rabbitmq_server.proto import msg_serv_pb2
+
+
+def make_requests(count, operations=('double',)):
+    return_address = str(uuid.uuid4())
+    return [
+        Request(return_address, str(uuid.uuid4()), 0.5 * (i % 2), i - count // 2, operations[i % len(operations)])
+        for i in range(count)
+    ]
+
+
+@pytest.mark.parametrize('codec', [ProtobufCodec(msg_serv_pb2), CompactCodec()], ids=lambda codec: codec.name)
+def test_codec_round_trips_requests_and_responses(codec):
+    requests = make_requests(5, operations=('double', 'count_primes'))
+    assert codec.decode_request(codec.encode_request(requests[0])) == requests[0]
+    assert codec.decode_request_batch(codec.encode_request_batch(requests)) == requests
+
+    responses = [Response(request.request_id, request.request * 2) for request in requests]
+    assert codec.decode_response(codec.encode_response(responses[0])) == responses[0]
+    assert codec.decode_response_batch(codec.encode_response_batch(responses)) == responses
+
+
+def test_compact_codec_is_smaller_and_reads_what_protobuf_reads():
+    requests = make_requests(100)
+    protobuf, compact = ProtobufCodec(msg_serv_pb2), CompactCodec()
+    assert len(compact.encode_request(requests[0])) < len(protobuf.encode_request(requests[0])) * 0.6
+    assert len(compact.encode_request_batch(requests)) < len(protobuf.encode_request_batch(requests)) // 3
+
+    # Protobuf-кодек переиспользует объекты: старый клиент и кодек читают одно и то же
+    message = msg_serv_pb2.Request()
+    message.ParseFromString(protobuf.encode_request(requests[1]))
+    assert (message.request_id, message.request, message.operation) == (requests[1].request_id, requests[1].request, 'double')
+
+
+def test_compact_codec_rejects_what_it_cannot_encode():
+    compact = CompactCodec()
+    request = make_requests(1)[0]
+    with pytest.raises(ValueError):
+        compact.encode_request(request._replace(request_id='req-1'))
+    with pytest.raises(ValueError):
+        compact.encode_request(request._replace(request_id=request.request_id.upper()))
+    with pytest.raises(ValueError):
+        compact.encode_request(request._replace(request=2 ** 31))
+    with pytest.raises(ValueError):
+        compact.decode_request_batch(compact.encode_request_batch(make_requests(2))[:-1])
+
+
+def test_registry_selects_codec_by_content_type():
+    registry = CodecRegistry(ProtobufCodec(msg_serv_pb2), CompactCodec())
+    assert registry.find(None).name == 'protobuf'
+    assert registry.find(CONTENT_TYPES['compact']).name == 'compact'
+    with pytest.raises(LookupError):
+        registry.find('application/json')
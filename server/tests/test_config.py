@@ -0,0 +1,80 @@
+import logging
+import pathlib
+from rabbitmq_server.config import (
+    HOT_PATH_LOGGERS, SamplingFilter, configure_logging, log_request_key, stop_listener, worker_log_file
+)
+
+
+def make_record(level, msg="message %s", args=(1,)):
+    return logging.LogRecord("rabbitmq_server.server_state", level, __file__, 1, msg, args, None)
+
+
+def test_sampling_filter_keeps_info_records_of_one_of_every_request():
+    sampling = SamplingFilter(every=10)
+    kept = 0
+    for index in range(1000):
+        token = log_request_key.set(f"req-{index}")
+        try:
+            passed = {sampling.filter(make_record(logging.INFO)) for _ in range(3)}
+        finally:
+            log_request_key.reset(token)
+        # Строки одного запроса сохраняются или отбрасываются вместе
+        assert len(passed) == 1
+        kept += passed.pop()
+    assert 50 < kept < 150
+
+    # Вне запроса записи не прореживаются
+    assert all(sampling.filter(make_record(logging.INFO)) for _ in range(5))
+
+
+def test_sampling_filter_always_keeps_warnings():
+    sampling = SamplingFilter(every=10)
+    assert all(sampling.filter(make_record(logging.ERROR)) for _ in range(5))
+
+
+def test_configure_logging_writes_through_listener(tmp_path):
+    log_file = tmp_path / "server.log"
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    try:
+        listener = configure_logging("INFO", log_file, stream=open(tmp_path / "stream.log", "w"))
+        logging.getLogger("rabbitmq_server.test").info("Processed %s -> %s", 2, 4)
+        stop_listener(listener)
+        # Повторная остановка (например, из atexit) ничего не делает
+        stop_listener(listener)
+        assert not listener.running
+    finally:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    assert "INFO - Processed 2 -> 4" in log_file.read_text()
+
+
+def test_configure_logging_samples_pipeline_logger(tmp_path):
+    root = logging.getLogger()
+    saved_handlers, saved_level = root.handlers[:], root.level
+    try:
+        listener = configure_logging("INFO", tmp_path / "server.log", sample_every=100,
+                                     stream=open(tmp_path / "stream.log", "w"))
+        stop_listener(listener)
+    finally:
+        for handler in root.handlers[:]:
+            root.removeHandler(handler)
+        for handler in saved_handlers:
+            root.addHandler(handler)
+        root.setLevel(saved_level)
+
+    pipeline_logger = logging.getLogger('rabbitmq_server.pipeline')
+    filters = [f for f in pipeline_logger.filters if isinstance(f, SamplingFilter)]
+    for sampling in filters:
+        pipeline_logger.removeFilter(sampling)
+    assert 'rabbitmq_server.pipeline' in HOT_PATH_LOGGERS
+    assert len(filters) == 1 and filters[0].every == 100
+
+
+def test_worker_log_file_is_per_worker():
+    assert worker_log_file("Log_File.log", 1) == pathlib.Path("Log_File.worker1.log")
+    assert worker_log_file("/var/log/server.log", 0) == pathlib.Path("/var/log/server.worker0.log")
@@ -0,0 +1,118 @@
+import asyncio
+import configparser
+import pytest
+from rabbitmq_server.consumer import Consumer, load_consumer_config
+
+
+class FakeTransport:
+    def __init__(self):
+        self.prefetch_count = None
+        self.callback = None
+        self.cancelled = False
+
+    async def consume(self, queue, callback, prefetch_count=0, no_ack=False):
+        self.prefetch_count = prefetch_count
+        self.callback = callback
+        return "ctag"
+
+    async def cancel(self, consumer_tag):
+        self.cancelled = True
+
+
+class SlowContext:
+    def __init__(self):
+        self.transport = FakeTransport()
+        self.running = 0
+        self.max_running = 0
+        self.handled = []
+
+    async def handle_request(self, message, received_at=None):
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(0.01)
+        self.running -= 1
+        self.handled.append(message)
+
+
+def test_load_consumer_config_defaults():
+    config = configparser.ConfigParser()
+    assert load_consumer_config(config) == (64, 16)
+
+
+def test_load_consumer_config_rejects_zero_workers():
+    config = configparser.ConfigParser()
+    config.read_dict({'consumer': {'workers': '0'}})
+    with pytest.raises(ValueError):
+        load_consumer_config(config)
+
+
+def test_consumer_limits_concurrency():
+    async def scenario():
+        context = SlowContext()
+        transport = context.transport
+        consumer = Consumer(context, 'requests', prefetch_count=10, workers=3)
+        await consumer.start()
+
+        await asyncio.gather(*(transport.callback(i) for i in range(10)))
+        while len(context.handled) < 10:
+            await asyncio.sleep(0.005)
+        await consumer.stop()
+        return context, transport
+
+    context, transport = asyncio.run(scenario())
+    assert transport.prefetch_count == 10
+    assert context.max_running == 3
+    assert sorted(context.handled) == list(range(10))
+    assert transport.cancelled
+
+
+class RequeueMessage:
+    def __init__(self, value):
+        self.value = value
+        self.requeued = False
+
+    async def nack(self, requeue=True):
+        self.requeued = requeue
+
+
+def test_consumer_stop_finishes_accepted_messages():
+    async def scenario():
+        context = SlowContext()
+        transport = context.transport
+        consumer = Consumer(context, 'requests', prefetch_count=10, workers=2)
+        await consumer.start()
+        deliveries = [asyncio.create_task(transport.callback(i)) for i in range(6)]
+        await asyncio.sleep(0)
+        await consumer.stop(timeout=5)
+        await asyncio.gather(*deliveries)
+        return context, consumer
+
+    context, consumer = asyncio.run(scenario())
+    assert sorted(context.handled) == list(range(6))
+    assert consumer.in_flight == 0
+
+
+def test_consumer_stop_requeues_what_did_not_finish_in_time():
+    class StuckContext(SlowContext):
+        async def handle_request(self, message, received_at=None):
+            await asyncio.sleep(10)
+
+    async def scenario():
+        context = StuckContext()
+        transport = context.transport
+        consumer = Consumer(context, 'requests', prefetch_count=10, workers=1)
+        await consumer.start()
+        messages = [RequeueMessage(i) for i in range(2)]
+        for message in messages:
+            await transport.callback(message)
+        await asyncio.sleep(0)
+        await consumer.stop(timeout=0.05)
+
+        late = RequeueMessage(99)
+        await transport.callback(late)
+        return messages, late
+
+    (started, buffered), late = asyncio.run(scenario())
+    assert not started.requeued
+    assert buffered.requeued
+    assert late.requeued
@@ -0,0 +1,41 @@
+import configparser
+import pytest
+from rabbitmq_server.dedupe import DedupeCache, load_dedupe_config
+from tests.conftest import FakeClock
+
+
+def test_dedupe_hit_and_miss_counters():
+    cache = DedupeCache(max_size=10, ttl=60)
+    assert cache.get("a") is None
+    cache.put("a", b"response")
+    assert cache.get("a") == (b"response", None)
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_dedupe_evicts_least_recently_used():
+    cache = DedupeCache(max_size=2, ttl=60)
+    cache.put("a", b"1")
+    cache.put("b", b"2")
+    cache.get("a")
+    cache.put("c", b"3")
+    assert len(cache) == 2
+    assert cache.get("b") is None
+    assert cache.get("a") == (b"1", None)
+
+
+def test_dedupe_entries_expire():
+    clock = FakeClock()
+    cache = DedupeCache(max_size=10, ttl=5, clock=clock)
+    cache.put("a", b"1", "ResponseBatch")
+    clock.now = 4.9
+    assert cache.get("a") == (b"1", "ResponseBatch")
+    clock.now = 5.0
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_load_dedupe_config_rejects_zero_ttl():
+    config = configparser.ConfigParser()
+    config.read_dict({'dedupe': {'ttl': '0'}})
+    with pytest.raises(ValueError):
+        load_dedupe_config(config)
@@ -0,0 +1,100 @@
+import asyncio
+import configparser
+import time
+from aio_pika.exceptions import AMQPChannelError
+from rabbitmq_common.failover import EndpointRotation
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_server import __main__ as server_main
+from rabbitmq_server.metrics import ServerMetrics
+from rabbitmq_server.settings import load_server_settings
+
+
+def make_settings():
+    config = configparser.ConfigParser()
+    config.read_dict({'rabbitmq': {'user': 'guest', 'password': 'guest', 'attempt_timeout_ms': '1000'}})
+    return load_server_settings(config)
+
+
+class RecordingTransport(MemoryTransport):
+    def __init__(self, brokers, attempts):
+        super().__init__(brokers)
+        self.attempts = attempts
+
+    async def connect(self, host, port, login, password, timeout=None):
+        self.attempts.append(host)
+        await super().connect(host, port, login, password, timeout)
+
+
+def test_connect_with_failover_moves_to_healthy_node():
+    brokers = {'up': MemoryBroker(), 'down': MemoryBroker()}
+    brokers['down'].crash()
+    attempts = []
+    rotation = EndpointRotation([('up', 1), ('down', 1)])
+    rotation.connected(('down', 1))
+    rotation.lost()
+    metrics = ServerMetrics()
+
+    async def scenario():
+        started = time.monotonic()
+        transport = await server_main.connect_with_failover(
+            rotation, make_settings(), asyncio.Event(), metrics,
+            transport_factory=lambda: RecordingTransport(brokers, attempts)
+        )
+        return transport, time.monotonic() - started
+
+    transport, elapsed = asyncio.run(scenario())
+    assert transport.broker is brokers['up']
+    assert attempts == ['up']
+    assert elapsed < 0.5
+    assert rotation.current == ('up', 1)
+    assert 'rabbitmq_server_reconnects_total 1' in metrics.registry.render()
+
+
+def test_connect_with_failover_returns_none_on_stop():
+    broker = MemoryBroker()
+    broker.crash()
+    rotation = EndpointRotation([('down', 1)], backoff_initial=10.0, backoff_max=10.0)
+
+    async def scenario():
+        stop = asyncio.Event()
+        asyncio.get_running_loop().call_later(0.05, stop.set)
+        return await asyncio.wait_for(
+            server_main.connect_with_failover(
+                rotation, make_settings(), stop, transport_factory=lambda: MemoryTransport(broker)
+            ), 2
+        )
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_serve_reconnects_when_broker_refuses_declare():
+    broker = MemoryBroker()
+    attempts = []
+
+    class RefusingOnceTransport(RecordingTransport):
+        async def declare_exchange(self, name):
+            if len(attempts) == 1:
+                raise AMQPChannelError("PRECONDITION_FAILED - exchange is being deleted")
+            await super().declare_exchange(name)
+
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'rabbitmq': {'backoff_initial_ms': '1', 'backoff_max_ms': '1'},
+        'handlers': {'process_workers': '1'},
+    })
+    settings = load_server_settings(config)
+
+    async def scenario():
+        stop = asyncio.Event()
+        server = asyncio.create_task(server_main.serve(
+            settings, stop_signals=(), stop=stop,
+            transport_factory=lambda: RefusingOnceTransport({'localhost': broker}, attempts)
+        ))
+        while not broker.queues.get('bews') or not broker.queues['bews'].consumers:
+            assert not server.done(), server.exception()
+            await asyncio.sleep(0.001)
+        stop.set()
+        await asyncio.wait_for(server, 5)
+
+    asyncio.run(scenario())
+    assert attempts == ['localhost', 'localhost']
@@ -0,0 +1,43 @@
+import asyncio
+import pytest
+from rabbitmq_server.handlers import PROCESS, THREAD, Dispatcher, Handler, registry
+from rabbitmq_server.utils import double_number
+
+
+def test_builtin_operations_are_registered():
+    assert registry['double'].func is double_number
+    assert registry['count_primes'].mode == PROCESS
+
+
+def test_handler_rejects_unknown_mode():
+    with pytest.raises(ValueError):
+        Handler('bad', double_number, mode='gpu')
+
+
+def test_dispatcher_runs_handlers_in_every_mode():
+    async def scenario():
+        dispatcher = Dispatcher(
+            {
+                'inline': Handler('inline', double_number),
+                'thread': Handler('thread', double_number, mode=THREAD),
+                'process': Handler('process', double_number, mode=PROCESS),
+            },
+            thread_workers=1,
+            process_workers=1,
+        )
+        try:
+            return [
+                await dispatcher.call('inline', 1),
+                await dispatcher.call('thread', 2),
+                await dispatcher.call('process', 3),
+                await dispatcher.call_many('process', [4, 5]),
+            ]
+        finally:
+            dispatcher.shutdown()
+
+    assert asyncio.run(scenario()) == [2, 4, 6, [8, 10]]
+
+
+def test_dispatcher_rejects_unknown_operation():
+    with pytest.raises(ValueError):
+        asyncio.run(Dispatcher().call('missing', 1))
@@ -0,0 +1,39 @@
+import asyncio
+import os
+import signal
+from rabbitmq_server.__main__ import drain, wait_for_signal
+
+
+def test_wait_for_signal_returns_on_signal():
+    async def scenario():
+        loop = asyncio.get_running_loop()
+        loop.call_later(0.05, os.kill, os.getpid(), signal.SIGUSR1)
+        await asyncio.wait_for(wait_for_signal((signal.SIGUSR1,)), 5)
+
+    asyncio.run(scenario())
+    assert signal.getsignal(signal.SIGUSR1) == signal.SIG_DFL
+
+
+class Recorder:
+    def __init__(self, calls, name):
+        self.calls = calls
+        self.name = name
+
+    async def stop(self, timeout=None):
+        self.calls.append((self.name, 'stop', timeout))
+
+    async def drain(self, timeout=None, grace=None):
+        self.calls.append((self.name, 'drain', timeout))
+
+    async def close(self, timeout=None):
+        self.calls.append((self.name, 'close', timeout))
+
+
+def test_drain_stops_consumer_before_flushing_responses():
+    calls = []
+    asyncio.run(drain(Recorder(calls, 'consumer'), Recorder(calls, 'scheduler'), Recorder(calls, 'publisher'), 10))
+
+    assert [(name, step) for name, step, _ in calls] == [
+        ('consumer', 'stop'), ('scheduler', 'drain'), ('scheduler', 'close'), ('publisher', 'close')
+    ]
+    assert all(timeout is None or 0 < timeout <= 10 for _, _, timeout in calls)
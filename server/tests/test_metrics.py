@@ -0,0 +1,83 @@
+import asyncio
+import configparser
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_server.__main__ import serve
+from rabbitmq_server.metrics import Counter, Histogram, MetricsServer, Registry, ServerMetrics
+from rabbitmq_server.settings import load_server_settings
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.add(Histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 5):
+        histogram.observe(value)
+
+    text = registry.render()
+
+    assert '# TYPE latency_seconds histogram' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1"} 3' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in text
+    assert 'latency_seconds_sum 6.05' in text
+    assert 'latency_seconds_count 4' in text
+
+
+def test_counter_reads_value_from_func():
+    registry = Registry()
+    registry.add(Counter('hits_total', 'Hits', func=lambda: 7))
+    assert 'hits_total 7' in registry.render()
+
+
+def test_metrics_server_serves_prometheus_text():
+    async def scenario():
+        metrics = ServerMetrics()
+        metrics.requests.inc(3)
+
+        async def collect():
+            metrics.queue_depth.set(12)
+
+        metrics.registry.add_collector(collect)
+        server = MetricsServer(metrics.registry, port=0)
+        await server.start()
+        try:
+            responses = []
+            for path in ('/metrics', '/other'):
+                reader, writer = await asyncio.open_connection(server.host, server.port)
+                writer.write(f'GET {path} HTTP/1.1\r\nHost: localhost\r\n\r\n'.encode())
+                responses.append((await reader.read()).decode())
+                writer.close()
+            return responses
+        finally:
+            await server.close()
+
+    metrics_response, missing_response = asyncio.run(scenario())
+    assert metrics_response.startswith('HTTP/1.1 200 OK')
+    assert 'rabbitmq_server_requests_total 3' in metrics_response
+    assert 'rabbitmq_server_queue_depth 12' in metrics_response
+    assert missing_response.startswith('HTTP/1.1 404')
+
+
+def test_server_keeps_running_when_metrics_port_is_taken(caplog):
+    async def scenario():
+        taken = await asyncio.start_server(lambda reader, writer: None, '127.0.0.1', 0)
+        port = taken.sockets[0].getsockname()[1]
+        config = configparser.ConfigParser()
+        config.read_dict({
+            'handlers': {'process_workers': '1'},
+            'metrics': {'enabled': 'true', 'host': '127.0.0.1', 'port': str(port)},
+        })
+        broker = MemoryBroker()
+        stop = asyncio.Event()
+        server = asyncio.create_task(serve(
+            load_server_settings(config), stop_signals=(), stop=stop, transport_factory=lambda: MemoryTransport(broker)
+        ))
+        while 'bews' not in broker.queues:
+            assert not server.done(), server.exception()
+            await asyncio.sleep(0.001)
+        stop.set()
+        await asyncio.wait_for(server, 5)
+        taken.close()
+        await taken.wait_closed()
+
+    asyncio.run(scenario())
+    assert "Cannot serve metrics" in caplog.text
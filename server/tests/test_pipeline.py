@@ -0,0 +1,199 @@
+import asyncio
+import configparser
+import logging
+import time
+import pytest
+from rabbitmq_server.config import SamplingFilter, is_sampled, log_request_key
+from rabbitmq_server.dedupe import DedupeCache
+from rabbitmq_server.handlers import Dispatcher, Handler
+from rabbitmq_server.utils import count_primes, double_number
+from rabbitmq_common.codecs import ERROR_TYPE, REQUEST_BATCH_TYPE
+from rabbitmq_server.pipeline import DEFAULT_STAGES, Pipeline, Stage, load_pipeline_config
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.server_state import ServerContext, WaitingState
+from tests.conftest import FakeMessage, FakePublisher, make_request
+
+
+def request_message(value=1, request_id="req-1"):
+    return FakeMessage(make_request(value, request_id).SerializeToString())
+
+
+class FailingStage(Stage):
+    name = 'failing'
+
+    async def run(self, context, job):
+        raise RuntimeError("boom")
+
+
+def make_context(pipeline):
+    context = ServerContext(transport=None, settings=None, publisher=FakePublisher(), dispatcher=Dispatcher(),
+                            pipeline=pipeline)
+    context.set_state(WaitingState())
+    return context
+
+
+def handle(context, message, received_at=None):
+    asyncio.run(context.handle_request(message, received_at))
+    return context.publisher.correlation_ids
+
+
+def test_load_pipeline_config_defaults_and_validation():
+    config = configparser.ConfigParser()
+    assert load_pipeline_config(config) == (DEFAULT_STAGES, {}, 0)
+
+    config.read_dict({'pipeline': {'stages': 'decode, compute, encode, publish', 'deadline_ms': '250',
+                                   'compute_on_error': 'requeue'}})
+    assert load_pipeline_config(config) == (('decode', 'compute', 'encode', 'publish'), {'compute': 'requeue'}, 0.25)
+
+    for stages in ('decode, compute, publish', 'compute, decode, encode, publish', 'decode, cache, compute, encode, publish'):
+        config.read_dict({'pipeline': {'stages': stages}})
+        with pytest.raises(ValueError):
+            load_pipeline_config(config)
+
+    config.read_dict({'pipeline': {'stages': 'decode, compute, encode, publish', 'compute_on_error': 'retry'}})
+    with pytest.raises(ValueError):
+        load_pipeline_config(config)
+
+    for name in ('decode', 'compute', 'encode', 'publish'):
+        config = configparser.ConfigParser()
+        config.read_dict({'pipeline': {f'{name}_on_error': 'skip'}})
+        with pytest.raises(ValueError):
+            load_pipeline_config(config)
+    config = configparser.ConfigParser()
+    config.read_dict({'pipeline': {'dedupe_on_error': 'skip'}})
+    assert load_pipeline_config(config)[1] == {'dedupe': 'skip'}
+
+
+def test_every_stage_is_timed():
+    context = make_context(Pipeline.build())
+
+    assert handle(context, request_message()) == ["req-1"]
+    stage_seconds = context.metrics.stage_seconds
+    assert list(stage_seconds.children) == list(DEFAULT_STAGES)
+    assert all(histogram.count == 1 for histogram in stage_seconds.children.values())
+    assert 'rabbitmq_server_stage_seconds_count{stage="compute"} 1' in context.metrics.registry.render()
+
+
+def test_removed_dedupe_stage_is_not_consulted():
+    context = make_context(Pipeline.build(('decode', 'compute', 'encode', 'publish')))
+    context.dedupe = DedupeCache()
+
+    handle(context, request_message())
+    handle(context, request_message())
+    assert len(context.dedupe) == 0
+    assert context.publisher.correlation_ids == ["req-1", "req-1"]
+
+
+def test_deadline_rejects_requests_that_waited_too_long():
+    context = make_context(Pipeline.build(deadline=0.05))
+    message = request_message()
+
+    assert handle(context, message, received_at=time.perf_counter() - 1) == []
+    assert message.nacked == 'reject'
+    assert context.metrics.stage_errors.labels('deadline').value == 1
+    assert handle(context, request_message(request_id="req-2")) == ["req-2"]
+
+
+def test_stage_error_policies():
+    failing = FailingStage()
+    pipeline = Pipeline.build()
+    pipeline.stages.insert(1, failing)
+
+    failing.on_error = 'requeue'
+    message = request_message()
+    assert handle(make_context(pipeline), message) == []
+    assert message.nacked == 'requeue'
+
+    failing.on_error = 'skip'
+    context = make_context(pipeline)
+    message = request_message()
+    assert handle(context, message) == ["req-1"]
+    assert message.nacked is None
+    assert context.metrics.stage_errors.labels('failing').value == 1
+
+
+def test_unknown_operation_is_answered_with_an_error():
+    context = make_context(Pipeline.build())
+    message = FakeMessage(make_request(1, operation="missing").SerializeToString())
+
+    assert handle(context, message) == ["req-1"]
+    body, routing_key, _, delivery, message_type = context.publisher.published[0]
+    assert (body, routing_key, delivery, message_type) == (
+        b"Unknown operation 'missing'", "client-queue", message, ERROR_TYPE
+    )
+    assert message.nacked is None
+
+    batch = msg_serv_pb2.RequestBatch()
+    batch.requests.extend([make_request(1, "req-2"), make_request(2, "req-3", operation="missing")])
+    message = FakeMessage(batch.SerializeToString(), type=REQUEST_BATCH_TYPE, correlation_id="batch-1")
+    context.publisher.published.clear()
+    assert handle(context, message) == ["req-2", "req-3"]
+    # Доставка подтверждается вместе с последним ответом
+    assert [delivery for _, _, _, delivery, _ in context.publisher.published] == [None, message]
+    assert message.nacked is None
+
+
+def test_handler_and_encode_failures_are_answered_with_an_error():
+    context = make_context(Pipeline.build())
+    context.dispatcher = Dispatcher({"count_primes": Handler("count_primes", count_primes),
+                                     "double": Handler("double", double_number)})
+
+    # Обработчик бросает исключение
+    message = FakeMessage(make_request(10 ** 9, operation="count_primes").SerializeToString())
+    assert handle(context, message) == ["req-1"]
+    body, _, _, delivery, message_type = context.publisher.published[0]
+    assert (delivery, message_type) == (message, ERROR_TYPE)
+    assert b"limit must not exceed" in body
+    assert message.nacked is None
+    assert context.metrics.stage_errors.labels('compute').value == 1
+
+    # Результат не помещается в int32 ответа
+    message = FakeMessage(make_request(2 ** 30, request_id="req-2").SerializeToString())
+    assert handle(context, message) == ["req-1", "req-2"]
+    assert context.publisher.published[1][4] == ERROR_TYPE
+    assert message.nacked is None
+    assert context.metrics.stage_errors.labels('encode').value == 1
+
+
+def test_unsettled_delivery_is_rejected():
+    context = make_context(Pipeline.build(('decode', 'compute', 'encode')))
+    message = request_message()
+
+    assert handle(context, message) == []
+    assert message.nacked == 'reject'
+    assert context.metrics.nacks.value == 1
+
+
+class KeyRecorder(logging.Handler):
+    """Запоминает, к какому запросу относится каждая прошедшая фильтры запись."""
+
+    def __init__(self):
+        super().__init__()
+        self.keys = []
+
+    def emit(self, record):
+        self.keys.append(log_request_key.get())
+
+
+def test_sampled_request_keeps_all_of_its_lines():
+    pipeline_logger = logging.getLogger('rabbitmq_server.pipeline')
+    sampling, recorder = SamplingFilter(every=4), KeyRecorder()
+    saved_level = pipeline_logger.level
+    pipeline_logger.setLevel(logging.INFO)
+    pipeline_logger.addFilter(sampling)
+    pipeline_logger.addHandler(recorder)
+    try:
+        context = make_context(Pipeline.build())
+        request_ids = [f"req-{index}" for index in range(40)]
+        for request_id in request_ids:
+            handle(context, request_message(request_id=request_id))
+    finally:
+        pipeline_logger.removeHandler(recorder)
+        pipeline_logger.removeFilter(sampling)
+        pipeline_logger.setLevel(saved_level)
+
+    sampled = [request_id for request_id in request_ids if is_sampled(request_id, 4)]
+    assert 0 < len(sampled) < len(request_ids)
+    # Received, Processed и Queued response каждого запроса из выборки и ничего от остальных
+    assert recorder.keys == [request_id for request_id in sampled for _ in range(3)]
+    assert log_request_key.get() is None
@@ -0,0 +1,68 @@
+import asyncio
+from rabbitmq_server.publisher import ResponsePublisher
+
+
+class FakeTransport:
+    def __init__(self, fail_for=()):
+        self.published = []
+        self.fail_for = set(fail_for)
+
+    async def publish(self, exchange, routing_key, body, correlation_id=None, reply_to=None, type=None,
+                      content_type=None, mandatory=False):
+        await asyncio.sleep(0)
+        if correlation_id in self.fail_for:
+            raise RuntimeError("nacked by broker")
+        self.published.append((body, routing_key, correlation_id))
+
+
+class FakeDelivery:
+    def __init__(self):
+        self.acked = False
+        self.requeued = None
+
+    async def ack(self):
+        self.acked = True
+
+    async def nack(self, requeue=True):
+        self.requeued = requeue
+
+
+def run_publisher(transport, items, **kwargs):
+    async def scenario():
+        publisher = ResponsePublisher(transport, **kwargs)
+        await publisher.start()
+        for item in items:
+            await publisher.publish(*item)
+        await publisher.close()
+        return publisher
+
+    return asyncio.run(scenario())
+
+
+def test_publisher_acks_delivery_after_publish():
+    transport = FakeTransport()
+    deliveries = [FakeDelivery() for _ in range(5)]
+    items = [(b"body", "client", str(i), delivery) for i, delivery in enumerate(deliveries)]
+
+    publisher = run_publisher(transport, items, batch_size=2, linger=0.001, buffer_size=3)
+
+    assert sorted(item[2] for item in transport.published) == ["0", "1", "2", "3", "4"]
+    assert all(delivery.acked for delivery in deliveries)
+    assert publisher.pending == 0
+
+
+def test_publisher_requeues_delivery_on_failed_publish():
+    transport = FakeTransport(fail_for={"bad"})
+    good, bad = FakeDelivery(), FakeDelivery()
+
+    run_publisher(transport, [(b"1", "client", "good", good), (b"2", "client", "bad", bad)])
+
+    assert good.acked
+    assert not bad.acked
+    assert bad.requeued is True
+
+
+def test_publisher_without_delivery():
+    transport = FakeTransport()
+    run_publisher(transport, [(b"body", "client", "id", None)], linger=0)
+    assert transport.published == [(b"body", "client", "id")]
@@ -0,0 +1,94 @@
+import asyncio
+from rabbitmq_server.scheduler import DelayScheduler
+from tests.conftest import FakePublisher
+
+
+def test_scheduler_publishes_in_due_order():
+    async def scenario():
+        publisher = FakePublisher()
+        scheduler = DelayScheduler(publisher)
+        await scheduler.start()
+        scheduler.schedule(0.06, b"", "client", "late")
+        scheduler.schedule(0.02, b"", "client", "early")
+        scheduler.schedule(0.04, b"", "client", "middle")
+        assert len(scheduler) == 3
+
+        await asyncio.sleep(0.03)
+        assert publisher.correlation_ids == ["early"]
+        await asyncio.sleep(0.06)
+        await scheduler.close()
+        return publisher, scheduler
+
+    publisher, scheduler = asyncio.run(scenario())
+    assert publisher.correlation_ids == ["early", "middle", "late"]
+    assert len(scheduler) == 0
+
+
+def test_scheduler_holds_many_pending_responses():
+    async def scenario():
+        publisher = FakePublisher()
+        scheduler = DelayScheduler(publisher)
+        await scheduler.start()
+        for i in range(100000):
+            scheduler.schedule(60 + i % 7, b"body", "client", str(i))
+        pending = len(scheduler)
+        await scheduler.close()
+        return pending, publisher
+
+    pending, publisher = asyncio.run(scenario())
+    assert pending == 100000
+    assert publisher.correlation_ids == []
+
+
+def test_scheduler_drain_waits_for_due_responses():
+    async def scenario():
+        publisher = FakePublisher()
+        scheduler = DelayScheduler(publisher)
+        await scheduler.start()
+        scheduler.schedule(0.02, b"", "client", "soon")
+        await scheduler.drain(timeout=1)
+        await scheduler.close()
+        return publisher
+
+    assert asyncio.run(scenario()).correlation_ids == ["soon"]
+
+
+def test_scheduler_drain_publishes_early_after_timeout():
+    async def scenario():
+        publisher = FakePublisher()
+        scheduler = DelayScheduler(publisher)
+        await scheduler.start()
+        scheduler.schedule(0.01, b"", "client", "soon")
+        scheduler.schedule(60, b"", "client", "later")
+        await scheduler.drain(timeout=0.05)
+        await scheduler.close()
+        return publisher, scheduler
+
+    publisher, scheduler = asyncio.run(scenario())
+    assert publisher.correlation_ids == ["soon", "later"]
+    assert len(scheduler) == 0
+
+
+def test_scheduler_drain_drops_responses_after_grace(caplog):
+    class StuckPublisher:
+        async def publish(self, body, routing_key, correlation_id, delivery=None, message_type=None,
+                          content_type=None):
+            await asyncio.Event().wait()
+
+    async def scenario():
+        scheduler = DelayScheduler(StuckPublisher())
+        await scheduler.start()
+        scheduler.schedule(60, b"", "client", "first")
+        scheduler.schedule(60, b"", "client", "second")
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        await asyncio.wait_for(scheduler.drain(timeout=0.01, grace=0.05), 1)
+        elapsed = loop.time() - started
+        await scheduler.close()
+        return scheduler, elapsed
+
+    scheduler, elapsed = asyncio.run(scenario())
+    assert elapsed < 0.5
+    assert len(scheduler) == 0
+    assert "Dropped 1 scheduled responses" in caplog.text
+    assert "second" in caplog.text
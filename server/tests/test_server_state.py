@@ -0,0 +1,132 @@
+import asyncio
+import uuid
+from rabbitmq_common.codecs import (
+    CONTENT_TYPES, ERROR_TYPE, REQUEST_BATCH_TYPE, RESPONSE_BATCH_TYPE, CompactCodec, Request
+)
+from rabbitmq_server.dedupe import DedupeCache
+from rabbitmq_server.handlers import Dispatcher, Handler
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.server_state import ServerContext, WaitingState
+from tests.conftest import FakeMessage, FakePublisher, FakeScheduler, make_request
+
+
+def make_context():
+    context = ServerContext(
+        transport=None, settings=None,
+        publisher=FakePublisher(), scheduler=FakeScheduler(), dispatcher=Dispatcher()
+    )
+    context.set_state(WaitingState())
+    return context
+
+
+def handle(message, context=None):
+    context = context or make_context()
+    asyncio.run(context.handle_request(message))
+    return context.publisher.published
+
+
+def test_single_request_is_answered():
+    message = FakeMessage(make_request(21).SerializeToString())
+
+    [(body, routing_key, correlation_id, delivery, message_type)] = handle(message)
+
+    response = msg_serv_pb2.Response()
+    response.ParseFromString(body)
+    assert response.response == 42
+    assert routing_key == "client-queue"
+    assert correlation_id == "req-1"
+    assert delivery is message
+    assert message_type is None
+
+
+def test_batch_request_is_answered_with_one_batch():
+    batch = msg_serv_pb2.RequestBatch()
+    for i in range(3):
+        batch.requests.append(make_request(i, request_id=f"req-{i}"))
+    message = FakeMessage(batch.SerializeToString(), type=REQUEST_BATCH_TYPE, correlation_id="batch-1")
+
+    [(body, routing_key, correlation_id, delivery, message_type)] = handle(message)
+
+    responses = msg_serv_pb2.ResponseBatch()
+    responses.ParseFromString(body)
+    assert [(r.request_id, r.response) for r in responses.responses] == [("req-0", 0), ("req-1", 2), ("req-2", 4)]
+    assert correlation_id == "batch-1"
+    assert message_type == RESPONSE_BATCH_TYPE
+
+
+def test_malformed_request_is_rejected():
+    message = FakeMessage(b"\xff\xff")
+
+    assert handle(message) == []
+    assert message.nacked
+
+
+def test_delayed_request_is_scheduled_and_acked():
+    context = make_context()
+    message = FakeMessage(make_request(1, delay=30).SerializeToString())
+
+    assert handle(message, context) == []
+    assert context.scheduler.scheduled == [(30, "client-queue", "req-1")]
+    assert message.acked
+
+
+def test_request_operation_selects_handler():
+    request = make_request(10)
+    request.operation = "count_primes"
+    context = make_context()
+    context.dispatcher = Dispatcher({"count_primes": Handler("count_primes", lambda value: value + 1)})
+
+    [(body, _, _, _, _)] = handle(FakeMessage(request.SerializeToString()), context)
+
+    response = msg_serv_pb2.Response()
+    response.ParseFromString(body)
+    assert response.response == 11
+
+
+def test_unknown_operation_is_answered_with_an_error():
+    message = FakeMessage(make_request(10, operation="missing").SerializeToString())
+
+    assert handle(message) == [(b"Unknown operation 'missing'", "client-queue", "req-1", message, ERROR_TYPE)]
+    assert not message.nacked
+
+
+def test_redelivered_request_is_answered_from_cache():
+    context = make_context()
+    context.dedupe = DedupeCache()
+    body = make_request(5, delay=30).SerializeToString()
+    handle(FakeMessage(body), context)
+
+    calls = []
+    context.dispatcher = Dispatcher({"double": Handler("double", calls.append)})
+    redelivery = FakeMessage(body)
+    redelivery.redelivered = True
+    [(_, routing_key, correlation_id, delivery, _)] = handle(redelivery, context)
+
+    assert calls == []
+    assert (routing_key, correlation_id, delivery) == ("client-queue", "req-1", redelivery)
+    assert len(context.scheduler.scheduled) == 1
+    assert context.dedupe.hits == 1
+
+
+def test_compact_batch_is_answered_with_compact_codec():
+    codec = CompactCodec()
+    return_address = str(uuid.uuid4())
+    requests = [Request(return_address, str(uuid.uuid4()), 0, i) for i in range(3)]
+    message = FakeMessage(codec.encode_request_batch(requests), type=REQUEST_BATCH_TYPE,
+                          correlation_id="batch-1", content_type=CONTENT_TYPES['compact'])
+    context = make_context()
+
+    [(body, routing_key, _, _, message_type)] = handle(message, context)
+
+    responses = codec.decode_response_batch(body)
+    assert [(r.request_id, r.response) for r in responses] == [(r.request_id, r.request * 2) for r in requests]
+    assert routing_key == return_address
+    assert message_type == RESPONSE_BATCH_TYPE
+    assert context.publisher.content_types == [CONTENT_TYPES['compact']]
+
+
+def test_unknown_content_type_is_rejected():
+    message = FakeMessage(make_request(1).SerializeToString(), content_type='application/json')
+
+    assert handle(message) == []
+    assert message.nacked
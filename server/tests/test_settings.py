@@ -0,0 +1,48 @@
+import configparser
+import pytest
+from rabbitmq_common.settings import ConfigFile
+from rabbitmq_server.__main__ import reload_settings
+from rabbitmq_server.settings import load_server_settings
+
+
+def test_load_server_settings_reads_every_section():
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'rabbitmq': {'hosts': 'a:1, b', 'port': '5673', 'exchange': 'ex', 'shards': '4'},
+        'consumer': {'shards': 'auto', 'prefetch_count': '8'},
+        'publisher': {'linger_ms': '2'},
+        'pipeline': {'deadline_ms': '250', 'dedupe_on_error': 'skip'},
+        'logging': {'level': 'debug'},
+        'server': {'shutdown_timeout': '5'},
+    })
+    settings = load_server_settings(config)
+    assert settings.endpoints == (('a', 1), ('b', 5673))
+    assert (settings.exchange, settings.shards, settings.consumer_shards) == ('ex', 4, 'auto')
+    assert settings.prefetch_count == 8
+    assert settings.publisher_linger == 0.002
+    assert settings.pipeline_policies == {'dedupe': 'skip'}
+    assert settings.pipeline_deadline == 0.25
+    assert settings.log_level == 'DEBUG'
+    assert settings.shutdown_timeout == 5.0
+
+
+def test_load_server_settings_rejects_invalid_values():
+    config = configparser.ConfigParser()
+    config.read_dict({'server': {'workers': '0'}})
+    with pytest.raises(ValueError):
+        load_server_settings(config)
+
+
+def test_reload_settings_reports_changed_components(tmp_path):
+    path = tmp_path / 'server_config.ini'
+    path.write_text("[publisher]\nlinger_ms = 5\n")
+    source = ConfigFile(path)
+    settings = load_server_settings(source.load())
+
+    path.write_text("[publisher]\nlinger_ms = 0\n\n[dedupe]\nttl = 10\n")
+    new_settings, components = reload_settings(source, settings)
+    assert components == {'publisher', 'dedupe'}
+    assert new_settings.publisher_linger == 0
+
+    path.write_text("[publisher]\nlinger_ms = -1\n")
+    assert reload_settings(source, new_settings) == (new_settings, set())
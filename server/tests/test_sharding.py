@@ -0,0 +1,67 @@
+import asyncio
+import configparser
+import uuid
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_common.sharding import shard_for, shard_queue
+from rabbitmq_server.__main__ import serve
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.settings import load_server_settings
+
+
+def test_workers_split_shards_and_answer_every_client():
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'rabbitmq': {'host': 'localhost', 'port': '5672', 'user': 'guest', 'password': 'guest',
+                     'exchange': 'bews', 'shards': '4'},
+        'consumer': {'shards': 'auto'},
+        'publisher': {'linger_ms': '0'},
+        'handlers': {'process_workers': '1'},
+    })
+    settings = load_server_settings(config)
+
+    async def scenario():
+        broker = MemoryBroker()
+        stop = asyncio.Event()
+        servers = [
+            asyncio.create_task(serve(settings, worker_id, stop_signals=(), stop=stop, workers=2,
+                                      transport_factory=lambda: MemoryTransport(broker)))
+            for worker_id in range(2)
+        ]
+        while sum(len(queue.consumers) for queue in broker.queues.values()) < 4:
+            await asyncio.sleep(0.001)
+        # Каждый шард потребляет ровно один воркер
+        consumers = {name: len(queue.consumers) for name, queue in broker.queues.items()}
+
+        client = MemoryTransport(broker)
+        await client.connect('localhost', 5672, 'guest', 'guest')
+        responses = asyncio.Queue()
+
+        async def on_response(delivery):
+            await responses.put(delivery)
+
+        clients = [str(uuid.uuid4()) for _ in range(20)]
+        for client_uuid in clients:
+            await client.declare_queue(client_uuid, exclusive=True, auto_delete=True)
+            await client.consume(client_uuid, on_response, no_ack=True)
+            request = msg_serv_pb2.Request(return_address=client_uuid, request_id=client_uuid, request=1)
+            await client.publish('bews', shard_queue('bews', shard_for(client_uuid, 4), 4),
+                                 request.SerializeToString())
+
+        answered = set()
+        for _ in clients:
+            delivery = await asyncio.wait_for(responses.get(), 5)
+            response = msg_serv_pb2.Response()
+            response.ParseFromString(delivery.body)
+            answered.add(response.request_id)
+
+        stop.set()
+        await asyncio.wait_for(asyncio.gather(*servers), 5)
+        # Шарды переживают уход своих потребителей, и запросы к ним не теряются
+        await client.publish('bews', 'bews.1', b'', mandatory=True)
+        return consumers, answered, set(clients), broker
+
+    consumers, answered, clients, broker = asyncio.run(scenario())
+    assert consumers == {'bews.0': 1, 'bews.1': 1, 'bews.2': 1, 'bews.3': 1}
+    assert answered == clients
+    assert {'bews.0', 'bews.1', 'bews.2', 'bews.3'} <= set(broker.queues)
+    assert len(broker.queues['bews.1'].messages) == 1
@@ -0,0 +1,48 @@
+import sys
+import threading
+import time
+from rabbitmq_server.supervisor import Supervisor
+
+
+def crashing_worker(worker_id):
+    sys.exit(1)
+
+
+def sleeping_worker(worker_id):
+    time.sleep(60)
+
+
+def test_supervisor_restarts_crashed_workers():
+    supervisor = Supervisor(crashing_worker, workers=2, restart_delay=0.01)
+    spawned = []
+    spawn = supervisor._spawn
+
+    def counting_spawn(worker_id):
+        spawned.append(worker_id)
+        spawn(worker_id)
+
+    supervisor._spawn = counting_spawn
+    threading.Timer(0.5, supervisor.stop).start()
+    supervisor.run()
+
+    assert spawned.count(0) > 1
+    assert spawned.count(1) > 1
+
+
+def test_supervisor_terminates_workers_on_stop():
+    supervisor = Supervisor(sleeping_worker, workers=2, shutdown_timeout=5)
+    processes = []
+    spawn = supervisor._spawn
+
+    def recording_spawn(worker_id):
+        spawn(worker_id)
+        processes.append(supervisor._processes[worker_id])
+
+    supervisor._spawn = recording_spawn
+    threading.Timer(0.3, supervisor.stop).start()
+    started = time.monotonic()
+    supervisor.run()
+
+    assert time.monotonic() - started < 5
+    assert len(processes) == 2
+    assert all(not process.is_alive() for process in processes)
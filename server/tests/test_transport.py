@@ -0,0 +1,54 @@
+import asyncio
+import configparser
+from rabbitmq_common.memory import MemoryBroker, MemoryTransport
+from rabbitmq_server.__main__ import serve
+from rabbitmq_server.proto import msg_serv_pb2
+from rabbitmq_server.settings import load_server_settings
+
+
+def test_server_answers_over_memory_broker():
+    config = configparser.ConfigParser()
+    config.read_dict({
+        'rabbitmq': {'host': 'localhost', 'port': '5672', 'user': 'guest', 'password': 'guest', 'exchange': 'bews'},
+        'publisher': {'linger_ms': '0'},
+        'handlers': {'process_workers': '1'},
+    })
+    settings = load_server_settings(config)
+
+    async def scenario():
+        broker = MemoryBroker()
+        stop = asyncio.Event()
+        server = asyncio.create_task(
+            serve(settings, stop_signals=(), stop=stop, transport_factory=lambda: MemoryTransport(broker))
+        )
+        while 'bews' not in broker.queues:
+            await asyncio.sleep(0.001)
+
+        client = MemoryTransport(broker)
+        await client.connect('localhost', 5672, 'guest', 'guest')
+        reply_queue = await client.declare_queue('client-uuid', exclusive=True, auto_delete=True)
+        responses = asyncio.Queue()
+
+        async def on_response(delivery):
+            await responses.put(delivery)
+
+        await client.consume(reply_queue, on_response, no_ack=True)
+        for value in range(3):
+            request = msg_serv_pb2.Request()
+            request.return_address = reply_queue
+            request.request_id = f'req-{value}'
+            request.request = value
+            await client.publish('bews', 'bews', request.SerializeToString(), reply_to=reply_queue)
+
+        answers = {}
+        for _ in range(3):
+            delivery = await asyncio.wait_for(responses.get(), 5)
+            response = msg_serv_pb2.Response()
+            response.ParseFromString(delivery.body)
+            answers[response.request_id] = response.response
+
+        stop.set()
+        await asyncio.wait_for(server, 5)
+        return answers
+
+    assert asyncio.run(scenario()) == {'req-0': 0, 'req-1': 2, 'req-2': 4}
@@ -1,5 +1,5 @@
 import pytest
-from rabbitmq_server.utils import double_number
+from rabbitmq_server.utils import count_primes, double_number, double_numbers
 
 def test_double_number_positive():
     assert double_number(10) == 20
@@ -15,3 +15,13 @@ def test_double_number_large():
 
 def test_double_number_float():
     assert double_number(2.0) == 4
+
+def test_double_numbers():
+    assert double_numbers([1, -2, 0]) == [2, -4, 0]
+
+def test_count_primes():
+    assert [count_primes(n) for n in (0, 2, 10, 100)] == [0, 1, 4, 25]
+
+def test_count_primes_limit():
+    with pytest.raises(ValueError):
+        count_primes(10 ** 8)